@@ -0,0 +1,151 @@
+"""
+Benchmark de compressão dos embeddings: recall x tamanho para escolher
+EMBEDDING_DIMENSIONS e LOCAL_VECTOR_DTYPE / LOCAL_VECTOR_RESCORE.
+
+Uso (a partir de EstruturaProjetoFinal/):
+    python -m benchmarks.bench_compression --limit 20000 --queries 200
+    python -m benchmarks.bench_compression --dims 3072,1024,256 --json resultado.json
+
+Corpus: os vetores já calculados dos contratos, lidos do cache de embeddings
+(settings.EMBEDDING_CACHE_DB, modelo settings.EMBEDDING_MODEL), sem chamar a
+API. Sem cache suficiente, usa vetores sintéticos com energia concentrada nas
+primeiras dimensões (aviso no relatório: serve para testar o script, não para
+escolher o ponto de operação).
+
+Cada pergunta é um vetor do corpus; a referência é o top-k exato em float32 na
+dimensão completa (sem o próprio vetor). Cada configuração é gravada num
+LocalVectorIndex temporário e consultada pelo mesmo caminho da aplicação.
+"""
+import argparse
+import json
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from src.config.settings import settings
+from src.search.vector_index import LocalVectorIndex
+
+BYTES = {"float32": 4, "float16": 2, "int8": 1}
+
+
+def load_cached_vectors(db_path: Path, model: str, limit: int) -> np.ndarray:
+    if not db_path.exists():
+        return np.zeros((0, 0), dtype=np.float32)
+    conn = sqlite3.connect(str(db_path))
+    try:
+        rows = conn.execute("SELECT dim, vector FROM embeddings WHERE model = ? LIMIT ?", (model, limit)).fetchall()
+    finally:
+        conn.close()
+    if not rows:
+        return np.zeros((0, 0), dtype=np.float32)
+    dim = max(set(r[0] for r in rows), key=[r[0] for r in rows].count)
+    return np.stack([np.frombuffer(blob, dtype=np.float32) for d, blob in rows if d == dim])
+
+
+def synthetic_vectors(n: int, dim: int, seed: int) -> np.ndarray:
+    """Grupos de vetores com variância decrescente por dimensão (estrutura parecida com Matryoshka)."""
+    rng = np.random.default_rng(seed)
+    decay = 1 / np.sqrt(1 + np.arange(dim) / 64)
+    centers = rng.standard_normal((max(8, n // 50), dim)).astype(np.float32)
+    data = centers[rng.integers(0, len(centers), n)] + 0.8 * rng.standard_normal((n, dim)).astype(np.float32)
+    return (data * decay).astype(np.float32)
+
+
+def normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def ground_truth(full: np.ndarray, queries: np.ndarray, k: int) -> list[set[int]]:
+    truth = []
+    for qi in queries:
+        scores = full @ full[qi]
+        scores[qi] = -np.inf
+        truth.append(set(np.argpartition(-scores, k)[:k].tolist()))
+    return truth
+
+
+def evaluate(vectors: np.ndarray, queries: np.ndarray, truth: list[set[int]], dims: int, dtype: str,
+             rescore: bool, k: int, rescore_factor: int) -> dict:
+    data = normalize(vectors[:, :dims])  # truncamento + renormalização, como truncate_embedding
+    with tempfile.TemporaryDirectory() as tmp:
+        index = LocalVectorIndex(Path(tmp) / "idx", dimension=dims, dtype=dtype, rescore=rescore,
+                                 rescore_factor=rescore_factor)
+        for start in range(0, len(data), 2000):
+            index.upsert(vectors=[(str(i), data[i], {}) for i in range(start, min(len(data), start + 2000))])
+
+        latencies, hits = [], 0
+        for qi, expected in zip(queries, truth):
+            t0 = time.perf_counter()
+            result = index.query(vector=data[qi], top_k=k + 1)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            found = [int(m["id"]) for m in result["matches"] if int(m["id"]) != qi][:k]
+            hits += len(expected.intersection(found))
+
+    per_vector = dims * BYTES[dtype] + (4 if dtype == "int8" else 0)
+    return {
+        "dims": dims,
+        "dtype": dtype,
+        "rescore": rescore,
+        "bytes_per_vector": per_vector,
+        "resident_mb": round(per_vector * len(data) / 1e6, 2),
+        "mb_per_100k_chunks": round(per_vector * 100_000 / 1e6, 1),
+        "disk_mb_extra": round(dims * 4 * len(data) / 1e6, 2) if rescore and dtype != "float32" else 0.0,
+        f"recall@{k}": round(hits / (len(truth) * k), 4),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cache-db", type=Path, default=settings.EMBEDDING_CACHE_DB)
+    parser.add_argument("--model", default=settings.EMBEDDING_MODEL)
+    parser.add_argument("--limit", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--dims", default="3072,1536,1024,512,256")
+    parser.add_argument("--dtypes", default="float32,float16,int8")
+    parser.add_argument("--rescore-factor", type=int, default=settings.LOCAL_VECTOR_RESCORE_FACTOR)
+    parser.add_argument("--min-vectors", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", type=Path)
+    args = parser.parse_args()
+
+    vectors = load_cached_vectors(args.cache_db, args.model, args.limit)
+    source = f"cache de embeddings ({args.cache_db}, {args.model})"
+    if len(vectors) < args.min_vectors:
+        vectors = synthetic_vectors(min(args.limit, 10000), 3072, args.seed)
+        source = "SINTÉTICO (cache insuficiente: resultados não representam o corpus real)"
+
+    native = vectors.shape[1]
+    dims_list = sorted({d for d in (int(x) for x in args.dims.split(",")) if d <= native}, reverse=True)
+    rng = np.random.default_rng(args.seed)
+    queries = rng.choice(len(vectors), size=min(args.queries, len(vectors)), replace=False)
+    truth = ground_truth(normalize(vectors), queries, args.k)
+
+    print(f"Corpus: {len(vectors)} vetores x {native} dims | {source}")
+    print(f"Perguntas: {len(queries)} | referência: top-{args.k} exato em float32, {native} dims")
+    results = []
+    for dims in dims_list:
+        for dtype in args.dtypes.split(","):
+            for rescore in ((False,) if dtype == "float32" else (False, True)):
+                row = evaluate(vectors, queries, truth, dims, dtype, rescore, args.k, args.rescore_factor)
+                results.append(row)
+                print(f"dims={dims:5} {dtype:8} rescore={'sim' if rescore else 'não':3} | "
+                      f"{row['bytes_per_vector']:6} B/vetor {row['mb_per_100k_chunks']:7.1f} MB/100k | "
+                      f"recall@{args.k}={row[f'recall@{args.k}']:.3f} | "
+                      f"p50={row['p50_ms']:.2f} ms p95={row['p95_ms']:.2f} ms")
+
+    if args.json:
+        args.json.write_text(json.dumps({"source": source, "vectors": len(vectors), "native_dims": native,
+                                         "queries": len(queries), "results": results}, indent=2),
+                             encoding="utf-8")
+        print(f"Resultados salvos em {args.json}")
+
+
+if __name__ == "__main__":
+    main()
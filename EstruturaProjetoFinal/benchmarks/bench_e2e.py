@@ -0,0 +1,439 @@
+"""
+Benchmark ponta a ponta: indexação, /search_pdf e /ask (tempo até o primeiro
+token) sem OpenAI, Pinecone nem LlamaParse.
+
+Uso (a partir de EstruturaProjetoFinal/):
+    python -m benchmarks.bench_e2e --data ../Data
+    python -m benchmarks.bench_e2e --scenarios index,search --compare benchmarks/results/e2e-abc1234.json
+    python -m benchmarks.bench_e2e --embed-latency-ms 150 --llm-first-token-ms 600   # latências de rede simuladas
+
+Os tokens dos lotes de embedding são estimados (TOKEN_COUNTER=estimate), sem
+baixar o BPE do tiktoken; `--tokenizer tiktoken` usa a contagem exata.
+
+O código do projeto roda como em produção (PDFIndexer, RAGPipeline,
+create_app e AskStreamApp); só as dependências externas são trocadas pelo
+registro de clientes (registry.override) por substitutos determinísticos
+(benchmarks/fakes.py). O índice vetorial é o LocalVectorIndex
+(VECTOR_BACKEND=local) e todos os bancos SQLite ficam num diretório
+temporário: nada do ambiente real é lido ou alterado, e cada execução parte
+do zero.
+
+Cenários:
+- index:      indexação completa da pasta (leitura dos PDFs, chunking, embeddings, gravação)
+- reindex:    segunda passada sem mudanças (só o manifesto)
+- search:     POST /search_pdf com nomes, termos de cláusulas e CNPJs
+- ask:        POST /ask sem cache de respostas (busca + reranking + LLM)
+- ask_cached: POST /ask com pergunta já respondida (cache de respostas)
+- ask_stream: POST /ask_stream (ASGI/SSE) com `--concurrency` requisições simultâneas
+
+O resultado vai para um JSON com o commit, os parâmetros e as latências
+(p50/p95/p99); `--compare` mostra a variação em relação a um JSON anterior.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.fakes import FakeEmbeddings, FakeOCRBackend, FakeStreamingChatModel
+from src.config.settings import BASE_DIR, settings
+from src.core.clients import registry
+from src.core.embedding_cache import NATIVE_DIMENSIONS, CachedEmbeddings, EmbeddingCache
+from src.ingestion.ocr import CachedOCR, OCRCache
+from src.ingestion.pdf_indexer import IndexProgress, PDFIndexer
+from src.search.identifier_index import IdentifierIndex
+
+SCENARIOS = ("index", "reindex", "search", "ask", "ask_cached", "ask_stream")
+QUESTIONS = (
+    "Qual o valor mensal do contrato?",
+    "Qual o prazo de vigência e como funciona a renovação?",
+    "Qual a multa em caso de rescisão antecipada?",
+    "Quantos dias de aviso prévio são exigidos para rescindir?",
+    "Qual o foro eleito no contrato?",
+    "Quais espaços a contratada pode utilizar?",
+    "Existe cláusula de confidencialidade?",
+    "Qual o índice de reajuste do pagamento?",
+)
+SEARCH_TERMS = ("rescisão", "multa", "aviso prévio", "reajuste igpm", "vigência", "foro toledo",
+                "confidencialidade", "food truck", "contabeis", "engenharia")
+
+
+def latency_summary(values_ms: list[float]) -> dict:
+    if not values_ms:
+        return {"count": 0}
+    values = np.asarray(values_ms)
+    return {
+        "count": len(values_ms),
+        "mean_ms": round(float(values.mean()), 3),
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+        "max_ms": round(float(values.max()), 3),
+    }
+
+
+def git_revision() -> dict:
+    def git(*args):
+        return subprocess.run(["git", *args], cwd=BASE_DIR, capture_output=True, text=True, timeout=30).stdout.strip()
+    try:
+        return {"commit": git("rev-parse", "--short", "HEAD") or None,
+                "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+    except (OSError, subprocess.SubprocessError):
+        return {"commit": None, "dirty": None}
+
+
+# --- AMBIENTE ---
+
+def configure(workdir: Path, args) -> None:
+    """Aponta settings para o diretório temporário e registra os substitutos no registro de clientes."""
+    for name in dir(settings):
+        value = getattr(settings, name)
+        if name.endswith("_DB") and isinstance(value, Path):
+            setattr(settings, name, workdir / value.name)
+    settings.VECTOR_BACKEND = "local"
+    settings.LOCAL_VECTOR_DIR = workdir / "vector_store"
+    settings.PDF_FOLDER = args.data
+    settings.INDEX_CONCURRENCY = args.index_concurrency
+    settings.TOKEN_COUNTER = args.tokenizer
+
+    registry.reset()
+    fake = FakeEmbeddings(NATIVE_DIMENSIONS.get(settings.EMBEDDING_MODEL, 3072),
+                          latency=args.embed_latency_ms / 1000, latency_per_text=args.embed_latency_per_text_ms / 1000)
+    registry.override("embeddings", CachedEmbeddings(
+        fake, EmbeddingCache(settings.EMBEDDING_CACHE_DB, settings.EMBEDDING_CACHE_MEMORY_ITEMS),
+        f"fake:{settings.EMBEDDING_MODEL}", dimensions=settings.EMBEDDING_DIMENSIONS))
+    registry.override("llm", FakeStreamingChatModel(
+        first_token_latency=args.llm_first_token_ms / 1000, token_latency=args.llm_token_ms / 1000,
+        answer_tokens=args.answer_tokens))
+
+
+class TimedProgress(IndexProgress):
+    """Momento em que cada arquivo terminou, por resultado."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.t0 = time.perf_counter()
+        self.total = 0
+        self.done: list[tuple[float, str]] = []
+
+    def started(self, total: int) -> None:
+        self.total = total
+
+    def file_done(self, pdf_file: str, outcome: str) -> None:
+        with self._lock:
+            self.done.append((time.perf_counter(), outcome))
+
+
+# --- CENÁRIOS ---
+
+def run_index(args, logger: logging.Logger) -> dict:
+    indexer = PDFIndexer(logger=logger)
+    indexer.ocr = CachedOCR(FakeOCRBackend(args.ocr_latency_ms / 1000), OCRCache(settings.OCR_CACHE_DB), logger=logger)
+    fake = registry.embeddings().underlying
+    calls, texts = fake.calls, fake.texts
+    vectors_before = registry.index().describe_index_stats()["total_vector_count"]
+
+    progress = TimedProgress()
+    indexer.index_pdfs(progress=progress)
+    elapsed = time.perf_counter() - progress.t0
+
+    pdfs = [p for p in args.data.iterdir() if p.suffix.lower() == ".pdf"]
+    vectors = registry.index().describe_index_stats()["total_vector_count"] - vectors_before
+    outcomes = {}
+    for _, outcome in progress.done:
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+    # Intervalo entre conclusões: custo por arquivo em regime (no modo pipeline os arquivos se sobrepõem)
+    finished = sorted(t for t, _ in progress.done)
+    gaps = [(b - a) * 1000 for a, b in zip([progress.t0] + finished, finished)]
+    return {
+        "files": progress.total,
+        "outcomes": outcomes,
+        "vectors_written": vectors,
+        "embedding_calls": fake.calls - calls,
+        "embedded_texts": fake.texts - texts,
+        "elapsed_s": round(elapsed, 3),
+        "files_per_s": round(progress.total / elapsed, 3) if elapsed else None,
+        "vectors_per_s": round(vectors / elapsed, 1) if elapsed else None,
+        "mb_per_s": round(sum(p.stat().st_size for p in pdfs) / 1e6 / elapsed, 3) if elapsed else None,
+        "file_interval": latency_summary(gaps),
+    }
+
+
+def search_queries(args, rng: random.Random) -> tuple[list[str], int]:
+    names = [p.stem for p in args.data.iterdir() if p.suffix.lower() == ".pdf"]
+    fragments = [" ".join(re.split(r"[.\-_ ]+", n)[:2]).lower() for n in names]
+    numbers = [r["number"] for r in IdentifierIndex(settings.INDEX_STATE_DB).query("SELECT DISTINCT number FROM id_keys")]
+    pool = fragments + list(SEARCH_TERMS) + numbers
+    return [rng.choice(pool) for _ in range(args.queries)], len(numbers)
+
+
+def run_search(client, args, rng: random.Random) -> dict:
+    queries, numeric = search_queries(args, rng)
+    for q in queries[:args.warmup]:
+        client.post("/search_pdf", json={"query": q})
+    latencies, results, errors = [], 0, 0
+    t0 = time.perf_counter()
+    for q in queries:
+        start = time.perf_counter()
+        resp = client.post("/search_pdf", json={"query": q})
+        latencies.append((time.perf_counter() - start) * 1000)
+        if resp.status_code != 200:
+            errors += 1
+        else:
+            results += len(resp.get_json()["pdfs"])
+    elapsed = time.perf_counter() - t0
+    return {"requests": len(queries), "numeric_queries_available": numeric, "errors": errors,
+            "avg_results": round(results / max(1, len(queries)), 2),
+            "requests_per_s": round(len(queries) / elapsed, 2), "latency": latency_summary(latencies)}
+
+
+def ask_payloads(args, rng: random.Random) -> tuple[list[dict], list[dict]]:
+    """Perguntas medidas e perguntas de aquecimento (pares pergunta x PDF distintos)."""
+    pdfs = sorted(p.name for p in args.data.iterdir() if p.suffix.lower() == ".pdf")
+    pairs = [(q, f) for f in pdfs for q in QUESTIONS]
+    rng.shuffle(pairs)
+    payloads = [{"question": q, "pdf_selected": f, "user_input": ""} for q, f in pairs]
+    return payloads[:args.asks], payloads[args.asks:args.asks + args.warmup]
+
+
+def timed_ask(client, payload: dict) -> tuple[float | None, float, int]:
+    """(tempo até o primeiro token, tempo total, bytes) de um POST /ask consumido em streaming."""
+    start = time.perf_counter()
+    resp = client.post("/ask", json=payload, buffered=False)
+    first, size = None, 0
+    try:
+        for chunk in resp.response:
+            if chunk and first is None:
+                first = (time.perf_counter() - start) * 1000
+            size += len(chunk)
+    finally:
+        resp.close()
+    return first, (time.perf_counter() - start) * 1000, size
+
+
+def run_ask(client, payloads: list[dict], warmup: list[dict]) -> dict:
+    for payload in warmup:
+        timed_ask(client, payload)
+    ttft, total, empty = [], [], 0
+    for payload in payloads:
+        first, elapsed, size = timed_ask(client, payload)
+        total.append(elapsed)
+        if first is None or not size:
+            empty += 1
+        else:
+            ttft.append(first)
+    return {"requests": len(payloads), "empty_responses": empty,
+            "ttft": latency_summary(ttft), "total": latency_summary(total)}
+
+
+async def sse_request(app, payload: dict) -> tuple[int | None, float | None, float]:
+    """Chama a aplicação ASGI diretamente; devolve (status, tempo até o primeiro evento, tempo total)."""
+    body = json.dumps(payload).encode()
+    received = False
+    status, first = None, None
+    start = time.perf_counter()
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.Event().wait()  # cliente nunca desconecta; a aplicação cancela a espera ao terminar
+
+    async def send(message):
+        nonlocal status, first
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body" and message.get("body") and first is None:
+            first = (time.perf_counter() - start) * 1000
+
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+             "path": "/ask_stream", "raw_path": b"/ask_stream", "query_string": b"", "root_path": "",
+             "scheme": "http", "headers": [(b"content-type", b"application/json")],
+             "client": ("127.0.0.1", 0), "server": ("127.0.0.1", 80)}
+    await app(scope, receive, send)
+    return status, first, (time.perf_counter() - start) * 1000
+
+
+async def run_ask_stream(app, payloads: list[dict], concurrency: int) -> dict:
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one(payload):
+        async with limit:
+            return await sse_request(app, payload)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one(p) for p in payloads))
+    elapsed = time.perf_counter() - start
+    ok = [r for r in results if r[0] == 200]
+    return {"requests": len(payloads), "concurrency": concurrency,
+            "rejected": sum(1 for r in results if r[0] == 503),
+            "requests_per_s": round(len(payloads) / elapsed, 2),
+            "ttft": latency_summary([r[1] for r in ok if r[1] is not None]),
+            "total": latency_summary([r[2] for r in ok])}
+
+
+# --- RELATÓRIO ---
+
+def flatten(data: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in data.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def compare(previous: dict, current: dict) -> None:
+    """Variação das métricas de latência e vazão em relação a uma execução anterior."""
+    print(f"\nComparação com {previous.get('meta', {}).get('git', {}).get('commit')} "
+          f"({previous.get('meta', {}).get('timestamp')}):")
+    old, new = flatten(previous.get("scenarios", {})), flatten(current["scenarios"])
+    for key in sorted(set(old) & set(new)):
+        if not (key.endswith("_ms") or key.endswith("_per_s") or key.endswith("elapsed_s")):
+            continue
+        if old[key]:
+            change = (new[key] - old[key]) / old[key] * 100
+            print(f"  {key:40} {old[key]:>12.3f} -> {new[key]:>12.3f}  ({change:+.1f}%)")
+
+
+def print_scenario(name: str, result: dict) -> None:
+    parts = []
+    for key in ("elapsed_s", "files_per_s", "vectors_per_s", "mb_per_s", "requests_per_s"):
+        if result.get(key) is not None:
+            parts.append(f"{key}={result[key]}")
+    for key in ("latency", "ttft", "total", "file_interval"):
+        summary = result.get(key)
+        if summary and summary.get("count"):
+            parts.append(f"{key}: p50={summary['p50_ms']:.1f} p95={summary['p95_ms']:.1f} p99={summary['p99_ms']:.1f} ms")
+    print(f"[{name:10}] " + " | ".join(parts))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data", type=Path, default=BASE_DIR.parent / "Data")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--queries", type=int, default=200, help="requisições do /search_pdf")
+    parser.add_argument("--asks", type=int, default=50, help="perguntas de cada cenário de /ask")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=8, help="requisições simultâneas no ask_stream")
+    parser.add_argument("--index-concurrency", type=int, default=settings.INDEX_CONCURRENCY)
+    parser.add_argument("--embed-latency-ms", type=float, default=0.0, help="por chamada à API de embeddings")
+    parser.add_argument("--embed-latency-per-text-ms", type=float, default=0.0)
+    parser.add_argument("--llm-first-token-ms", type=float, default=300.0)
+    parser.add_argument("--llm-token-ms", type=float, default=5.0)
+    parser.add_argument("--answer-tokens", type=int, default=60)
+    parser.add_argument("--ocr-latency-ms", type=float, default=0.0, help="por página sem texto")
+    parser.add_argument("--tokenizer", choices=("estimate", "tiktoken"), default="estimate",
+                        help="tiktoken baixa o BPE da OpenAI na primeira vez")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--compare", type=Path)
+    parser.add_argument("--keep-workdir", action="store_true")
+    parser.add_argument("--verbose", action="store_true", help="mantém os logs INFO da aplicação")
+    args = parser.parse_args()
+
+    args.data = args.data.resolve()
+    scenarios = [s for s in args.scenarios.split(",") if s]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"cenários desconhecidos: {', '.join(sorted(unknown))}")
+    if not args.data.is_dir():
+        parser.error(f"pasta de PDFs não encontrada: {args.data}")
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench_e2e_"))
+    configure(workdir, args)
+    logger = logging.getLogger("projeto_rag")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+
+    rng = random.Random(args.seed)
+    results: dict[str, dict] = {}
+    try:
+        # Busca e /ask dependem do índice: a indexação sempre roda (e só é reportada se pedida)
+        indexed = run_index(args, logger)
+        if "index" in scenarios:
+            results["index"] = indexed
+            print_scenario("index", indexed)
+        if "reindex" in scenarios:
+            results["reindex"] = run_index(args, logger)
+            print_scenario("reindex", results["reindex"])
+
+        if set(scenarios) & {"search", "ask", "ask_cached", "ask_stream"}:
+            import src.web.flask_app as flask_app
+            from src.web.asgi_app import AskStreamApp
+            flask_app.PDF_DIR = args.data  # busca e preview sobre a mesma pasta indexada
+            app = flask_app.create_app()
+            logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+            client = app.test_client()
+            answer_cache = app.extensions["rag"].answer_cache
+            ttl = answer_cache.ttl
+            payloads, warmup = ask_payloads(args, rng)
+
+            if "search" in scenarios:
+                results["search"] = run_search(client, args, rng)
+                print_scenario("search", results["search"])
+            if "ask" in scenarios:
+                answer_cache.ttl = 0  # sem cache de respostas: busca + LLM em toda pergunta
+                results["ask"] = run_ask(client, payloads, warmup)
+                print_scenario("ask", results["ask"])
+            if "ask_cached" in scenarios:
+                answer_cache.ttl = ttl
+                for payload in payloads:  # primeira resposta de cada pergunta preenche o cache
+                    timed_ask(client, payload)
+                results["ask_cached"] = run_ask(client, payloads, [])
+                results["ask_cached"]["answer_cache"] = answer_cache.stats()
+                print_scenario("ask_cached", results["ask_cached"])
+            if "ask_stream" in scenarios:
+                answer_cache.ttl = 0
+                asgi = AskStreamApp(app, max_concurrency=settings.ASK_MAX_CONCURRENCY,
+                                    queue_timeout=settings.ASK_QUEUE_TIMEOUT, logger=logger)
+                results["ask_stream"] = asyncio.run(run_ask_stream(asgi, payloads, args.concurrency))
+                print_scenario("ask_stream", results["ask_stream"])
+            answer_cache.ttl = ttl
+    finally:
+        if args.keep_workdir:
+            print(f"Diretório de trabalho mantido: {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    git = git_revision()
+    report = {
+        "meta": {
+            "git": git,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": {k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()},
+            "settings": {k: getattr(settings, k) for k in (
+                "EMBEDDING_MODEL", "EMBEDDING_DIMENSIONS", "CHUNK_SIZE", "CHUNK_OVERLAP", "INDEX_CONCURRENCY",
+                "LOCAL_VECTOR_DTYPE", "LOCAL_VECTOR_ANN", "RERANK_CANDIDATES", "RERANK_TOP_K",
+                "CONTEXT_TOKEN_BUDGET", "ASK_MAX_CONCURRENCY")},
+        },
+        "scenarios": results,
+    }
+    output = args.output or BASE_DIR / "benchmarks" / "results" / f"e2e-{git['commit'] or 'local'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"Resultados salvos em {output}")
+
+    if args.compare:
+        compare(json.loads(args.compare.read_text(encoding="utf-8")), report)
+
+
+if __name__ == "__main__":
+    main()
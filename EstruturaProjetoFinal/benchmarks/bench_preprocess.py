@@ -0,0 +1,134 @@
+"""
+Micro-benchmark do TextProcessor: implementação original (re.sub a cada
+chamada, findall de CNPJ/CPF formatados) contra a atual (split/join,
+padrões pré-compilados, varredura que para no CNPJ/CPF do contratado,
+dígitos verificadores e APIs em lote).
+
+Uso (a partir de EstruturaProjetoFinal/):
+    python -m benchmarks.bench_preprocess --folder ../Data --repeat 5
+
+Resultados em MB/s de texto processado. Também confere que a limpeza gera
+exatamente o mesmo texto e conta as primeiras páginas em que a extração de
+chaves mudou (esperado: CNPJ da contratante e números com dígito inválido).
+Sem texto suficiente nos PDFs, usa páginas sintéticas com qualificação das
+partes (Biopark como contratante, empresa ou pessoa física como contratada).
+"""
+import argparse
+import random
+import re
+import time
+from pathlib import Path
+
+from benchmarks.bench_splitter import load_pdf_texts, synthetic_pages
+from benchmarks.fakes import fake_cnpj
+from src.core.preprocess import TextProcessor
+
+# CNPJ fictício (dígitos válidos) usado como o da contratante no corpus sintético
+SYNTHETIC_CONTRACTOR_CNPJ = "11.222.333/0001-81"
+
+
+def legacy_clean_text(text: str) -> str:
+    """Implementação original."""
+    if not text:
+        return ""
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text
+
+
+def legacy_extract_contractor_keys(text: str) -> dict:
+    """Implementação original: primeiro CNPJ/CPF formatado, sem validação."""
+    cnpj_pattern = r'\d{2}\.\d{3}\.\d{3}/\d{4}-\d{2}'
+    cpf_pattern = r'\d{3}\.\d{3}\.\d{3}-\d{2}'
+
+    cnpjs = re.findall(cnpj_pattern, text)
+    cpfs = re.findall(cpf_pattern, text)
+
+    cnpj_contratado = re.sub(r'\D', '', cnpjs[0]) if cnpjs else "SEM_CNPJ"
+    cpf_contratado = re.sub(r'\D', '', cpfs[0]) if cpfs else "SEM_CPF"
+
+    return {
+        "cnpj_contratado": cnpj_contratado,
+        "cpf_contratado": cpf_contratado
+    }
+
+
+def fake_cpf(rng: random.Random) -> str:
+    """CPF formatado com dígitos verificadores válidos."""
+    digits = [rng.randint(0, 9) for _ in range(9)]
+    for size in (9, 10):
+        check = sum(d * w for d, w in zip(digits, range(size + 1, 1, -1))) * 10 % 11
+        digits.append(0 if check == 10 else check)
+    d = "".join(map(str, digits))
+    return f"{d[:3]}.{d[3:6]}.{d[6:9]}-{d[9:]}"
+
+
+def synthetic_first_pages(pages: int, seed: int = 42) -> list[str]:
+    """Primeiras páginas de contrato: qualificação da contratante, da contratada e cláusulas."""
+    rng = random.Random(seed)
+    bodies = synthetic_pages(pages, seed)
+    out = []
+    for body in bodies:
+        contractor = (f"CONTRATANTE: FUNDAÇÃO BIOPARK, inscrita no CNPJ sob nº {SYNTHETIC_CONTRACTOR_CNPJ}, "
+                      f"neste ato representada por seu diretor, inscrito no CPF sob nº {fake_cpf(rng)}.")
+        if rng.random() < 0.7:
+            party = (f"CONTRATADA: EMPRESA {rng.randint(1, 999)} LTDA, inscrita no CNPJ sob nº {fake_cnpj(rng)}, "
+                     f"representada por seu sócio, CPF {fake_cpf(rng)}.")
+        else:
+            party = f"CONTRATADO: pessoa física, inscrita no CPF sob nº {fake_cpf(rng)}."
+        out.append(f"CONTRATO DE EMPRESA ASSOCIADA\n\n{contractor}\n\n{party}\n\n{body}")
+    return out
+
+
+def throughput(fn, payload, megabytes: float, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(payload)
+        best = min(best, time.perf_counter() - t0)
+    return megabytes / best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--folder", type=Path, default=Path("../Data"))
+    parser.add_argument("--synthetic-pages", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    pages = load_pdf_texts(args.folder) if args.folder.exists() else []
+    contractor_cnpjs = None
+    if sum(len(p) for p in pages) < 200_000:
+        print("Pouco texto nos PDFs; usando corpus sintético.")
+        pages = synthetic_first_pages(args.synthetic_pages)
+        contractor_cnpjs = (re.sub(r'\D', '', SYNTHETIC_CONTRACTOR_CNPJ),)
+
+    paragraphs = [p for page in pages for p in re.split(r'\n\s*\n', page)]
+    megabytes = sum(len(p.encode("utf-8")) for p in pages) / 1e6
+    print(f"Corpus: {len(pages)} páginas, {len(paragraphs)} parágrafos, {megabytes:.2f} MB\n")
+
+    same_text = [legacy_clean_text(p) for p in paragraphs] == TextProcessor.clean_texts(paragraphs)
+    legacy_keys = [legacy_extract_contractor_keys(p) for p in pages]
+    new_keys = TextProcessor.extract_contractor_keys_many(pages, contractor_cnpjs)
+    changed = sum(1 for a, b in zip(legacy_keys, new_keys) if a != b)
+
+    rows = [
+        ("clean_text (parágrafo)", lambda ps: [legacy_clean_text(p) for p in ps],
+         lambda ps: [TextProcessor.clean_text(p) for p in ps], paragraphs),
+        ("clean_texts (lote)", lambda ps: [legacy_clean_text(p) for p in ps],
+         TextProcessor.clean_texts, paragraphs),
+        ("extração de CNPJ/CPF", lambda ps: [legacy_extract_contractor_keys(p) for p in ps],
+         lambda ps: TextProcessor.extract_contractor_keys_many(ps, contractor_cnpjs), pages),
+    ]
+    print(f"{'etapa':<24} {'original MB/s':>14} {'atual MB/s':>11} {'ganho':>7}")
+    for name, legacy_fn, new_fn, payload in rows:
+        old = throughput(legacy_fn, payload, megabytes, args.repeat)
+        new = throughput(new_fn, payload, megabytes, args.repeat)
+        print(f"{name:<24} {old:>14.1f} {new:>11.1f} {new / old:>6.2f}x")
+
+    print(f"\nclean_text idêntico ao original: {same_text}")
+    print(f"Páginas com chaves diferentes do original: {changed}/{len(pages)}")
+
+
+if __name__ == "__main__":
+    main()
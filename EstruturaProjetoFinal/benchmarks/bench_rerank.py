@@ -0,0 +1,154 @@
+"""
+Benchmark da busca em duas etapas: top-k direto do índice (como antes, k=6)
+contra candidatos largos + reranking local (BM25 + cosseno + MMR).
+
+Uso (a partir de EstruturaProjetoFinal/):
+    python -m benchmarks.bench_rerank --queries 500 --candidates 30 --top-k 6
+
+Roda offline: corpus sintético de cláusulas contratuais e embeddings falsos
+(saco de palavras projetado + ruído, imitando um modelo que erra termos
+exatos como valores e prazos). Cada pergunta é gerada a partir de um chunk,
+que é o único relevante. Reporta recall@k, tokens de contexto (estimados, a
+menos que `--tokenizer tiktoken`) e latência.
+"""
+import argparse
+import random
+import time
+import zlib
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from src.config.settings import settings
+from src.core.tokens import count_tokens
+from src.rag.rerank import Candidate, Reranker, tokenize
+
+TOPICS = {
+    "pagamento": "pagamento valor mensal boleto vencimento reajuste igpm fatura nota fiscal",
+    "rescisao": "rescisão denúncia aviso prévio inadimplemento encerramento antecipado notificação",
+    "multa": "multa penalidade cláusula penal juros mora correção monetária infração",
+    "vigencia": "vigência prazo renovação automática término aditivo prorrogação período",
+    "foro": "foro comarca toledo eleição litígio jurisdição controvérsia",
+    "uso": "uso espaço sala laboratório estacionamento auditório horário acesso",
+    "confidencialidade": "confidencialidade sigilo informações dados terceiros divulgação proteção",
+}
+FILLER = ("contrato parte contratante contratada associada parque tecnológico obrigações "
+          "presente instrumento condições termos acordo cláusula").split()
+
+
+@dataclass
+class Chunk:
+    page_content: str
+    metadata: dict = field(default_factory=dict)
+
+
+def build_corpus(documents: int, chunks_per_doc: int, rng: random.Random) -> list[Chunk]:
+    corpus = []
+    topics = list(TOPICS)
+    for d in range(documents):
+        for c in range(chunks_per_doc):
+            topic = rng.choice(topics)
+            words = rng.choices(TOPICS[topic].split(), k=rng.randint(8, 14)) + rng.choices(FILLER, k=rng.randint(20, 40))
+            # termos exatos que o embedding representa mal
+            words += [f"{rng.randint(1, 90)} dias", f"R$ {rng.randint(100, 99999)},00", f"item{rng.randint(1, 400)}"]
+            rng.shuffle(words)
+            corpus.append(Chunk(" ".join(words), {"source_file": f"doc{d}", "chunk": c}))
+    return corpus
+
+
+class FakeEmbeddings:
+    """Projeção aleatória do saco de palavras + ruído gaussiano (normalizado)."""
+
+    def __init__(self, dim: int, noise: float, seed: int = 7):
+        self.dim = dim
+        self.noise = noise
+        self.seed = seed
+        self._vectors: dict[str, np.ndarray] = {}
+
+    def _word(self, token: str) -> np.ndarray:
+        if token not in self._vectors:
+            rng = np.random.default_rng(zlib.crc32(f"{self.seed}:{token}".encode()))
+            self._vectors[token] = rng.standard_normal(self.dim).astype(np.float32)
+        return self._vectors[token]
+
+    def embed(self, text: str, rng: np.random.Generator) -> np.ndarray:
+        tokens = tokenize(text)
+        v = sum((self._word(t) for t in tokens), np.zeros(self.dim, dtype=np.float32))
+        v = v / (np.linalg.norm(v) or 1.0)
+        v = v + self.noise * rng.standard_normal(self.dim).astype(np.float32) / np.sqrt(self.dim)
+        return v / (np.linalg.norm(v) or 1.0)
+
+
+def make_query(chunk: Chunk, rng: random.Random) -> str:
+    tokens = chunk.page_content.split()
+    specific = [t for t in tokens if t.startswith("item") or t.endswith(",00")]
+    picked = rng.sample(tokens, k=min(5, len(tokens))) + rng.sample(specific, k=min(1, len(specific)))
+    return "qual " + " ".join(picked) + "?"
+
+
+def percentile(values: list[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--documents", type=int, default=40)
+    parser.add_argument("--chunks-per-doc", type=int, default=25)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--candidates", type=int, default=30)
+    parser.add_argument("--top-k", type=int, default=6)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--noise", type=float, default=0.6)
+    parser.add_argument("--token-budget", type=int, default=3000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--tokenizer", choices=("estimate", "tiktoken"), default="estimate",
+                        help="tiktoken baixa o BPE da OpenAI na primeira vez")
+    args = parser.parse_args()
+    settings.TOKEN_COUNTER = args.tokenizer
+
+    rng = random.Random(args.seed)
+    np_rng = np.random.default_rng(args.seed)
+    corpus = build_corpus(args.documents, args.chunks_per_doc, rng)
+    embedder = FakeEmbeddings(args.dim, args.noise)
+    matrix = np.stack([embedder.embed(c.page_content, np_rng) for c in corpus])
+    reranker = Reranker()
+    position = {id(c): i for i, c in enumerate(corpus)}
+
+    ks = sorted({1, 3, args.top_k})
+    hits = {"baseline": dict.fromkeys(ks, 0), "rerank": dict.fromkeys(ks, 0)}
+    tokens = {"baseline": 0, "rerank": 0}
+    latency = {"baseline": [], "rerank": []}
+
+    targets = rng.choices(range(len(corpus)), k=args.queries)
+    for target in targets:
+        query = make_query(corpus[target], rng)
+        q = embedder.embed(query, np_rng)
+
+        t0 = time.perf_counter()
+        scores = matrix @ q
+        order = np.argsort(-scores)
+        latency["baseline"].append((time.perf_counter() - t0) * 1000)
+        baseline = [int(i) for i in order[:args.top_k]]
+
+        wide = order[:args.candidates]
+        candidates = [Candidate(corpus[i], matrix[i], float(scores[i])) for i in wide]
+        t0 = time.perf_counter()
+        chosen = reranker.rerank(query, q, candidates, k=args.top_k, token_budget=args.token_budget)
+        latency["rerank"].append((time.perf_counter() - t0) * 1000)
+        reranked = [position[id(doc)] for doc in chosen]
+
+        for label, ranked in (("baseline", baseline), ("rerank", reranked)):
+            for k in ks:
+                hits[label][k] += target in ranked[:k]
+            tokens[label] += sum(count_tokens(corpus[i].page_content) for i in ranked)
+
+    n = len(targets)
+    print(f"Corpus: {len(corpus)} chunks | {n} perguntas | candidatos: {args.candidates} | top-k: {args.top_k}")
+    for label in ("baseline", "rerank"):
+        recall = " ".join(f"recall@{k}={hits[label][k] / n:.3f}" for k in ks)
+        print(f"[{label:8}] {recall} | tokens/pergunta={tokens[label] / n:.0f} | "
+              f"p50={percentile(latency[label], 50):.2f} ms p95={percentile(latency[label], 95):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Substitutos locais e determinísticos das APIs externas, para os benchmarks
+rodarem sem contas da OpenAI, Pinecone e LlamaParse:
+- FakeEmbeddings: projeção esparsa das palavras (textos parecidos -> vetores próximos)
+- FakeStreamingChatModel: LLM de chat que transmite tokens com latência configurável
+- FakeOCRBackend: texto sintético de contrato para páginas sem camada de texto
+
+Todos aceitam latências artificiais para imitar a rede; com latência zero
+medem só o custo do código do projeto.
+"""
+import asyncio
+import random
+import re
+import threading
+import time
+import zlib
+from typing import Any, AsyncIterator, Iterator
+
+import numpy as np
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel, agenerate_from_stream, generate_from_stream
+from langchain_core.messages import AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+
+from src.ingestion.ocr import OCRBackend
+
+_WORD = re.compile(r"\w+")
+
+
+class FakeEmbeddings(Embeddings):
+    """
+    Cada palavra soma ±1 em `nonzero` posições fixas (hash da palavra): a
+    similaridade entre textos acompanha as palavras em comum, como num
+    modelo real de embeddings, sem guardar uma matriz de vocabulário.
+    """
+
+    def __init__(self, dimensions: int, latency: float = 0.0, latency_per_text: float = 0.0,
+                 nonzero: int = 8, seed: int = 7):
+        self.dimensions = dimensions
+        self.latency = latency
+        self.latency_per_text = latency_per_text
+        self.nonzero = nonzero
+        self.seed = seed
+        self._features: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.texts = 0
+
+    def _feature(self, word: str) -> tuple[np.ndarray, np.ndarray]:
+        feature = self._features.get(word)
+        if feature is None:
+            rng = np.random.default_rng(zlib.crc32(f"{self.seed}:{word}".encode()))
+            feature = (rng.integers(0, self.dimensions, self.nonzero),
+                       rng.choice(np.array([-1.0, 1.0], dtype=np.float32), self.nonzero))
+            self._features[word] = feature
+        return feature
+
+    def _embed(self, text: str) -> list[float]:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        features = [self._feature(word) for word in _WORD.findall(text.lower())]
+        if features:
+            np.add.at(vector, np.concatenate([f[0] for f in features]), np.concatenate([f[1] for f in features]))
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            vector[0] = norm = 1.0
+        return (vector / norm).tolist()
+
+    def _call(self, count: int) -> None:
+        with self._lock:
+            self.calls += 1
+            self.texts += count
+        delay = self.latency + self.latency_per_text * count
+        if delay > 0:
+            time.sleep(delay)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self._call(len(texts))
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        self._call(1)
+        return self._embed(text)
+
+
+class FakeStreamingChatModel(BaseChatModel):
+    """
+    Modelo de chat que responde com palavras sorteadas do próprio prompt
+    (semente = hash do prompt, resposta reprodutível). Espera
+    `first_token_latency` antes do primeiro token e `token_latency` entre os
+    seguintes; com `streaming=True` o `invoke` também passa pelos callbacks
+    de token, como o ChatOpenAI(streaming=True) usado pelo /ask.
+    """
+
+    first_token_latency: float = 0.3
+    token_latency: float = 0.02
+    answer_tokens: int = 60
+    streaming: bool = True
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-streaming-chat"
+
+    def _tokens(self, messages: list[BaseMessage]) -> list[str]:
+        prompt = "\n".join(str(m.content) for m in messages)
+        words = _WORD.findall(prompt) or ["resposta"]
+        rng = random.Random(zlib.crc32(prompt.encode()))
+        return [(" " if i else "") + rng.choice(words) for i in range(self.answer_tokens)]
+
+    def _stream(self, messages: list[BaseMessage], stop: list[str] | None = None,
+                run_manager: CallbackManagerForLLMRun | None = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.first_token_latency)
+        for i, token in enumerate(self._tokens(messages)):
+            if i and self.token_latency:
+                time.sleep(self.token_latency)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages: list[BaseMessage], stop: list[str] | None = None,
+                       run_manager: AsyncCallbackManagerForLLMRun | None = None,
+                       **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.first_token_latency)
+        for i, token in enumerate(self._tokens(messages)):
+            if i and self.token_latency:
+                await asyncio.sleep(self.token_latency)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    def _generate(self, messages: list[BaseMessage], stop: list[str] | None = None,
+                  run_manager: CallbackManagerForLLMRun | None = None, **kwargs: Any) -> ChatResult:
+        return generate_from_stream(self._stream(messages, stop, run_manager, **kwargs))
+
+    async def _agenerate(self, messages: list[BaseMessage], stop: list[str] | None = None,
+                         run_manager: AsyncCallbackManagerForLLMRun | None = None, **kwargs: Any) -> ChatResult:
+        return await agenerate_from_stream(self._astream(messages, stop, run_manager, **kwargs))
+
+
+CLAUSES = (
+    "O pagamento do valor mensal de R$ {valor},00 vence todo dia {dia}, reajustado anualmente pelo IGP-M.",
+    "A rescisão antecipada exige aviso prévio de {prazo} dias, sob pena de multa de {multa}% do valor do contrato.",
+    "O prazo de vigência é de {meses} meses, com renovação automática salvo manifestação contrária.",
+    "A CONTRATADA terá acesso à sala {sala} e ao estacionamento em horário comercial.",
+    "As partes manterão sigilo sobre as informações trocadas durante a vigência deste instrumento.",
+    "Fica eleito o foro da comarca de Toledo/PR para dirimir quaisquer controvérsias.",
+)
+
+
+def fake_cnpj(rng: random.Random) -> str:
+    """CNPJ formatado com dígitos verificadores válidos."""
+    digits = [rng.randint(0, 9) for _ in range(8)] + [0, 0, 0, 1]
+    for weights in ([5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2], [6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]):
+        rest = sum(d * w for d, w in zip(digits, weights)) % 11
+        digits.append(0 if rest < 2 else 11 - rest)
+    d = "".join(map(str, digits))
+    return f"{d[:2]}.{d[2:5]}.{d[5:8]}/{d[8:12]}-{d[12:]}"
+
+
+class FakeOCRBackend(OCRBackend):
+    """Cláusulas sintéticas por página (semente = arquivo + página); a primeira página traz o CNPJ da contratada."""
+    name = "fake"
+
+    def __init__(self, latency_per_page: float = 0.0):
+        self.latency_per_page = latency_per_page
+
+    def ocr_pages(self, path: str, page_numbers: list[int]) -> dict[int, str]:
+        if self.latency_per_page:
+            time.sleep(self.latency_per_page * len(page_numbers))
+        return {number: self.page_text(path, number) for number in page_numbers}
+
+    @staticmethod
+    def page_text(path: str, number: int) -> str:
+        rng = random.Random(zlib.crc32(f"{path}:{number}".encode()))
+        paragraphs = []
+        if number == 0:
+            paragraphs.append(f"CONTRATO DE EMPRESA ASSOCIADA\n\nCONTRATADA: inscrita no CNPJ sob nº {fake_cnpj(rng)}.")
+        for _ in range(rng.randint(6, 12)):
+            paragraphs.append(rng.choice(CLAUSES).format(
+                valor=rng.randint(500, 20000), dia=rng.randint(1, 28), prazo=rng.choice((30, 60, 90)),
+                multa=rng.randint(2, 20), meses=rng.choice((12, 24, 36)), sala=rng.randint(100, 400)))
+        return "\n\n".join(paragraphs)
@@ -0,0 +1,233 @@
+"""
+
+Armazena as Configurações Globais:
+É a classe central que carrega todos os parâmetros necessários para o funcionamento do sistema RAG, como:
+
+1) Chaves de API
+2) Modelos de LLM
+3) Configurações de chunking
+4) Configurações de desempenho da indexação
+
+"""
+
+
+
+
+from dotenv import load_dotenv
+from pathlib import Path
+import os
+
+
+load_dotenv()
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+
+class Settings:
+
+    OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+    LLM_MODEL = os.getenv("LLM_MODEL", "gpt-3.5-turbo")
+    TEMPERATURE = float(os.getenv("TEMPERATURE", 0.2))
+
+
+    PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
+    PINECONE_ENVIRONMENT = os.getenv("PINECONE_ENVIRONMENT")
+    PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME")
+
+    """
+    Backend Vetorial:
+    VECTOR_BACKEND = "pinecone" (serviço remoto) ou "local" (no próprio processo, sem rede).
+    O backend local guarda os vetores em shards float32 mapeados em memória (LOCAL_VECTOR_SHARD_ROWS linhas cada)
+    em LOCAL_VECTOR_DIR/<nome do índice>, com busca exata em NumPy. Com LOCAL_VECTOR_ANN = "ivf", a partir de
+    LOCAL_VECTOR_ANN_MIN_ROWS vetores a busca visita só as LOCAL_VECTOR_IVF_NPROBE listas mais próximas.
+    """
+    VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone").lower()
+    LOCAL_VECTOR_DIR = Path(os.getenv("LOCAL_VECTOR_DIR", BASE_DIR / "vector_store"))
+    LOCAL_VECTOR_SHARD_ROWS = int(os.getenv("LOCAL_VECTOR_SHARD_ROWS", 16384))
+    LOCAL_VECTOR_ANN = os.getenv("LOCAL_VECTOR_ANN", "none").lower()
+    LOCAL_VECTOR_ANN_MIN_ROWS = int(os.getenv("LOCAL_VECTOR_ANN_MIN_ROWS", 50000))
+    LOCAL_VECTOR_IVF_NPROBE = int(os.getenv("LOCAL_VECTOR_IVF_NPROBE", 8))
+
+    """
+    Compactação do Índice Local:
+    Armazenamento dos vetores: "float32", "float16" (metade) ou "int8" (um quarto). Nos compactos,
+    LOCAL_VECTOR_RESCORE guarda a cópia float32 no disco e reordena em precisão total os
+    LOCAL_VECTOR_RESCORE_FACTOR * top_k melhores candidatos (ver benchmarks/bench_compression.py).
+    """
+    LOCAL_VECTOR_DTYPE = os.getenv("LOCAL_VECTOR_DTYPE", "float32").lower()
+    LOCAL_VECTOR_RESCORE = os.getenv("LOCAL_VECTOR_RESCORE", "true").lower() in ("1", "true", "yes")
+    LOCAL_VECTOR_RESCORE_FACTOR = int(os.getenv("LOCAL_VECTOR_RESCORE_FACTOR", 4))
+
+    LLAMA_CLOUD_API_KEY = os.getenv("LLAMA_CLOUD_API_KEY")
+
+    """
+    Modelo de Embedding:
+    Define o modelo da OpenAI usado para transformar o texto em vetores numéricos (embeddings).
+    EMBEDDING_DIMENSIONS é a dimensão dos vetores gravados (vazio = nativa do modelo, 3072 no
+    text-embedding-3-large). Menor que a nativa: o vetor é truncado e renormalizado (Matryoshka, equivalente
+    ao parâmetro `dimensions` da API), a partir do embedding completo em cache. Mudar a dimensão reindexa
+    todos os PDFs e exige um índice novo (PINECONE_INDEX_NAME), pois o índice tem dimensão fixa.
+    """
+    EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-large")
+    EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS") or 0) or None
+
+
+    """
+    Caminho dos Arquivos: Define o caminho da pasta onde os PDFs que serão indexados estão localizados
+    """
+    PDF_FOLDER = Path(os.getenv("PDF_FOLDER", "./Documentos"))
+
+    """
+    Parâmetros de Chunking:
+    Controla o tamanho máximo de cada pedaço de texto (chunk) e o tamanho da sobreposição entre chunks adjacentes, crucial para manter o contexto.
+    """
+    CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", 750)) # esta em 1500
+    CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", 150)) # estava em 200
+
+    """
+    Leitura dos PDFs:
+    As primeiras PDF_PROBE_PAGES páginas decidem se o PDF é digital (mais de PDF_MIN_TEXT_CHARS caracteres) ou escaneado.
+    Num PDF digital, páginas com menos de PDF_MIN_PAGE_CHARS caracteres vão para o OCR.
+    Depois da amostra, o PDF é lido em lotes de PDF_PAGE_BATCH páginas (memória constante por arquivo).
+    """
+    PDF_PROBE_PAGES = int(os.getenv("PDF_PROBE_PAGES", 3))
+    PDF_PAGE_BATCH = int(os.getenv("PDF_PAGE_BATCH", 16))
+    PDF_MIN_TEXT_CHARS = int(os.getenv("PDF_MIN_TEXT_CHARS", 100))
+    PDF_MIN_PAGE_CHARS = int(os.getenv("PDF_MIN_PAGE_CHARS", 20))
+
+    """
+    Contratante (Biopark):
+    CNPJ(s) da contratante, separados por vírgula (formatados ou só dígitos). Nunca viram o CNPJ do contratado,
+    mesmo aparecendo antes dele na primeira página; números logo após "BIOPARK"/"PARQUE CIENTÍFICO" também são ignorados.
+    """
+    CONTRACTOR_CNPJ = tuple(
+        "".join(filter(str.isdigit, c)) for c in os.getenv("CONTRACTOR_CNPJ", "").split(",") if c.strip())
+
+    """
+    OCR:
+    Backend usado para páginas escaneadas: "llamaparse" (nuvem) ou "tesseract" (local, offline, em pool de processos).
+    O texto de cada página fica em cache pelo hash do conteúdo da página.
+    """
+    OCR_BACKEND = os.getenv("OCR_BACKEND", "llamaparse").lower()
+    OCR_LANGUAGE = os.getenv("OCR_LANGUAGE", "por")
+    OCR_DPI = int(os.getenv("OCR_DPI", 300))
+    OCR_WORKERS = int(os.getenv("OCR_WORKERS", os.cpu_count() or 1))
+    OCR_CACHE_DB = Path(os.getenv("OCR_CACHE_DB", BASE_DIR / "ocr_cache.db"))
+
+    """
+    Busca Léxica (/search_pdf):
+    Índice FTS5 com o texto das páginas, sem acentos. Novos PDFs na pasta entram no índice por um sync em
+    segundo plano, disparado no máximo a cada LEXICAL_SYNC_INTERVAL segundos.
+    """
+    LEXICAL_INDEX_DB = Path(os.getenv("LEXICAL_INDEX_DB", BASE_DIR / "lexical_index.db"))
+    LEXICAL_SYNC_INTERVAL = int(os.getenv("LEXICAL_SYNC_INTERVAL", 60))
+
+    """
+    Cache de Texto Extraído (/preview_pdf e busca):
+    Texto das páginas comprimido em disco por hash do arquivo, com LRU em memória limitado por caracteres.
+    PREVIEW_MAX_PAGES é o tamanho máximo de cada bloco do preview (0 = sem limite): o site pede o
+    primeiro bloco ao selecionar o PDF e os seguintes sob demanda, usando o page_count da resposta.
+    """
+    TEXT_CACHE_DB = Path(os.getenv("TEXT_CACHE_DB", BASE_DIR / "text_cache.db"))
+    TEXT_CACHE_MEMORY_CHARS = int(os.getenv("TEXT_CACHE_MEMORY_CHARS", 20_000_000))
+    PREVIEW_MAX_PAGES = int(os.getenv("PREVIEW_MAX_PAGES", 20))
+
+    """
+    Concorrência da Indexação:
+    INDEX_CONCURRENCY = 1 mantém o modo sequencial. Acima de 1 ativa o modo em pipeline, com um pool de
+    INDEX_CONCURRENCY processos para leitura/split dos PDFs (CPU) e INDEX_IO_WORKERS threads para
+    verificação/embedding/upsert (rede), ligados por filas limitadas.
+    """
+    INDEX_CONCURRENCY = int(os.getenv("INDEX_CONCURRENCY", 1))
+    INDEX_IO_WORKERS = int(os.getenv("INDEX_IO_WORKERS", 4))
+    INDEX_QUEUE_SIZE = int(os.getenv("INDEX_QUEUE_SIZE", 8))
+
+    """
+    Estado Local da Indexação:
+    Banco SQLite (ao lado do advogados.db) com o manifesto dos PDFs já indexados (hash, tamanho, mtime, IDs dos chunks).
+    """
+    INDEX_STATE_DB = Path(os.getenv("INDEX_STATE_DB", BASE_DIR / "index_state.db"))
+
+    """
+    Filtro por Nome de Arquivo (/ask):
+    SOURCE_CATALOG_TTL é o intervalo (segundos) entre checagens da versão do catálogo de source_file
+    (0 = checa a cada consulta). FUZZY_MATCH_THRESHOLD é a nota mínima (token_sort_ratio, 0-100) para
+    aceitar o nome de arquivo digitado.
+    """
+    SOURCE_CATALOG_TTL = float(os.getenv("SOURCE_CATALOG_TTL", 30))
+    FUZZY_MATCH_THRESHOLD = float(os.getenv("FUZZY_MATCH_THRESHOLD", 65))
+
+    """
+    Jobs de Indexação (POST /index):
+    A indexação roda em segundo plano, um job por vez, registrado no INDEX_STATE_DB.
+    O job renova um heartbeat a cada INDEX_JOB_HEARTBEAT segundos; sem heartbeat por
+    INDEX_JOB_STALE_AFTER segundos (processo encerrado), outro job pode ser iniciado.
+    """
+    INDEX_JOB_HEARTBEAT = float(os.getenv("INDEX_JOB_HEARTBEAT", 5))
+    INDEX_JOB_STALE_AFTER = float(os.getenv("INDEX_JOB_STALE_AFTER", 60))
+
+    """
+    Cache de Embeddings:
+    SQLite em disco com os vetores já calculados (chave = modelo + texto) e um LRU em memória na frente.
+    """
+    EMBEDDING_CACHE_DB = Path(os.getenv("EMBEDDING_CACHE_DB", BASE_DIR / "embedding_cache.db"))
+    EMBEDDING_CACHE_MEMORY_ITEMS = int(os.getenv("EMBEDDING_CACHE_MEMORY_ITEMS", 2000))
+
+    """
+    Lotes de Embedding/Upsert:
+    Chunks de vários arquivos são agrupados em lotes limitados por tokens e por quantidade de vetores.
+    O upsert no Pinecone é feito em sub-lotes, com retry.
+    TOKEN_COUNTER = "tiktoken" conta os tokens com o encoding da OpenAI (o arquivo BPE é baixado na
+    primeira vez); "estimate" usa ~4 caracteres por token, sem rede. Sem o BPE, cai na estimativa.
+    """
+    TOKEN_COUNTER = os.getenv("TOKEN_COUNTER", "tiktoken").lower()
+    EMBED_BATCH_MAX_TOKENS = int(os.getenv("EMBED_BATCH_MAX_TOKENS", 100000))
+    EMBED_BATCH_MAX_VECTORS = int(os.getenv("EMBED_BATCH_MAX_VECTORS", 512))
+    UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", 100))
+    UPSERT_MAX_RETRIES = int(os.getenv("UPSERT_MAX_RETRIES", 3))
+
+    """
+    Cache de Busca do RAG:
+    LRU de resultados por (filtro, embedding da pergunta) e PDFs fixados em memória ao abrir o preview.
+    """
+    RETRIEVAL_CACHE_ITEMS = int(os.getenv("RETRIEVAL_CACHE_ITEMS", 512))
+    RETRIEVAL_PINNED_DOCS = int(os.getenv("RETRIEVAL_PINNED_DOCS", 16))
+
+    """
+    Reranking e Contexto:
+    A busca traz RERANK_CANDIDATES chunks; o reranking local (BM25 + cosseno + MMR) escolhe até
+    RERANK_TOP_K. O contexto (sem cabeçalhos repetidos, chunks vizinhos fundidos) é limitado a
+    CONTEXT_TOKEN_BUDGET tokens.
+    """
+    RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", 30))
+    RERANK_TOP_K = int(os.getenv("RERANK_TOP_K", 6))
+    RERANK_ALPHA = float(os.getenv("RERANK_ALPHA", 0.7))
+    RERANK_MMR_LAMBDA = float(os.getenv("RERANK_MMR_LAMBDA", 0.7))
+    CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 3000))
+
+    """
+    Streaming Assíncrono (/ask_stream, servidor ASGI):
+    Máximo de gerações simultâneas por processo e quanto tempo uma requisição espera por vaga antes do 503.
+    """
+    ASK_MAX_CONCURRENCY = int(os.getenv("ASK_MAX_CONCURRENCY", 200))
+    ASK_QUEUE_TIMEOUT = float(os.getenv("ASK_QUEUE_TIMEOUT", 10))
+
+    """
+    Cache de Respostas do /ask:
+    Respostas reaproveitadas para perguntas quase iguais (cosseno dos embeddings) sobre o mesmo filtro.
+    Entradas expiram pelo TTL ou quando algum arquivo do contexto é reindexado. TTL 0 desativa o cache.
+    """
+    ANSWER_CACHE_DB = Path(os.getenv("ANSWER_CACHE_DB", BASE_DIR / "answer_cache.db"))
+    ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", 24 * 3600))
+    ANSWER_CACHE_MIN_SIMILARITY = float(os.getenv("ANSWER_CACHE_MIN_SIMILARITY", 0.97))
+
+
+
+
+
+
+"""
+Instância Global:
+Cria uma instância única da classe Settings para que as configurações possam ser importadas e acessadas facilmente em qualquer outro script.
+"""
+
+settings = Settings()
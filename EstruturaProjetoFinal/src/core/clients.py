@@ -0,0 +1,152 @@
+import logging
+import threading
+import time
+from typing import Any, Callable
+
+from langchain_community.chat_models import ChatOpenAI
+from langchain_pinecone import PineconeVectorStore
+from pinecone import Pinecone as PineconeClient, ServerlessSpec
+
+from src.config.settings import settings
+from src.core.embedding_cache import build_cached_embeddings, embedding_dimensions
+from src.search.vector_index import LocalVectorIndex
+
+
+class ClientRegistry:
+    """
+    Clientes externos criados uma única vez por processo (embeddings, Pinecone,
+    vector store, LLM). Reaproveitar as instâncias mantém os pools de conexão
+    HTTP abertos entre requisições e threads, em vez de pagar a criação do
+    cliente (e o describe_index do Pinecone) a cada chamada.
+    O índice vetorial vem de settings.VECTOR_BACKEND: Pinecone ou LocalVectorIndex
+    (mesma interface), sem mudança no código que o usa.
+    """
+
+    def __init__(self, logger: logging.Logger | None = None):
+        self.logger = logger or logging.getLogger(__name__)
+        self._lock = threading.RLock()
+        self._instances: dict[str, Any] = {}
+
+    def _get(self, key: str, factory: Callable[[], Any]) -> Any:
+        instance = self._instances.get(key)
+        if instance is None:
+            with self._lock:
+                instance = self._instances.get(key)
+                if instance is None:
+                    instance = factory()
+                    self._instances[key] = instance
+        return instance
+
+    def override(self, key: str, instance: Any) -> None:
+        """
+        Usa `instance` no lugar do cliente criado pela fábrica ("embeddings",
+        "llm", "index:<nome>"...). Os benchmarks trocam assim as APIs externas
+        por implementações locais sem mudar o código que usa o registro.
+        """
+        with self._lock:
+            self._instances[key] = instance
+
+    def reset(self) -> None:
+        """Descarta todas as instâncias (a próxima chamada cria de novo)."""
+        with self._lock:
+            self._instances.clear()
+
+    def embeddings(self):
+        """OpenAIEmbeddings com o cache persistente de embeddings."""
+        return self._get("embeddings", build_cached_embeddings)
+
+    def pinecone(self) -> PineconeClient:
+        return self._get("pinecone", lambda: PineconeClient(
+            api_key=settings.PINECONE_API_KEY, environment=settings.PINECONE_ENVIRONMENT))
+
+    @staticmethod
+    def _index_name(index_name: str | None) -> str:
+        return index_name or settings.PINECONE_INDEX_NAME or "default"
+
+    def index(self, index_name: str | None = None):
+        name = self._index_name(index_name)
+        if settings.VECTOR_BACKEND == "local":
+            return self._get(f"index:{name}", lambda: LocalVectorIndex(
+                settings.LOCAL_VECTOR_DIR / name,
+                dimension=embedding_dimensions(),
+                shard_rows=settings.LOCAL_VECTOR_SHARD_ROWS,
+                dtype=settings.LOCAL_VECTOR_DTYPE,
+                rescore=settings.LOCAL_VECTOR_RESCORE,
+                rescore_factor=settings.LOCAL_VECTOR_RESCORE_FACTOR,
+                ann=settings.LOCAL_VECTOR_ANN,
+                ann_min_rows=settings.LOCAL_VECTOR_ANN_MIN_ROWS,
+                nprobe=settings.LOCAL_VECTOR_IVF_NPROBE,
+                logger=self.logger,
+            ))
+        return self._get(f"index:{name}", lambda: self.pinecone().Index(name))
+
+    def ensure_index(self, index_name: str | None, dimension: int) -> None:
+        """Cria o índice no Pinecone se ainda não existe (o índice local é criado ao abrir)."""
+        if settings.VECTOR_BACKEND == "local":
+            return
+        name = self._index_name(index_name)
+        try:
+            existing = self.pinecone().list_indexes().names()
+        except Exception:
+            existing = []
+        if name not in existing:
+            self.logger.info(f"Criando índice Pinecone: {name}")
+            self.pinecone().create_index(
+                name=name,
+                dimension=dimension,
+                metric="cosine",
+                spec=ServerlessSpec(cloud='aws', region='us-east-1')
+            )
+
+    def vectorstore(self, index_name: str | None = None) -> PineconeVectorStore:
+        name = self._index_name(index_name)
+        return self._get(f"vectorstore:{name}", lambda: PineconeVectorStore(
+            index=self.index(name), embedding=self.embeddings(), text_key="text"))
+
+    def llm(self) -> ChatOpenAI:
+        return self._get("llm", lambda: ChatOpenAI(
+            model_name=settings.LLM_MODEL,
+            temperature=settings.TEMPERATURE,
+            streaming=True,  # Habilita o streaming (efeito digitação)
+            api_key=settings.OPENAI_API_KEY,
+        ))
+
+    def warm_up(self) -> None:
+        """Cria os clientes e abre a conexão com o índice antes da primeira requisição."""
+        t0 = time.perf_counter()
+        try:
+            self.embeddings()
+            self.llm()
+            self.index().describe_index_stats()
+            self.vectorstore()
+            self.logger.info(f"Clientes aquecidos em {time.perf_counter() - t0:.2f}s.")
+        except Exception as e:
+            self.logger.error(f"Falha no aquecimento dos clientes: {e}")
+
+    def health_check(self) -> dict:
+        """Estado de cada dependência, com a latência da checagem do índice vetorial."""
+        status: dict[str, Any] = {}
+        backend = "pinecone" if settings.VECTOR_BACKEND != "local" else "local_vector_index"
+        t0 = time.perf_counter()
+        try:
+            stats = self.index().describe_index_stats()
+            status[backend] = {
+                "ok": True,
+                "latency_ms": round((time.perf_counter() - t0) * 1000, 1),
+                "total_vectors": stats.get("total_vector_count"),
+            }
+        except Exception as e:
+            status[backend] = {"ok": False, "error": str(e)}
+        try:
+            status["embedding_cache"] = {"ok": True, **self.embeddings().cache.stats()}
+        except Exception as e:
+            status["embedding_cache"] = {"ok": False, "error": str(e)}
+        status["ok"] = all(v.get("ok") for v in status.values())
+        return status
+
+
+"""
+Instância Global:
+Um registro por processo, compartilhado por indexador, RAG e rotas web.
+"""
+registry = ClientRegistry()
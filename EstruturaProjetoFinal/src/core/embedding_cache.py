@@ -0,0 +1,195 @@
+import hashlib
+import math
+import threading
+from array import array
+from collections import OrderedDict
+
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+
+from src.config.settings import settings
+from src.core.metrics import metrics, span
+from src.core.sqlite_store import SQLiteStore
+
+
+# Dimensão nativa dos modelos de embedding da OpenAI
+NATIVE_DIMENSIONS = {
+    "text-embedding-3-large": 3072,
+    "text-embedding-3-small": 1536,
+    "text-embedding-ada-002": 1536,
+}
+
+
+def embedding_dimensions() -> int:
+    """Dimensão dos vetores gravados no índice (EMBEDDING_DIMENSIONS ou a nativa do modelo)."""
+    return settings.EMBEDDING_DIMENSIONS or NATIVE_DIMENSIONS.get(settings.EMBEDDING_MODEL, 3072)
+
+
+def embedding_signature() -> str:
+    """
+    Identifica os vetores do índice no manifesto: o modelo e, se truncada, a dimensão.
+    Mudar qualquer um dos dois faz o indexador regravar os arquivos.
+    """
+    model, dimensions = settings.EMBEDDING_MODEL, settings.EMBEDDING_DIMENSIONS
+    if not dimensions or dimensions == NATIVE_DIMENSIONS.get(model):
+        return model
+    return f"{model}@{dimensions}"
+
+
+def truncate_embedding(vector: list[float], dimensions: int | None) -> list[float]:
+    """Primeiras `dimensions` coordenadas, renormalizadas (embeddings Matryoshka)."""
+    if not dimensions or len(vector) <= dimensions:
+        return vector
+    head = vector[:dimensions]
+    norm = math.sqrt(sum(x * x for x in head)) or 1.0
+    return [x / norm for x in head]
+
+
+def _encode(vector: list[float]) -> bytes:
+    return array("f", vector).tobytes()
+
+
+def _decode(blob: bytes) -> list[float]:
+    values = array("f")
+    values.frombytes(blob)
+    return values.tolist()
+
+
+class EmbeddingCache(SQLiteStore):
+    """
+    Cache persistente de embeddings em dois níveis:
+    - LRU em memória (vetores guardados como bytes float32, ~12 KB cada para 3072 dimensões)
+    - SQLite em disco, chave = sha256(modelo + texto)
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS embeddings (
+        key    TEXT PRIMARY KEY,
+        model  TEXT NOT NULL,
+        dim    INTEGER NOT NULL,
+        vector BLOB NOT NULL
+    );
+    """
+
+    def __init__(self, db_path, memory_items: int = 2000):
+        super().__init__(db_path)
+        self.memory_items = memory_items
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self._memory_lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, model: str, texts: list[str]) -> list[list[float] | None]:
+        keys = [self.make_key(model, t) for t in texts]
+        found: dict[str, bytes] = {}
+        pending = []
+
+        with self._memory_lock:
+            for key in keys:
+                blob = self._memory.get(key)
+                if blob is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = blob
+                else:
+                    pending.append(key)
+            self.memory_hits += len(keys) - len(pending)
+
+        if pending:
+            unique = list(dict.fromkeys(pending))
+            for start in range(0, len(unique), 500):
+                batch = unique[start:start + 500]
+                marks = ",".join("?" * len(batch))
+                for row in self.query(f"SELECT key, vector FROM embeddings WHERE key IN ({marks})", tuple(batch)):
+                    found[row["key"]] = row["vector"]
+            disk_hits = sum(1 for k in pending if k in found)
+            with self._memory_lock:
+                self.disk_hits += disk_hits
+                self.misses += len(pending) - disk_hits
+                for key in unique:
+                    if key in found:
+                        self._remember(key, found[key])
+
+        return [_decode(found[k]) if k in found else None for k in keys]
+
+    def put_many(self, model: str, texts: list[str], vectors: list[list[float]]) -> None:
+        rows = []
+        with self._memory_lock:
+            for text, vector in zip(texts, vectors):
+                key = self.make_key(model, text)
+                blob = _encode(vector)
+                self._remember(key, blob)
+                rows.append((key, model, len(vector), blob))
+        with self.transaction() as conn:
+            conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows)
+
+    def _remember(self, key: str, blob: bytes) -> None:
+        # Chamado com _memory_lock adquirido
+        self._memory[key] = blob
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._memory_lock:
+            total = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / total if total else 0.0,
+            }
+
+
+EMBEDDED_TEXTS = metrics.counter("rag_embedding_texts_total", "Textos pedidos ao modelo de embeddings, por origem.",
+                                 ("source",))
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings com cache transparente: só os textos que não estão no cache
+    são enviados ao modelo, numa única chamada por lote.
+    O cache guarda o vetor completo; com `dimensions`, a saída é truncada, então
+    trocar a dimensão não exige recalcular nenhum embedding.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache, model: str, dimensions: int | None = None):
+        self.underlying = embeddings
+        self.cache = cache
+        self.model = model
+        self.dimensions = dimensions
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        vectors = self.cache.get_many(self.model, texts)
+        missing = list(dict.fromkeys(t for t, v in zip(texts, vectors) if v is None))
+        EMBEDDED_TEXTS.inc(len(texts) - len(missing), source="cache")
+        if missing:
+            EMBEDDED_TEXTS.inc(len(missing), source="api")
+            with span("embedding.api"):
+                computed = self.underlying.embed_documents(missing)
+            self.cache.put_many(self.model, missing, computed)
+            by_text = dict(zip(missing, computed))
+            vectors = [v if v is not None else by_text[t] for t, v in zip(texts, vectors)]
+        return [truncate_embedding(v, self.dimensions) for v in vectors]
+
+    def embed_query(self, text: str) -> list[float]:
+        cached = self.cache.get_many(self.model, [text])[0]
+        if cached is not None:
+            EMBEDDED_TEXTS.inc(source="cache")
+            return truncate_embedding(cached, self.dimensions)
+        EMBEDDED_TEXTS.inc(source="api")
+        with span("embedding.api"):
+            vector = self.underlying.embed_query(text)
+        self.cache.put_many(self.model, [text], [vector])
+        return truncate_embedding(vector, self.dimensions)
+
+
+def build_cached_embeddings() -> CachedEmbeddings:
+    """OpenAIEmbeddings do modelo configurado, atrás do cache persistente."""
+    cache = EmbeddingCache(settings.EMBEDDING_CACHE_DB, settings.EMBEDDING_CACHE_MEMORY_ITEMS)
+    return CachedEmbeddings(OpenAIEmbeddings(model=settings.EMBEDDING_MODEL), cache, settings.EMBEDDING_MODEL,
+                            dimensions=settings.EMBEDDING_DIMENSIONS)
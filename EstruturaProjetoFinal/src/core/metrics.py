@@ -0,0 +1,225 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+# Limites (segundos) dos histogramas: de 1 ms (SQLite, cache) a 60 s (OCR, geração longa)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """Contador monotônico por combinação de labels."""
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in items]
+
+
+class Histogram:
+    """Histograma cumulativo (formato Prometheus) por combinação de labels."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series: dict[tuple[str, ...], list] = {}  # labels -> [contagens por bucket, soma, total]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = sorted((key, ([*s[0]], s[1], s[2])) for key, s in self._series.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Métricas do processo, exportadas no formato texto do Prometheus (/metrics)."""
+
+    def __init__(self):
+        self._metrics: dict[str, Counter | Histogram] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, help: str, labelnames: tuple[str, ...], **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != labelnames:
+                raise ValueError(f"Métrica {name} já registrada com outro tipo ou labels")
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._get(Counter, name, help, labelnames)
+
+    def histogram(self, name: str, help: str, labelnames: tuple[str, ...] = (),
+                  buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+class RequestTimings:
+    """Tempo acumulado por etapa durante uma requisição (cabeçalho Server-Timing)."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._spans: dict[str, list] = {}  # nome -> [segundos, vezes], na ordem da primeira ocorrência
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            entry = self._spans.setdefault(name, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+    def as_dict(self) -> dict[str, float]:
+        """{etapa: ms}, com o total da requisição até agora."""
+        with self._lock:
+            data = {name: round(s * 1000, 2) for name, (s, _) in self._spans.items()}
+        data["total"] = round((time.perf_counter() - self.started) * 1000, 2)
+        return data
+
+    def server_timing(self) -> str:
+        with self._lock:
+            spans = list(self._spans.items())
+        parts = []
+        for name, (seconds, count) in spans:
+            part = f"{name};dur={seconds * 1000:.2f}"
+            if count > 1:
+                part += f';desc="{count}x"'
+            parts.append(part)
+        parts.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.2f}")
+        return ", ".join(parts)
+
+
+"""
+Instância Global:
+Registro de métricas do processo e o histograma de etapas (spans) alimentado
+pelo indexador, pelo RAG e pelas rotas web.
+"""
+metrics = MetricsRegistry()
+SPAN_SECONDS = metrics.histogram("rag_span_seconds", "Duração das etapas instrumentadas (spans).", ("span",))
+_request_timings: ContextVar[RequestTimings | None] = ContextVar("request_timings", default=None)
+
+
+def begin_request() -> tuple[RequestTimings, Token]:
+    """Abre a coleta de spans da requisição atual (contexto da thread ou da task asyncio)."""
+    timings = RequestTimings()
+    return timings, _request_timings.set(timings)
+
+
+def end_request(token: Token) -> None:
+    _request_timings.reset(token)
+
+
+def current_timings() -> RequestTimings | None:
+    return _request_timings.get()
+
+
+def record_span(name: str, seconds: float) -> None:
+    """Registra uma duração no histograma e, dentro de uma requisição, no detalhamento dela."""
+    SPAN_SECONDS.observe(seconds, span=name)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Mede o bloco como a etapa `name` (também quando ele levanta exceção)."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, time.perf_counter() - t0)
+
+
+def timed_iter(name: str, iterable: Iterable[T]) -> Iterator[T]:
+    """
+    Repassa os itens de um gerador medindo só o tempo gasto dentro dele
+    (o trabalho de quem consome fica de fora); registra um único span no fim.
+    """
+    iterator = iter(iterable)
+    elapsed = 0.0
+    try:
+        while True:
+            t0 = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                elapsed += time.perf_counter() - t0
+            yield item
+    finally:
+        record_span(name, elapsed)
@@ -1,5 +1,37 @@
 import re
-from typing import Dict
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List
+
+from src.config.settings import settings
+
+# Valores gravados quando o documento não tem CNPJ/CPF do contratado
+MISSING_CNPJ = "SEM_CNPJ"
+MISSING_CPF = "SEM_CPF"
+
+_NON_WORD = re.compile(r'\W')
+_NON_DIGIT = re.compile(r'\D')
+
+# Uma única passada da primeira página, da esquerda para a direita: sequências de dígitos
+# candidatas a CNPJ/CPF (com ou sem pontuação) e, entre uma e outra, as menções às partes.
+# O dígito verificador descarta sequências que não são documentos.
+_NUMBER_CANDIDATE = re.compile(r'\d[\d./-]{9,16}\d')
+_CNPJ_FORMAT = re.compile(r'\d{2}\.?\d{3}\.?\d{3}/?\d{4}-?\d{2}')
+_CPF_FORMAT = re.compile(r'\d{3}\.?\d{3}\.?\d{3}-?\d{2}')
+_PARTY_MENTION = re.compile(r'(?P<contractor>BIOPARK|PARQUE\s+CIENT)|(?P<party>CONTRATAD[AO])', re.IGNORECASE)
+# Distância máxima (caracteres) entre o nome da contratante e o CNPJ dela na qualificação
+_CONTRACTOR_REACH = 250
+
+_CNPJ_WEIGHTS = ((5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2), (6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2))
+
+
+@dataclass(frozen=True)
+class DocumentNumber:
+    """CNPJ/CPF válido encontrado no texto; `contractor` indica que é da contratante (Biopark) ou de um representante dela."""
+    kind: str
+    number: str
+    start: int
+    contractor: bool
+
 
 class TextProcessor:
     """
@@ -13,14 +45,16 @@ class TextProcessor:
         - Remove múltiplos espaços e quebras de linha
         - Remove tabs e espaços extras no início/fim
         - Mantém a capitalização original (pode ser ajustado se quiser minúsculas)
+        Uma única passada: str.split() quebra no mesmo conjunto de espaços em branco que o \\s do re.
         """
         if not text:
             return ""
-        # -> Substitui quebras de linha e tabs por espaço
-        text = re.sub(r'[\n\t]+', ' ', text)
-        # -> Remove múltiplos espaços consecutivos
-        text = re.sub(r'\s+',' ', text)
-        return text.strip()
+        return " ".join(text.split())
+
+    @staticmethod
+    def clean_texts(texts: Iterable[str]) -> List[str]:
+        """clean_text em lote (parágrafos, páginas), sem o custo de uma chamada por texto."""
+        return [" ".join(t.split()) if t else "" for t in texts]
 
     @staticmethod
     def preprocess_text(text: str) -> str:
@@ -31,9 +65,7 @@ class TextProcessor:
         """
         if not text:
             return ""
-        text = text.lower()
-        text = re.sub(r'\s+', ' ', text).strip() 
-        return text
+        return " ".join(text.lower().split())
 
     @staticmethod
     def normalize_key(key: str) -> str:
@@ -43,35 +75,128 @@ class TextProcessor:
         """
         if not key:
             return ""
-        return re.sub(r'[^\w\d]', '', key.strip())
+        return _NON_WORD.sub('', key.strip())
+
+    # --- CNPJ / CPF ---
+
+    @staticmethod
+    def is_valid_cnpj(number: str) -> bool:
+        """CNPJ só com dígitos: 14 dígitos, não repetidos, com os dois dígitos verificadores corretos."""
+        if len(number) != 14 or not number.isdigit() or number == number[0] * 14:
+            return False
+        digits = [int(d) for d in number]
+        for position, weights in zip((12, 13), _CNPJ_WEIGHTS):
+            rest = sum(d * w for d, w in zip(digits, weights)) % 11
+            if digits[position] != (0 if rest < 2 else 11 - rest):
+                return False
+        return True
+
+    @staticmethod
+    def is_valid_cpf(number: str) -> bool:
+        """CPF só com dígitos: 11 dígitos, não repetidos, com os dois dígitos verificadores corretos."""
+        if len(number) != 11 or not number.isdigit() or number == number[0] * 11:
+            return False
+        digits = [int(d) for d in number]
+        for position in (9, 10):
+            check = sum(d * w for d, w in zip(digits, range(position + 1, 1, -1))) * 10 % 11
+            if digits[position] != (0 if check == 10 else check):
+                return False
+        return True
+
+    @staticmethod
+    def _number_at(text: str, start: int, end: int) -> tuple[str, str, int] | None:
+        """CNPJ ou CPF válido começando exatamente em `start` (e não no meio de uma sequência de dígitos)."""
+        if start and text[start - 1].isdigit():
+            return None
+        for kind, pattern, is_valid in (("cnpj", _CNPJ_FORMAT, TextProcessor.is_valid_cnpj),
+                                        ("cpf", _CPF_FORMAT, TextProcessor.is_valid_cpf)):
+            match = pattern.match(text, start, end)
+            if match is None or (match.end() < len(text) and text[match.end()].isdigit()):
+                continue
+            number = _NON_DIGIT.sub('', match.group())
+            if is_valid(number):
+                return kind, number, match.end()
+        return None
+
+    @staticmethod
+    def iter_document_numbers(text: str, contractor_cnpjs: Iterable[str] | None = None) -> Iterator[DocumentNumber]:
+        """
+        CNPJs e CPFs válidos do texto, em ordem, marcando os da contratante:
+        - CNPJ em `contractor_cnpjs` (padrão: settings.CONTRACTOR_CNPJ)
+        - primeiro CNPJ até _CONTRACTOR_REACH caracteres depois de "BIOPARK"/"PARQUE CIENTÍFICO"
+        - CPFs que vêm depois do CNPJ da contratante (representantes), até a próxima
+          menção a "CONTRATADA/O" ou o CNPJ de outra empresa
+        Gerador: quem só precisa dos primeiros números não varre o resto do texto.
+        """
+        if not text:
+            return
+        excluded = set(settings.CONTRACTOR_CNPJ if contractor_cnpjs is None else contractor_cnpjs)
+        in_contractor = False       # dentro da qualificação da contratante
+        contractor_mention = None   # posição da última menção ao nome da contratante ainda sem CNPJ
+        scanned = 0                 # menções às partes já lidas até aqui
+        pos = 0
+        while True:
+            candidate = _NUMBER_CANDIDATE.search(text, pos)
+            if candidate is None:
+                return
+            start = candidate.start()
+            found = TextProcessor._number_at(text, start, candidate.end())
+            if found is None:
+                # O candidato pode ter engolido o número real ("2024/11.222.333/0001-81"):
+                # tenta de novo a partir do próximo dígito da mesma sequência
+                pos = start + 1
+                continue
+            kind, number, pos = found
+
+            for mention in _PARTY_MENTION.finditer(text, scanned, start):
+                if mention.lastgroup == "contractor":
+                    in_contractor, contractor_mention = True, mention.start()
+                else:
+                    in_contractor, contractor_mention = False, None
+            scanned = start
+
+            if kind == "cnpj":
+                near_mention = contractor_mention is not None and start - contractor_mention <= _CONTRACTOR_REACH
+                contractor = number in excluded or near_mention
+                # CNPJ de outra empresa encerra a qualificação da contratante
+                in_contractor, contractor_mention = contractor, None
+            else:
+                contractor = in_contractor
+            yield DocumentNumber(kind, number, start, contractor)
 
     @staticmethod
-    def extract_contractor_keys(text: str) -> Dict[str, str]:
+    def find_document_numbers(text: str, contractor_cnpjs: Iterable[str] | None = None) -> List[DocumentNumber]:
+        """Todos os números de iter_document_numbers."""
+        return list(TextProcessor.iter_document_numbers(text, contractor_cnpjs))
+
+    @staticmethod
+    def extract_contractor_keys(text: str, contractor_cnpjs: Iterable[str] | None = None) -> Dict[str, str]:
         """
-        Extrai o CNPJ e CPF do contratado (primeira ocorrência de cada um).
+        Extrai o CNPJ e CPF do contratado: primeiro número válido de cada tipo
+        que não é da contratante (ver iter_document_numbers).
         Retorna um dicionário:
         {
             "cnpj_contratado": "53502564000199",
             "cpf_contratado": "07231424910"
         }
         """
-        # -> Padrões regex para CPF e CNPJ formatados
-        cnpj_pattern = r'\d{2}\.\d{3}\.\d{3}/\d{4}-\d{2}'
-        cpf_pattern = r'\d{3}\.\d{3}\.\d{3}-\d{2}'
-
-        def _normalize_number(number: str) -> str:
-            """
-            Remove qualquer caractere que não seja número
-            """
-            return re.sub(r'[^0-9]', '', number)
-
-        cnpjs = re.findall(cnpj_pattern, text)
-        cpfs = re.findall(cpf_pattern, text)
-
-        cnpj_contratado = _normalize_number(cnpjs[0]) if cnpjs else "SEM_CNPJ"
-        cpf_contratado = _normalize_number(cpfs[0]) if cpfs else "SEM_CPF"
+        keys = {"cnpj": MISSING_CNPJ, "cpf": MISSING_CPF}
+        pending = set(keys)
+        for found in TextProcessor.iter_document_numbers(text, contractor_cnpjs):
+            if found.kind in pending and not found.contractor:
+                keys[found.kind] = found.number
+                pending.discard(found.kind)
+                if not pending:
+                    break
 
         return {
-            "cnpj_contratado": cnpj_contratado,
-            "cpf_contratado": cpf_contratado
-        }
\ No newline at end of file
+            "cnpj_contratado": keys["cnpj"],
+            "cpf_contratado": keys["cpf"]
+        }
+
+    @staticmethod
+    def extract_contractor_keys_many(texts: Iterable[str],
+                                     contractor_cnpjs: Iterable[str] | None = None) -> List[Dict[str, str]]:
+        """extract_contractor_keys para vários textos (ex.: reconstrução da tabela de CNPJ/CPF)."""
+        excluded = tuple(settings.CONTRACTOR_CNPJ if contractor_cnpjs is None else contractor_cnpjs)
+        return [TextProcessor.extract_contractor_keys(t, excluded) for t in texts]
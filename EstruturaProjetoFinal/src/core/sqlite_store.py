@@ -0,0 +1,55 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+
+class SQLiteStore:
+    """
+    Base para os armazenamentos locais em SQLite (manifesto, caches, catálogos).
+    Uma conexão por instância, compartilhada entre threads e protegida por lock.
+    As subclasses definem SCHEMA com os CREATE TABLE/INDEX necessários.
+    """
+
+    SCHEMA = ""
+
+    def __init__(self, db_path: str | Path):
+        self.db_path = str(db_path)
+        if self.db_path != ":memory:":
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            if self.SCHEMA:
+                self._conn.executescript(self.SCHEMA)
+
+    @contextmanager
+    def transaction(self, immediate: bool = False):
+        """
+        Agrupa várias escritas numa única transação (commit no fim, rollback em erro).
+        `immediate` reserva a escrita já no BEGIN: leitura + escrita sem corrida entre processos.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+            try:
+                yield self._conn
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            else:
+                self._conn.execute("COMMIT")
+
+    def execute(self, sql: str, params: tuple | dict = ()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    def query(self, sql: str, params: tuple | dict = ()) -> list[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
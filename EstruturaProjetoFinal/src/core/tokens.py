@@ -0,0 +1,40 @@
+import logging
+from functools import lru_cache
+
+from src.config.settings import settings
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken vem com o langchain-openai; sem ele usamos a estimativa
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=4)
+def _encoding(name: str):
+    """
+    Encoding do tiktoken, ou None para usar a estimativa: sem tiktoken ou quando
+    o arquivo BPE não pode ser baixado (sem rede). O resultado fica em cache,
+    então a falha do download não se repete a cada chamada.
+    """
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding(name)
+    except Exception as e:
+        logger.warning(f"Encoding {name} do tiktoken indisponível ({e}); contando tokens por estimativa.")
+        return None
+
+
+def count_tokens(text: str, encoding: str = "cl100k_base") -> int:
+    """
+    Conta os tokens de um texto (encoding dos modelos de embedding/chat da OpenAI).
+    Com TOKEN_COUNTER=estimate ou sem o encoding do tiktoken, estima ~4 caracteres por token.
+    """
+    if not text:
+        return 0
+    enc = None if settings.TOKEN_COUNTER == "estimate" else _encoding(encoding)
+    if enc is None:
+        return len(text) // 4 + 1
+    return len(enc.encode(text, disallowed_special=()))
@@ -1,3 +1,4 @@
+import os
 from dotenv import load_dotenv  
 load_dotenv() 
 
@@ -22,7 +23,12 @@ def main():
     pipeline = PipelineExecutor(
         drive_client=drive_client,
         pdf_processor=pdf_processor,
-        max_workers=1,
+        # Concorrência adaptativa: começa em DRIVE_INITIAL_WORKERS e sobe até DRIVE_MAX_WORKERS enquanto
+        # não houver 429/5xx; DRIVE_REQUESTS_PER_SECOND limita a taxa de requisições ao Drive
+        max_workers=int(os.getenv("DRIVE_MAX_WORKERS", 8)),
+        initial_workers=int(os.getenv("DRIVE_INITIAL_WORKERS", 2)),
+        requests_per_second=float(os.getenv("DRIVE_REQUESTS_PER_SECOND", 10)),
+        max_attempts=int(os.getenv("DRIVE_MAX_ATTEMPTS", 5)),
         logger=logger
     )
 
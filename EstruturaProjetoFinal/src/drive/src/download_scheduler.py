@@ -0,0 +1,241 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+
+
+class TokenBucket:
+    """
+    Limite de requisições por segundo compartilhado por todos os downloads.
+    Em caso de 429/5xx o balde inteiro pausa (Retry-After ou backoff), em vez
+    de cada thread dormir por conta própria, e a taxa cai pela metade. A cada
+    sucesso a taxa sobe `increase` (padrão: 5% de `max_rate`), até `max_rate`.
+    """
+
+    def __init__(self, rate, capacity, min_rate=0.5, max_rate=None, increase=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.min_rate = min_rate
+        self.max_rate = max_rate or float(rate)
+        self.increase = increase or self.max_rate / 20
+        self.tokens = float(capacity)
+        self.paused_until = 0.0
+        self._last_decrease = float("-inf")
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self):
+        """Consome um token. Retorna 0 se conseguiu, senão os segundos até haver um token."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self.paused_until:
+                return self.paused_until - now
+            self._refill(now)
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self, pause, sent_at):
+        """`sent_at`: quando a requisição limitada saiu; as enviadas antes da última redução não reduzem de novo."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if sent_at >= self._last_decrease:
+                self._last_decrease = now
+                self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = 0.0
+            self.paused_until = max(self.paused_until, now + pause)
+
+
+class AdaptiveConcurrency:
+    """
+    Limite de downloads simultâneos com AIMD (como o controle de congestionamento do TCP):
+    - partida lenta: +1 por sucesso até o primeiro 429/5xx
+    - depois: +1/limite por sucesso (≈ +1 por rodada)
+    - 429/5xx: limite pela metade; erros de requisições enviadas antes da última
+      redução não reduzem de novo (a rajada das que já estavam em voo é um único sinal)
+    """
+
+    def __init__(self, initial, minimum, maximum):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.slow_start = True
+        self._last_decrease = float("-inf")
+
+    def current(self):
+        return int(self.limit)
+
+    def on_success(self):
+        step = 1.0 if self.slow_start else 1.0 / self.limit
+        self.limit = min(self.maximum, self.limit + step)
+
+    def on_throttle(self, sent_at):
+        self.slow_start = False
+        if sent_at < self._last_decrease:
+            return
+        self._last_decrease = time.monotonic()
+        self.limit = max(self.minimum, self.limit / 2)
+
+
+@dataclass
+class DownloadStats:
+    """Contadores do agendador, com vazão em MB/s e arquivos/s."""
+    total: int = 0
+    downloaded: int = 0
+    skipped: int = 0
+    failed: int = 0
+    retries: int = 0
+    throttled: int = 0
+    bytes: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def finished(self):
+        return self.downloaded + self.skipped + self.failed
+
+    def summary(self, concurrency=None):
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        text = (
+            f"{self.finished}/{self.total} arquivos | baixados={self.downloaded} pulados={self.skipped} "
+            f"falhas={self.failed} | {self.bytes / 1e6 / elapsed:.2f} MB/s {self.downloaded / elapsed:.2f} arquivos/s "
+            f"| retries={self.retries} limitados={self.throttled}"
+        )
+        if concurrency is not None:
+            text += f" | concorrência={concurrency}"
+        return text
+
+
+@dataclass(order=True)
+class _Job:
+    not_before: float
+    seq: int
+    item: dict = field(compare=False)
+    attempt: int = field(default=0, compare=False)
+    sent_at: float = field(default=0.0, compare=False)
+
+
+class DownloadScheduler:
+    """
+    Agenda os downloads do Drive com concorrência adaptativa e backpressure:
+    - no máximo `concurrency.current()` futures em voo (os demais arquivos ficam na fila, sem submit)
+    - cada requisição consome um token do balde compartilhado
+    - 429/5xx reduzem concorrência e taxa; o arquivo volta para a fila com `not_before`
+      (nenhuma thread de download dorme esperando o backoff)
+    """
+
+    def __init__(self, processor, max_concurrency=8, initial_concurrency=2, requests_per_second=10.0,
+                 burst=None, max_attempts=5, backoff_base=1.0, backoff_max=60.0, report_interval=10.0,
+                 logger=None):
+        self.processor = processor
+        self.max_concurrency = max(1, max_concurrency)
+        self.concurrency = AdaptiveConcurrency(initial_concurrency, 1, self.max_concurrency)
+        self.bucket = TokenBucket(requests_per_second, burst or max(1, self.max_concurrency))
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.report_interval = report_interval
+        self.logger = logger
+
+    def _backoff(self, attempt, retry_after=None):
+        if retry_after:
+            return min(retry_after, self.backoff_max)
+        return min(self.backoff_max, self.backoff_base * 2 ** attempt) + random.uniform(0, 1)
+
+    def run(self, arquivos):
+        stats = DownloadStats(total=len(arquivos))
+        seq = itertools.count()
+        ready = []    # heap de _Job por (not_before, seq)
+        for item in arquivos:
+            # Arquivos já baixados não ocupam slot nem token
+            if self.processor.existing_path(item["name"]) is not None:
+                stats.skipped += 1
+            else:
+                heapq.heappush(ready, _Job(0.0, next(seq), item))
+        if stats.skipped:
+            self.logger.info(f"⏩ {stats.skipped} arquivo(s) já baixado(s).")
+
+        in_flight = {}
+        next_report = time.monotonic() + self.report_interval
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="drive-download") as executor:
+            while ready or in_flight:
+                now = time.monotonic()
+                timeout = None
+                # Submete enquanto houver slot, token e arquivo liberado para tentar
+                while ready and len(in_flight) < self.concurrency.current():
+                    if ready[0].not_before > now:
+                        timeout = ready[0].not_before - now
+                        break
+                    wait_token = self.bucket.try_acquire()
+                    if wait_token > 0:
+                        timeout = wait_token
+                        break
+                    job = heapq.heappop(ready)
+                    job.sent_at = time.monotonic()
+                    future = executor.submit(self.processor.download_once, job.item["id"], job.item["name"])
+                    in_flight[future] = job
+
+                if now >= next_report:
+                    self.logger.info(f"📊 {stats.summary(self.concurrency.current())}")
+                    next_report = now + self.report_interval
+                # Acorda também para o próximo relatório de vazão
+                timeout = min(timeout if timeout is not None else self.report_interval, next_report - now)
+
+                if not in_flight:
+                    time.sleep(timeout or 0.05)
+                    continue
+                done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = in_flight.pop(future)
+                    self._handle(job, future, stats, ready, seq)
+
+        self.logger.info(f"🏁 Downloads finalizados: {stats.summary()}")
+        return stats
+
+    def _handle(self, job, future, stats, ready, seq):
+        name = job.item["name"]
+        try:
+            outcome = future.result()
+        except Exception as e:  # download_once não deveria lançar; trata como falha transitória
+            status, error, retry_after = "error", str(e), None
+        else:
+            status, error, retry_after = outcome.status, outcome.error, outcome.retry_after
+
+        if status == "ok":
+            stats.downloaded += 1
+            stats.bytes += outcome.size
+            self.concurrency.on_success()
+            self.bucket.on_success()
+            return
+        if status == "skipped":
+            stats.skipped += 1
+            return
+
+        if status == "throttled":
+            stats.throttled += 1
+            self.concurrency.on_throttle(job.sent_at)
+            self.bucket.on_throttle(self._backoff(job.attempt, retry_after), job.sent_at)
+        job.attempt += 1
+        if status == "failed" or job.attempt >= self.max_attempts:
+            stats.failed += 1
+            self.logger.error(f"🚫 Falha definitiva ao baixar {name}: {error}")
+            return
+
+        stats.retries += 1
+        delay = self._backoff(job.attempt, retry_after)
+        self.logger.warning(
+            f"🔁 {name}: {error} (tentativa {job.attempt}/{self.max_attempts}); "
+            f"nova tentativa em {delay:.1f}s | concorrência={self.concurrency.current()}")
+        heapq.heappush(ready, _Job(time.monotonic() + delay, next(seq), job.item, job.attempt))
@@ -2,25 +2,51 @@ import os
 import time
 import io
 import random
+import threading
+from dataclasses import dataclass
+
+import httplib2
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.errors import HttpError
 from googleapiclient.http import MediaIoBaseDownload
-# from PyPDF2 import PdfReader 
+# from PyPDF2 import PdfReader
+
+# Motivos do 403 que são limite de taxa (e não falta de permissão)
+RATE_LIMIT_REASONS = ("rateLimitExceeded", "userRateLimitExceeded", "downloadQuotaExceeded")
+
+
+@dataclass
+class DownloadOutcome:
+    """
+    Resultado de uma única tentativa de download:
+    - "ok": baixado; "skipped": já existia
+    - "throttled": 429, 403 de limite de taxa ou 5xx (o agendador reduz o ritmo)
+    - "error": falha transitória (rede, arquivo vazio); pode tentar de novo
+    - "failed": falha definitiva (ex.: 404), não adianta tentar de novo
+    """
+    status: str
+    path: str | None = None
+    size: int = 0
+    error: str | None = None
+    retry_after: float | None = None
+
 
 class PDFProcessor:
     def __init__(self, drive_service, logger, output_dir="extraidos"):
         self.service = drive_service
         self.logger = logger
         self.output_dir = output_dir
+        self._local = threading.local()
         os.makedirs(output_dir, exist_ok=True)
 
-    def download_pdf(self, file_id, file_name, max_retries=3):
-        """Baixa o PDF do Google Drive com retry, backoff e VALIDAÇÃO de arquivo vazio."""
+    def existing_path(self, file_name):
+        """Caminho do PDF se já foi baixado (arquivo vazio é removido para baixar de novo)."""
         output_path = os.path.join(self.output_dir, file_name)
 
         # --- MELHORIA: Validar se o arquivo existente não está vazio ---
         if os.path.exists(output_path):
             try:
                 if os.path.getsize(output_path) > 0:
-                    self.logger.info(f"⏩ Pulando download (já existe e não está vazio): {file_name}")
                     return output_path
                 else:
                     self.logger.warning(f"⚠️ Arquivo existente está vazio. Baixando novamente: {file_name}")
@@ -28,63 +54,93 @@ class PDFProcessor:
             except OSError as e:
                 self.logger.warning(f"Não foi possível verificar o arquivo existente {file_name}: {e}. Baixando novamente.")
         # --- Fim da Melhoria ---
+        return None
+
+    def _thread_http(self):
+        """O httplib2.Http do serviço não é thread-safe: cada thread de download usa sua própria conexão."""
+        http = getattr(self._local, "http", None)
+        if http is None:
+            credentials = getattr(getattr(self.service, "_http", None), "credentials", None)
+            if credentials is None:
+                return None  # sem credenciais acessíveis: usa o http do próprio serviço
+            http = self._local.http = AuthorizedHttp(credentials, http=httplib2.Http())
+        return http
+
+    @staticmethod
+    def _discard(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _classify_http_error(e):
+        status = int(getattr(e.resp, "status", 0) or 0)
+        detail = str(e)
+        try:
+            retry_after = float(e.resp.get("retry-after"))
+        except (TypeError, ValueError):
+            retry_after = None
+        if status == 429 or status >= 500 or (status == 403 and any(r in detail for r in RATE_LIMIT_REASONS)):
+            return DownloadOutcome("throttled", error=f"HTTP {status}", retry_after=retry_after)
+        return DownloadOutcome("failed", error=f"HTTP {status}: {detail}")
+
+    def download_once(self, file_id, file_name):
+        """
+        Uma única tentativa de download, sem retry nem espera: a falha é
+        classificada e o agendador decide quando tentar de novo.
+        O conteúdo é gravado em "<nome>.part" e só vira .pdf quando completo.
+        """
+        output_path = self.existing_path(file_name)
+        if output_path is not None:
+            return DownloadOutcome("skipped", path=output_path)
 
+        output_path = os.path.join(self.output_dir, file_name)
+        part_path = output_path + ".part"
+        start_time = time.time()
+        try:
+            request = self.service.files().get_media(fileId=file_id)
+            http = self._thread_http()
+            if http is not None:
+                request.http = http
+            with io.FileIO(part_path, "wb") as fh:
+                downloader = MediaIoBaseDownload(fh, request)
+                done = False
+                while not done:
+                    status, done = downloader.next_chunk()
+        except HttpError as e:
+            self._discard(part_path)
+            return self._classify_http_error(e)
+        except Exception as e:
+            self._discard(part_path)
+            return DownloadOutcome("error", error=str(e))
+
+        size = os.path.getsize(part_path)
+        if size == 0:
+            self._discard(part_path)
+            return DownloadOutcome("error", error="arquivo vazio")
+        os.replace(part_path, output_path)
+        elapsed = time.time() - start_time
+        self.logger.info(f"✅ Download concluído: {file_name} ({size / 1e6:.2f} MB, {elapsed:.2f}s)")
+        return DownloadOutcome("ok", path=output_path, size=size)
+
+    def download_pdf(self, file_id, file_name, max_retries=3):
+        """Baixa um PDF isolado com retry e backoff (fora do agendador de downloads)."""
         for attempt in range(1, max_retries + 1):
-            try:
-                start_time = time.time()
-                request = self.service.files().get_media(fileId=file_id)
-                fh = None
-                download_succeeded = False # Flag para rastrear o sucesso
-
-                # --- CORREÇÃO ESTRUTURAL (try/except/finally) ---
-                try:
-                    fh = io.FileIO(output_path, "wb")
-                    downloader = MediaIoBaseDownload(fh, request)
-                    done = False
-                    while not done:
-                        status, done = downloader.next_chunk()
-                        # (Opcional) Log de progresso pode ser muito verboso
-                        # if status:
-                        #    self.logger.info(f"📥 Download {int(status.progress() * 100)}% para {file_name}")
-                    
-                    download_succeeded = True # Marcar sucesso apenas se o loop terminar
-                except Exception as e:
-                    self.logger.error(f"❌ Erro durante o chunk do download {file_name} (tentativa {attempt}): {e}")
-                    # Não re-lance, deixe o 'finally' limpar e o 'for' tentar novamente
-                finally:
-                    if fh:
-                        fh.close() # Sempre feche o arquivo
-                
-                # --- CORREÇÃO PRINCIPAL: Validação Pós-Download ---
-                if download_succeeded:
-                    # Verifica se o arquivo foi criado E se tem conteúdo
-                    if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
-                        # SUCESSO REAL
-                        elapsed = time.time() - start_time
-                        self.logger.info(f"✅ Download concluído: {file_name} ({elapsed:.2f}s)")
-                        return output_path # Retorna o caminho e sai do loop 'for'
-                    else:
-                        # Download "concluído" mas o arquivo está vazio
-                        self.logger.warning(f"⚠️ Download de {file_name} concluído, mas o arquivo está vazio. (Tentativa {attempt}/{max_retries})")
-                        if os.path.exists(output_path):
-                            os.remove(output_path) # Limpa o arquivo vazio
-                
-                # Se 'download_succeeded' for False ou o arquivo for vazio,
-                # o código continua para o 'except' externo para acionar o retry.
-                if not download_succeeded:
-                    raise Exception("Falha no download (erro no chunk)")
-                else:
-                    raise Exception("Falha no download (arquivo vazio)")
-                
-            except Exception as e:
-                # Este 'except' agora pega erros do 'get_media' E as falhas de validação
-                wait = 2 ** attempt + random.uniform(0, 1)
-                self.logger.error(f"❌ Erro ao baixar {file_name} (tentativa {attempt}/{max_retries}): {e}")
-                if attempt < max_retries:
-                    self.logger.warning(f"🔁 Re-tentando em {wait:.1f}s...")
-                    time.sleep(wait)
-                else:
-                    self.logger.error(f"🚫 Falha definitiva ao baixar {file_name}")
-                    return None # Falha definitiva
-        
-        return None # Caso o loop 'for' termine sem sucesso
\ No newline at end of file
+            outcome = self.download_once(file_id, file_name)
+            if outcome.status == "skipped":
+                self.logger.info(f"⏩ Pulando download (já existe e não está vazio): {file_name}")
+                return outcome.path
+            if outcome.status == "ok":
+                return outcome.path
+
+            self.logger.error(f"❌ Erro ao baixar {file_name} (tentativa {attempt}/{max_retries}): {outcome.error}")
+            if outcome.status == "failed":
+                break
+            if attempt < max_retries:
+                wait = outcome.retry_after or 2 ** attempt + random.uniform(0, 1)
+                self.logger.warning(f"🔁 Re-tentando em {wait:.1f}s...")
+                time.sleep(wait)
+
+        self.logger.error(f"🚫 Falha definitiva ao baixar {file_name}")
+        return None # Falha definitiva
@@ -1,29 +1,33 @@
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from src.download_scheduler import DownloadScheduler
+from src.utils.logger import Logger
 
 class PipelineExecutor:
-    """Orquestra o fluxo de download e extração em paralelo."""
+    """Orquestra o fluxo de download em paralelo, com concorrência adaptativa (DownloadScheduler)."""
 
-    def __init__(self, drive_client, pdf_processor, max_workers=5, logger=None):
+    def __init__(self, drive_client, pdf_processor, max_workers=8, initial_workers=2,
+                 requests_per_second=10.0, max_attempts=5, logger=None):
         self.drive_client = drive_client
         self.pdf_processor = pdf_processor
         self.max_workers = max_workers
+        self.initial_workers = initial_workers
+        self.requests_per_second = requests_per_second
+        self.max_attempts = max_attempts
         self.logger = logger
 
     def executar(self):
         """Executa o pipeline completo de forma paralela."""
+        Logger.start_timer(self.logger)
         arquivos = self.drive_client.listar_pdfs()
         self.logger.info(f"Iniciando processamento de {len(arquivos)} PDFs...")
 
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            futuros = [
-                executor.submit(self.pdf_processor.download_pdf, item['id'], item['name'])
-                for item in arquivos
-
-            ]
-
-            for futuro in as_completed(futuros):
-                try:
-                    resultado = futuro.result()
-                    self.logger.info(f"✅ Processado: {resultado}")
-                except Exception as e:
-                    self.logger.error(f"Erro no processamento: {e}")
+        scheduler = DownloadScheduler(
+            self.pdf_processor,
+            max_concurrency=self.max_workers,
+            initial_concurrency=self.initial_workers,
+            requests_per_second=self.requests_per_second,
+            max_attempts=self.max_attempts,
+            logger=self.logger,
+        )
+        stats = scheduler.run(arquivos)
+        Logger.end_timer(self.logger, stats.downloaded + stats.skipped)
+        return stats
@@ -1,10 +1,12 @@
 import os
 import time
 import logging
+import threading
 
 
 class Logger:
-    start_time = None
+    # Cronômetro por thread: execuções em paralelo não sobrescrevem o início umas das outras
+    _timers = threading.local()
 
     @staticmethod
     def setup_logger(name="AppLogger", level=logging.INFO):
@@ -30,16 +32,18 @@ class Logger:
 
     @classmethod
     def start_timer(cls, logger):
-        cls.start_time = time.time()
+        cls._timers.start_time = time.perf_counter()
         logger.info("⏳ Iniciando processamento dos PDFs...")
 
     @classmethod
     def end_timer(cls, logger, total_processados):
-        if cls.start_time is None:
+        start_time = getattr(cls._timers, "start_time", None)
+        if start_time is None:
             logger.warning("⚠️ Timer não iniciado corretamente.")
             return
+        cls._timers.start_time = None
 
-        elapsed_time = time.time() - cls.start_time
+        elapsed_time = time.perf_counter() - start_time
         minutos = int(elapsed_time // 60)
         segundos = elapsed_time % 60
 
@@ -0,0 +1,129 @@
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+
+from src.core.metrics import metrics, span
+from src.core.tokens import count_tokens
+
+VECTORS_UPSERTED = metrics.counter("rag_vectors_upserted_total", "Vetores gravados no índice vetorial.")
+
+
+@dataclass
+class PendingChunk:
+    """Chunk pronto para embedding/upsert, ainda sem vetor."""
+    chunk_id: str
+    text: str
+    metadata: dict
+    file_name: str
+    tokens: int = 0
+
+
+@dataclass
+class ChunkBatcher:
+    """
+    Agrupa chunks de vários arquivos em lotes limitados por número de tokens
+    e de vetores. Arquivos pequenos passam a dividir a mesma chamada e arquivos
+    grandes (OCR de 200 páginas) são quebrados em vários lotes.
+    """
+    max_tokens: int = 100_000
+    max_vectors: int = 512
+    _current: list[PendingChunk] = field(default_factory=list)
+    _current_tokens: int = 0
+
+    def add(self, chunks: list[PendingChunk]) -> list[list[PendingChunk]]:
+        """Adiciona chunks e devolve os lotes que ficaram cheios."""
+        ready = []
+        for chunk in chunks:
+            if not chunk.tokens:
+                chunk.tokens = count_tokens(chunk.text)
+            if self._current and (self._current_tokens + chunk.tokens > self.max_tokens
+                                  or len(self._current) >= self.max_vectors):
+                ready.append(self._take())
+            self._current.append(chunk)
+            self._current_tokens += chunk.tokens
+        return ready
+
+    def flush(self) -> list[list[PendingChunk]]:
+        return [self._take()] if self._current else []
+
+    def _take(self) -> list[PendingChunk]:
+        batch, self._current, self._current_tokens = self._current, [], 0
+        return batch
+
+
+# Status HTTP que não dependem do conteúdo do lote: dividir só multiplicaria as falhas
+_NOT_SPLITTABLE = {401, 403, 404, 408, 429}
+
+
+def is_request_error(error: Exception) -> bool:
+    """
+    Erro causado pelo próprio lote (payload grande demais, vetor ou metadado inválido):
+    HTTP 4xx, exceto autenticação, índice inexistente, timeout e limite de taxa.
+    Sem status HTTP, só o ValueError do índice local. Conexão, 5xx e 429 não contam.
+    """
+    status = getattr(error, "status", None)
+    if isinstance(status, int):
+        return 400 <= status < 500 and status not in _NOT_SPLITTABLE
+    return isinstance(error, ValueError)
+
+
+class VectorUpserter:
+    """
+    Gera os embeddings de um lote numa única chamada e faz o upsert em
+    sub-lotes. Falhas de rede, 5xx e 429 são re-tentadas com backoff; se
+    persistirem, o upsert para e os vetores restantes ficam para a próxima
+    execução. Só um lote rejeitado pelo conteúdo (is_request_error) é dividido
+    ao meio, para isolar o vetor problemático sem perder o resto.
+    """
+
+    def __init__(self, index, embeddings, upsert_batch_size: int = 100, max_retries: int = 3,
+                 text_key: str = "text", logger: logging.Logger | None = None):
+        self.index = index
+        self.embeddings = embeddings
+        self.upsert_batch_size = max(1, upsert_batch_size)
+        self.max_retries = max(1, max_retries)
+        self.text_key = text_key
+        self.logger = logger or logging.getLogger(__name__)
+
+    def upsert(self, batch: list[PendingChunk]) -> set[str]:
+        """Retorna os IDs gravados com sucesso."""
+        with span("index.embed"):
+            vectors = self.embeddings.embed_documents([c.text for c in batch])
+        records = [
+            {"id": c.chunk_id, "values": v, "metadata": {**c.metadata, self.text_key: c.text}}
+            for c, v in zip(batch, vectors)
+        ]
+        done: set[str] = set()
+        with span("index.upsert"):
+            for start in range(0, len(records), self.upsert_batch_size):
+                try:
+                    done |= self._upsert_with_retry(records[start:start + self.upsert_batch_size])
+                except Exception as e:
+                    self.logger.error(
+                        f"Upsert interrompido: {len(records) - start} vetores ficam para a próxima execução ({e}).")
+                    break
+        VECTORS_UPSERTED.inc(len(done))
+        return done
+
+    def _upsert_with_retry(self, records: list[dict]) -> set[str]:
+        """IDs gravados; levanta a exceção se a falha não é do conteúdo do lote e persiste após os retries."""
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                self.index.upsert(vectors=records)
+                return {r["id"] for r in records}
+            except Exception as e:
+                if is_request_error(e):
+                    self.logger.warning(f"Lote de {len(records)} vetores rejeitado ({e}).")
+                    break
+                self.logger.warning(
+                    f"Falha no upsert de {len(records)} vetores (tentativa {attempt}/{self.max_retries}): {e}")
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(2 ** attempt + random.uniform(0, 1))
+
+        if len(records) == 1:
+            self.logger.error(f"Vetor {records[0]['id']} descartado: rejeitado pelo índice.")
+            return set()
+        middle = len(records) // 2
+        return self._upsert_with_retry(records[:middle]) | self._upsert_with_retry(records[middle:])
@@ -0,0 +1,258 @@
+import logging
+import os
+import socket
+import threading
+import time
+from dataclasses import asdict, dataclass
+
+from src.core.sqlite_store import SQLiteStore
+from src.ingestion.pdf_indexer import IndexProgress, PDFIndexer
+
+# Estados de um job; só "running" é ativo
+RUNNING, COMPLETED, CANCELLED, FAILED, INTERRUPTED = "running", "completed", "cancelled", "failed", "interrupted"
+OUTCOMES = ("indexed", "skipped", "failed")
+
+
+@dataclass
+class IndexJob:
+    """Execução de indexação registrada na tabela de jobs."""
+    id: int
+    status: str
+    created_at: float
+    finished_at: float | None
+    heartbeat_at: float
+    owner: str
+    total: int
+    indexed: int
+    skipped: int
+    failed: int
+    current_file: str | None
+    cancel_requested: bool
+    error: str | None
+
+    @property
+    def done(self) -> int:
+        return self.indexed + self.skipped + self.failed
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["done"] = self.done
+        data["progress"] = round(self.done / self.total, 4) if self.total else None
+        return data
+
+
+class IndexJobStore(SQLiteStore):
+    """
+    Tabela persistente dos jobs de indexação (no mesmo banco do manifesto).
+    O lock de execução única vale entre processos: um job "running" só é
+    considerado morto quando o heartbeat para de ser atualizado.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS index_jobs (
+        id               INTEGER PRIMARY KEY AUTOINCREMENT,
+        status           TEXT NOT NULL,
+        created_at       REAL NOT NULL,
+        finished_at      REAL,
+        heartbeat_at     REAL NOT NULL,
+        owner            TEXT NOT NULL,
+        total            INTEGER NOT NULL DEFAULT 0,
+        indexed          INTEGER NOT NULL DEFAULT 0,
+        skipped          INTEGER NOT NULL DEFAULT 0,
+        failed           INTEGER NOT NULL DEFAULT 0,
+        current_file     TEXT,
+        cancel_requested INTEGER NOT NULL DEFAULT 0,
+        error            TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_index_jobs_status ON index_jobs(status);
+    CREATE TABLE IF NOT EXISTS index_job_files (
+        job_id      INTEGER NOT NULL,
+        file_name   TEXT NOT NULL,
+        outcome     TEXT NOT NULL,
+        finished_at REAL NOT NULL,
+        PRIMARY KEY (job_id, file_name)
+    );
+    """
+
+    def __init__(self, db_path, stale_after: float):
+        super().__init__(db_path)
+        self.stale_after = stale_after
+
+    @staticmethod
+    def _to_job(row) -> IndexJob:
+        data = dict(row)
+        data["cancel_requested"] = bool(data["cancel_requested"])
+        return IndexJob(**data)
+
+    def get(self, job_id: int) -> IndexJob | None:
+        rows = self.query("SELECT * FROM index_jobs WHERE id = ?", (job_id,))
+        return self._to_job(rows[0]) if rows else None
+
+    def latest(self) -> IndexJob | None:
+        rows = self.query("SELECT * FROM index_jobs ORDER BY id DESC LIMIT 1")
+        return self._to_job(rows[0]) if rows else None
+
+    def _expire_stale(self, conn, now: float) -> None:
+        """Jobs "running" sem heartbeat recente (processo encerrado no meio) viram "interrupted"."""
+        conn.execute(
+            "UPDATE index_jobs SET status = ?, finished_at = ?, error = 'sem heartbeat' "
+            "WHERE status = ? AND heartbeat_at < ?",
+            (INTERRUPTED, now, RUNNING, now - self.stale_after),
+        )
+
+    def claim(self, owner: str) -> tuple[IndexJob, bool]:
+        """Cria um job se nenhum estiver ativo. Retorna (job, criado); se já há um ativo, devolve esse."""
+        now = time.time()
+        with self.transaction(immediate=True) as conn:
+            self._expire_stale(conn, now)
+            row = conn.execute("SELECT * FROM index_jobs WHERE status = ? ORDER BY id DESC LIMIT 1",
+                               (RUNNING,)).fetchone()
+            if row is not None:
+                return self._to_job(row), False
+            cur = conn.execute(
+                "INSERT INTO index_jobs (status, created_at, heartbeat_at, owner) VALUES (?, ?, ?, ?)",
+                (RUNNING, now, now, owner),
+            )
+            row = conn.execute("SELECT * FROM index_jobs WHERE id = ?", (cur.lastrowid,)).fetchone()
+        return self._to_job(row), True
+
+    def set_total(self, job_id: int, total: int) -> None:
+        self.execute("UPDATE index_jobs SET total = ?, heartbeat_at = ? WHERE id = ?", (total, time.time(), job_id))
+
+    def file_done(self, job_id: int, file_name: str, outcome: str) -> None:
+        """Registra o resultado de um arquivo; só o primeiro resultado de cada arquivo conta."""
+        if outcome not in OUTCOMES:
+            raise ValueError(f"Resultado inválido: {outcome}")
+        now = time.time()
+        with self.transaction() as conn:
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO index_job_files (job_id, file_name, outcome, finished_at) VALUES (?, ?, ?, ?)",
+                (job_id, file_name, outcome, now),
+            )
+            if cur.rowcount:
+                conn.execute(
+                    f"UPDATE index_jobs SET {outcome} = {outcome} + 1, current_file = ?, heartbeat_at = ? WHERE id = ?",
+                    (file_name, now, job_id),
+                )
+
+    def heartbeat(self, job_id: int) -> bool:
+        """Renova o heartbeat do job; retorna True se o cancelamento foi pedido."""
+        self.execute("UPDATE index_jobs SET heartbeat_at = ? WHERE id = ?", (time.time(), job_id))
+        rows = self.query("SELECT cancel_requested FROM index_jobs WHERE id = ?", (job_id,))
+        return bool(rows and rows[0]["cancel_requested"])
+
+    def request_cancel(self, job_id: int | None = None) -> IndexJob | None:
+        """Marca o pedido de cancelamento do job indicado (ou do ativo). Retorna o job, ou None se não está ativo."""
+        with self.transaction() as conn:
+            if job_id is None:
+                row = conn.execute("SELECT id FROM index_jobs WHERE status = ? ORDER BY id DESC LIMIT 1",
+                                   (RUNNING,)).fetchone()
+                if row is None:
+                    return None
+                job_id = row["id"]
+            cur = conn.execute("UPDATE index_jobs SET cancel_requested = 1 WHERE id = ? AND status = ?",
+                               (job_id, RUNNING))
+        return self.get(job_id) if cur.rowcount else None
+
+    def finish(self, job_id: int, status: str, error: str | None = None) -> None:
+        self.execute(
+            "UPDATE index_jobs SET status = ?, finished_at = ?, current_file = NULL, error = ? WHERE id = ?",
+            (status, time.time(), error, job_id),
+        )
+
+    def files(self, job_id: int, limit: int = 50) -> list[dict]:
+        """Últimos arquivos concluídos do job (mais recentes primeiro)."""
+        rows = self.query(
+            "SELECT file_name, outcome, finished_at FROM index_job_files WHERE job_id = ? "
+            "ORDER BY finished_at DESC LIMIT ?",
+            (job_id, limit),
+        )
+        return [dict(r) for r in rows]
+
+
+class _JobProgress(IndexProgress):
+    """Liga o progresso do indexador à tabela de jobs e ao pedido de cancelamento."""
+
+    def __init__(self, store: IndexJobStore, job_id: int, cancel: threading.Event):
+        self.store = store
+        self.job_id = job_id
+        self.cancel = cancel
+
+    def started(self, total: int) -> None:
+        self.store.set_total(self.job_id, total)
+
+    def file_done(self, pdf_file: str, outcome: str) -> None:
+        self.store.file_done(self.job_id, pdf_file, outcome)
+
+    def cancelled(self) -> bool:
+        return self.cancel.is_set()
+
+
+class IndexJobManager:
+    """
+    Executa a indexação em segundo plano, uma de cada vez (inclusive entre
+    processos, via tabela de jobs). O request do /index só cria o job e volta;
+    o progresso por arquivo fica na tabela para o /index/status.
+    """
+
+    def __init__(self, indexer: PDFIndexer, store: IndexJobStore, heartbeat_interval: float,
+                 logger: logging.Logger | None = None):
+        self.indexer = indexer
+        self.store = store
+        self.heartbeat_interval = heartbeat_interval
+        self.logger = logger or logging.getLogger(__name__)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._cancel = threading.Event()
+
+    def start(self) -> tuple[IndexJob, bool]:
+        """Inicia um job, ou devolve o que já está rodando. Retorna (job, criado)."""
+        job, created = self.store.claim(self.owner)
+        if not created:
+            return job, False
+        self._cancel = cancel = threading.Event()
+        threading.Thread(target=self._run, args=(job.id, cancel), name=f"index-job-{job.id}", daemon=True).start()
+        self.logger.info(f"📥 Job de indexação {job.id} iniciado.")
+        return job, True
+
+    def cancel(self, job_id: int | None = None) -> IndexJob | None:
+        job = self.store.request_cancel(job_id)
+        if job is not None:
+            self.logger.info(f"🛑 Cancelamento pedido para o job de indexação {job.id}.")
+            if job.owner == self.owner:
+                self._cancel.set()
+        return job
+
+    def status(self, job_id: int | None = None, files: int = 20) -> dict | None:
+        job = self.store.get(job_id) if job_id is not None else self.store.latest()
+        if job is None:
+            return None
+        data = job.to_dict()
+        data["recent_files"] = self.store.files(job.id, limit=files)
+        return data
+
+    def _heartbeat(self, job_id: int, cancel: threading.Event, stop: threading.Event) -> None:
+        """Mantém o job vivo durante arquivos longos (OCR) e repassa cancelamentos vindos de outro processo."""
+        while not stop.wait(self.heartbeat_interval):
+            try:
+                if self.store.heartbeat(job_id):
+                    cancel.set()
+            except Exception as e:
+                self.logger.warning(f"Heartbeat do job {job_id} falhou: {e}")
+
+    def _run(self, job_id: int, cancel: threading.Event) -> None:
+        stop = threading.Event()
+        beat = threading.Thread(target=self._heartbeat, args=(job_id, cancel, stop), daemon=True)
+        beat.start()
+        status, error = COMPLETED, None
+        try:
+            self.indexer.index_pdfs(progress=_JobProgress(self.store, job_id, cancel))
+            if cancel.is_set():
+                status = CANCELLED
+        except Exception as e:
+            self.logger.exception(f"❌ Job de indexação {job_id} falhou: {e}")
+            status, error = FAILED, str(e)
+        finally:
+            stop.set()
+            beat.join()
+            self.store.finish(job_id, status, error)
+        self.logger.info(f"📦 Job de indexação {job_id} finalizado: {status}.")
@@ -0,0 +1,187 @@
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from src.core.sqlite_store import SQLiteStore
+
+
+@dataclass
+class ManifestEntry:
+    """Estado de indexação de um PDF."""
+    file_name: str
+    source_file: str
+    content_hash: str
+    size: int
+    mtime: float
+    embedding_model: str
+    chunk_ids: list[str] = field(default_factory=list)
+    indexed_at: float = 0.0
+
+
+class IndexManifest(SQLiteStore):
+    """
+    Manifesto local endereçado por conteúdo.
+    Substitui a consulta ao Pinecone por arquivo: um PDF só é reindexado quando
+    o hash do conteúdo (ou o modelo de embedding) muda.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS files (
+        file_name       TEXT PRIMARY KEY,
+        source_file     TEXT NOT NULL,
+        content_hash    TEXT NOT NULL,
+        size            INTEGER NOT NULL,
+        mtime           REAL NOT NULL,
+        embedding_model TEXT NOT NULL,
+        chunk_ids       TEXT NOT NULL,
+        indexed_at      REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_files_source ON files(source_file);
+    CREATE TABLE IF NOT EXISTS meta (
+        key   TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS chunk_progress (
+        chunk_id     TEXT NOT NULL,
+        file_name    TEXT NOT NULL,
+        content_hash TEXT NOT NULL,
+        PRIMARY KEY (file_name, content_hash, chunk_id)
+    );
+    """
+
+    @staticmethod
+    def file_hash(path: str | Path, block_size: int = 1 << 20) -> str:
+        """SHA-256 do conteúdo do arquivo, lido em blocos."""
+        digest = hashlib.sha256()
+        with open(path, "rb") as fh:
+            for block in iter(lambda: fh.read(block_size), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def get(self, file_name: str) -> ManifestEntry | None:
+        rows = self.query("SELECT * FROM files WHERE file_name = ?", (file_name,))
+        return self._to_entry(rows[0]) if rows else None
+
+    def all_entries(self) -> list[ManifestEntry]:
+        return [self._to_entry(r) for r in self.query("SELECT * FROM files ORDER BY file_name")]
+
+    def check(self, path: str | Path, embedding_model: str) -> tuple[str, ManifestEntry | None, str | None]:
+        """
+        Classifica o arquivo em "unchanged", "changed" ou "new".
+        Retorna (status, entrada_anterior, hash_atual). Tamanho e mtime iguais
+        dispensam o hash (caminho rápido); o hash só é calculado quando
+        algum dos dois mudou.
+        """
+        file_name = os.path.basename(path)
+        stat = os.stat(path)
+        entry = self.get(file_name)
+
+        if entry is None:
+            return "new", None, self.file_hash(path)
+
+        if (entry.embedding_model == embedding_model
+                and entry.size == stat.st_size and entry.mtime == stat.st_mtime):
+            return "unchanged", entry, entry.content_hash
+
+        content_hash = self.file_hash(path)
+        if entry.embedding_model == embedding_model and entry.content_hash == content_hash:
+            # Só o mtime mudou (cópia, download refeito): atualiza para manter o caminho rápido
+            self.execute("UPDATE files SET size = ?, mtime = ? WHERE file_name = ?",
+                         (stat.st_size, stat.st_mtime, file_name))
+            return "unchanged", entry, content_hash
+
+        return "changed", entry, content_hash
+
+    def record(self, entry: ManifestEntry) -> None:
+        entry.indexed_at = entry.indexed_at or time.time()
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (entry.file_name, entry.source_file, entry.content_hash, entry.size, entry.mtime,
+                 entry.embedding_model, json.dumps(entry.chunk_ids), entry.indexed_at),
+            )
+            self._bump_version(conn)
+
+    def remove(self, file_name: str) -> None:
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM files WHERE file_name = ?", (file_name,))
+            self._bump_version(conn)
+
+    # --- Catálogo de documentos indexados ---
+
+    @staticmethod
+    def _bump_version(conn) -> None:
+        conn.execute(
+            "INSERT INTO meta VALUES ('catalog_version', 1) "
+            "ON CONFLICT(key) DO UPDATE SET value = value + 1"
+        )
+
+    def catalog_version(self) -> int:
+        """Contador incrementado a cada arquivo gravado ou removido (invalida caches do catálogo)."""
+        rows = self.query("SELECT value FROM meta WHERE key = 'catalog_version'")
+        return rows[0]["value"] if rows else 0
+
+    def needs_legacy_check(self) -> bool:
+        """
+        Migração de índices criados antes do manifesto: enquanto nenhuma execução
+        completa terminou, arquivos novos são procurados no índice vetorial (uma vez).
+        """
+        return not self.query("SELECT 1 FROM meta WHERE key = 'legacy_checked'")
+
+    def mark_legacy_checked(self) -> None:
+        self.execute("INSERT OR REPLACE INTO meta VALUES ('legacy_checked', 1)")
+
+    def source_files(self) -> list[str]:
+        """Todos os `source_file` indexados, normalizados como no filtro do RAG."""
+        rows = self.query("SELECT DISTINCT lower(trim(source_file)) AS sf FROM files WHERE source_file != '' ORDER BY sf")
+        return [r["sf"] for r in rows]
+
+    def hashes_for_sources(self, source_files: list[str]) -> dict[str, str]:
+        """{source_file: hash(es) de conteúdo atuais}; usado para validar caches derivados do índice."""
+        found: dict[str, list[str]] = {}
+        for start in range(0, len(source_files), 500):
+            batch = source_files[start:start + 500]
+            marks = ",".join("?" * len(batch))
+            for row in self.query(
+                    f"SELECT source_file, content_hash FROM files WHERE source_file IN ({marks}) ORDER BY file_name",
+                    tuple(batch)):
+                found.setdefault(row["source_file"], []).append(row["content_hash"])
+        return {source_file: ",".join(hashes) for source_file, hashes in found.items()}
+
+    # --- Progresso por chunk (retomada de execuções interrompidas) ---
+
+    def mark_chunks_done(self, file_name: str, content_hash: str, chunk_ids: list[str]) -> None:
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO chunk_progress VALUES (?, ?, ?)",
+                [(cid, file_name, content_hash) for cid in chunk_ids],
+            )
+
+    def done_chunks(self, file_name: str, content_hash: str) -> set[str]:
+        rows = self.query(
+            "SELECT chunk_id FROM chunk_progress WHERE file_name = ? AND content_hash = ?",
+            (file_name, content_hash),
+        )
+        return {r["chunk_id"] for r in rows}
+
+    def has_progress(self, file_name: str) -> bool:
+        return bool(self.query("SELECT 1 FROM chunk_progress WHERE file_name = ? LIMIT 1", (file_name,)))
+
+    def clear_progress(self, file_name: str) -> None:
+        self.execute("DELETE FROM chunk_progress WHERE file_name = ?", (file_name,))
+
+    @staticmethod
+    def _to_entry(row) -> ManifestEntry:
+        return ManifestEntry(
+            file_name=row["file_name"],
+            source_file=row["source_file"],
+            content_hash=row["content_hash"],
+            size=row["size"],
+            mtime=row["mtime"],
+            embedding_model=row["embedding_model"],
+            chunk_ids=json.loads(row["chunk_ids"]),
+            indexed_at=row["indexed_at"],
+        )
@@ -0,0 +1,277 @@
+import hashlib
+import io
+import logging
+import os
+import re
+import tempfile
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import fitz  # PyMuPDF
+from llama_parse import LlamaParse
+from pypdf import PdfReader, PdfWriter
+
+from src.config.settings import settings
+from src.core.sqlite_store import SQLiteStore
+
+try:  # OCR local (opcional): pip install pytesseract pillow + binário do Tesseract
+    import pytesseract
+    from PIL import Image
+except ImportError:
+    pytesseract = None
+
+
+class OCRIncompleteError(RuntimeError):
+    """Alguma página não pôde ser lida pelo OCR (o arquivo deve ser re-tentado depois)."""
+
+
+# --- BACKENDS ---
+class OCRBackend(ABC):
+    """
+    Interface dos motores de OCR. `ocr_pages` recebe o caminho do PDF e os
+    números das páginas (base 0) e devolve {página: texto} apenas para as
+    páginas lidas com sucesso.
+    """
+    name = "base"
+
+    @abstractmethod
+    def ocr_pages(self, path: str, page_numbers: list[int]) -> dict[int, str]:
+        ...
+
+    def close(self) -> None:
+        pass
+
+
+class LlamaParseBackend(OCRBackend):
+    """OCR na nuvem (LlamaParse). Envia um PDF temporário só com as páginas pedidas."""
+    name = "llamaparse"
+
+    def __init__(self, logger: logging.Logger | None = None):
+        self.logger = logger or logging.getLogger(__name__)
+        if settings.LLAMA_CLOUD_API_KEY:
+            os.environ["LLAMA_CLOUD_API_KEY"] = settings.LLAMA_CLOUD_API_KEY
+        else:
+            self.logger.warning("LLAMA_CLOUD_API_KEY não encontrada. OCR pode falhar.")
+
+    def ocr_pages(self, path: str, page_numbers: list[int]) -> dict[int, str]:
+        file_name = os.path.basename(path)
+        tmp_path = None
+        try:
+            reader = PdfReader(path)
+            writer = PdfWriter()
+            for number in page_numbers:
+                writer.add_page(reader.pages[number])
+            with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+                writer.write(tmp)
+                tmp_path = tmp.name
+
+            parser = LlamaParse(result_type="markdown", language="pt", split_by_page=True, verbose=True)
+            llama_docs = parser.load_data(tmp_path)
+        except Exception as e:
+            self.logger.error(f"[{file_name}] Falha no LlamaParse: {e}")
+            return {}
+        finally:
+            if tmp_path:
+                os.remove(tmp_path)
+
+        if len(llama_docs) == len(page_numbers):
+            return {number: doc.text for number, doc in zip(page_numbers, llama_docs)}
+        if len(page_numbers) == 1:
+            return {page_numbers[0]: "\n\n".join(doc.text for doc in llama_docs)}
+        self.logger.error(
+            f"[{file_name}] LlamaParse devolveu {len(llama_docs)} páginas para {len(page_numbers)} pedidas.")
+        return {}
+
+
+def _tesseract_page(args: tuple[str, int, int, str]) -> tuple[int, str | None]:
+    """Executado nos processos do pool: renderiza uma página e roda o Tesseract."""
+    path, number, dpi, language = args
+    try:
+        with fitz.open(path) as doc:
+            pixmap = doc[number].get_pixmap(dpi=dpi)
+            image = Image.open(io.BytesIO(pixmap.tobytes("png")))
+        return number, pytesseract.image_to_string(image, lang=language)
+    except Exception:
+        return number, None
+
+
+class TesseractBackend(OCRBackend):
+    """
+    OCR local e offline (Tesseract via pytesseract + Pillow, dependências opcionais).
+    As páginas são distribuídas num pool de processos compartilhado.
+    """
+    name = "tesseract"
+
+    def __init__(self, language: str = "por", dpi: int = 300, workers: int | None = None,
+                 logger: logging.Logger | None = None):
+        if pytesseract is None:
+            raise ImportError("OCR_BACKEND=tesseract requer os pacotes pytesseract e pillow.")
+        self.language = language
+        self.dpi = dpi
+        self.workers = workers or os.cpu_count() or 1
+        self.logger = logger or logging.getLogger(__name__)
+        self._pool: ProcessPoolExecutor | None = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    def ocr_pages(self, path: str, page_numbers: list[int]) -> dict[int, str]:
+        jobs = [(path, number, self.dpi, self.language) for number in page_numbers]
+        results = {}
+        for number, text in self._get_pool().map(_tesseract_page, jobs):
+            if text is None:
+                self.logger.error(f"[{os.path.basename(path)}] Tesseract falhou na página {number}.")
+            else:
+                results[number] = text
+        return results
+
+    def close(self) -> None:
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+
+# --- CACHE ---
+_XREF_REF = re.compile(r'\b(\d+) 0 R\b')
+
+
+def _page_resources(doc: fitz.Document, page: fitz.Page) -> str:
+    """/Resources da página (objeto ou dicionário), subindo pelos /Parent quando é herdado."""
+    xref = page.xref
+    while xref:
+        kind, value = doc.xref_get_key(xref, "Resources")
+        if kind != "null":
+            return value
+        kind, value = doc.xref_get_key(xref, "Parent")
+        xref = int(value.split()[0]) if kind == "xref" else 0
+    return ""
+
+
+def page_content_hash(doc: fitz.Document, number: int) -> str:
+    """
+    Hash do conteúdo de uma página: geometria + stream de desenho + tudo o que é
+    alcançável a partir do /Resources (Form XObjects, fontes, imagens e seus streams),
+    percorrido em largura. As referências "N 0 R" entram pela ordem de visita, não pelo
+    número do objeto: a mesma página em outro PDF gera o mesmo hash, e dois formulários
+    "/fzFrm0 Do" com conteúdos diferentes geram hashes diferentes.
+    """
+    page = doc[number]
+    digest = hashlib.sha256()
+    digest.update(f"{page.rect}|{page.rotation}".encode())
+    digest.update(page.read_contents())
+
+    order: dict[int, int] = {}
+    queue: deque[int] = deque()
+
+    def visit(source: str) -> None:
+        for ref in _XREF_REF.findall(source):
+            xref = int(ref)
+            if xref not in order:
+                order[xref] = len(order)
+                queue.append(xref)
+        digest.update(_XREF_REF.sub(lambda m: f"@{order[int(m.group(1))]}", source).encode())
+
+    visit(_page_resources(doc, page))
+    while queue:
+        xref = queue.popleft()
+        digest.update(b"\0")
+        visit(doc.xref_object(xref, compressed=True))
+        if doc.xref_is_stream(xref):
+            digest.update(doc.xref_stream_raw(xref) or b"")
+    return digest.hexdigest()
+
+
+class OCRCache(SQLiteStore):
+    """Textos de OCR por hash de página (comprimidos com zlib)."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS ocr_pages (
+        page_hash TEXT NOT NULL,
+        backend   TEXT NOT NULL,
+        text      BLOB NOT NULL,
+        PRIMARY KEY (page_hash, backend)
+    );
+    """
+
+    def get_many(self, backend: str, page_hashes: list[str]) -> dict[str, str]:
+        found = {}
+        unique = list(dict.fromkeys(page_hashes))
+        for start in range(0, len(unique), 500):
+            batch = unique[start:start + 500]
+            marks = ",".join("?" * len(batch))
+            for row in self.query(
+                    f"SELECT page_hash, text FROM ocr_pages WHERE backend = ? AND page_hash IN ({marks})",
+                    (backend, *batch)):
+                found[row["page_hash"]] = zlib.decompress(row["text"]).decode("utf-8")
+        return found
+
+    def put_many(self, backend: str, texts: dict[str, str]) -> None:
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO ocr_pages VALUES (?, ?, ?)",
+                [(h, backend, zlib.compress(t.encode("utf-8"))) for h, t in texts.items()],
+            )
+
+
+class CachedOCR:
+    """
+    OCR com cache por página: só páginas nunca vistas vão para o backend.
+    Reexecuções, mudanças de chunking e PDFs duplicados reaproveitam o texto.
+    """
+
+    def __init__(self, backend: OCRBackend, cache: OCRCache, logger: logging.Logger | None = None):
+        self.backend = backend
+        self.cache = cache
+        self.logger = logger or logging.getLogger(__name__)
+
+    def page_count(self, path: str) -> int:
+        with fitz.open(path) as doc:
+            return doc.page_count
+
+    def ocr_pages(self, path: str, page_numbers: list[int], partial: bool = False) -> dict[int, str]:
+        """
+        Devolve {página: texto}. Se alguma página falhar, levanta OCRIncompleteError;
+        com `partial=True` apenas registra as páginas que faltaram e devolve as demais.
+        """
+        with fitz.open(path) as doc:
+            hashes = {number: page_content_hash(doc, number) for number in page_numbers}
+
+        cached = self.cache.get_many(self.backend.name, list(hashes.values()))
+        results = {n: cached[h] for n, h in hashes.items() if h in cached}
+        pending = [n for n in page_numbers if n not in results]
+
+        file_name = os.path.basename(path)
+        if results:
+            self.logger.info(f"[{file_name}] OCR: {len(results)} página(s) reaproveitada(s) do cache.")
+        if pending:
+            self.logger.info(f"[{file_name}] OCR ({self.backend.name}) de {len(pending)} página(s)...")
+            fresh = self.backend.ocr_pages(path, pending)
+            self.cache.put_many(self.backend.name, {hashes[n]: text for n, text in fresh.items()})
+            results.update(fresh)
+
+        failed = [n for n in page_numbers if n not in results]
+        if failed and partial:
+            self.logger.warning(f"[{file_name}] OCR indisponível para as páginas {failed}; seguindo sem elas.")
+        elif failed:
+            raise OCRIncompleteError(f"[{file_name}] OCR falhou nas páginas {failed}")
+        return results
+
+
+def build_ocr(logger: logging.Logger | None = None) -> CachedOCR:
+    """Monta o OCR configurado em settings.OCR_BACKEND com o cache em disco."""
+    if settings.OCR_BACKEND == TesseractBackend.name:
+        backend = TesseractBackend(
+            language=settings.OCR_LANGUAGE, dpi=settings.OCR_DPI, workers=settings.OCR_WORKERS, logger=logger)
+    elif settings.OCR_BACKEND == LlamaParseBackend.name:
+        backend = LlamaParseBackend(logger=logger)
+    else:
+        raise ValueError(f"OCR_BACKEND desconhecido: {settings.OCR_BACKEND}")
+    return CachedOCR(backend, OCRCache(settings.OCR_CACHE_DB), logger=logger)
@@ -1,72 +1,207 @@
 import os
 import logging
 import re
+import threading
+import time
 import warnings
 import hashlib
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import takewhile
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Iterator
 
 # --- IMPORTS ---
-from llama_parse import LlamaParse 
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_openai import OpenAIEmbeddings
-from langchain_pinecone import PineconeVectorStore
-from pinecone import Pinecone as PineconeClient, ServerlessSpec
 from langchain_core.documents import Document
+from pypdf import PdfReader
 
 from src.config.settings import settings
+from src.core.clients import registry
+from src.core.embedding_cache import embedding_dimensions, embedding_signature
+from src.core.metrics import record_span, span, timed_iter
 from src.core.preprocess import TextProcessor
+from src.ingestion.batching import ChunkBatcher, PendingChunk, VectorUpserter
+from src.ingestion.manifest import IndexManifest, ManifestEntry
+from src.ingestion.ocr import build_ocr
+from src.ingestion.pipeline import IndexingPipeline, Stage
+from src.search.identifier_index import IdentifierIndex
+from src.search.lexical_index import LexicalIndex
 
 warnings.filterwarnings("ignore", category=DeprecationWarning)
 
+def iter_text_pages(path: str) -> Iterator[tuple[int, str]]:
+    """
+    Texto local (sem OCR) de cada página, com a mesma leitura usada pelo indexador
+    (page.extract_text do pypdf, como o PyPDFLoader). Uma página por vez: o
+    PyPDFLoader carrega o arquivo inteiro e extrai todas as páginas numa lista.
+    """
+    reader = PdfReader(path)
+    for number, page in enumerate(reader.pages):
+        yield number, page.extract_text()
+
+
 # --- CLASSE SPLITTER ---
+_PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+
+
 class ParagraphTextSplitter:
     """
     Splitter de texto que respeita parágrafos completos.
+    Trabalha sobre um único buffer limpo (parágrafos normalizados unidos por
+    um espaço): cada chunk, já com o overlap, é uma fatia contínua desse
+    buffer, então basta calcular os offsets numa única passada.
     """
     def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
 
-    def split_text(self, text: str) -> list[str]:
-        paragraphs = re.split(r'\n\s*\n', text)  
-        chunks = []
-        current_chunk = ""
+    def split_spans(self, text: str) -> tuple[str, list[tuple[int, int]]]:
+        """Retorna o buffer limpo e os spans (início, fim) de cada chunk nele."""
+        # Mesma normalização do TextProcessor.clean_text (espaços em branco -> um espaço)
+        paragraphs = [p for p in (" ".join(para.split()) for para in _PARAGRAPH_BREAK.split(text)) if p]
+        buffer = " ".join(paragraphs)
+
+        spans = []
+        prev = None  # span do chunk anterior, sem overlap
+        chunk_start = None
+        chunk_end = 0
+        # Comprimento que o chunk teria na versão por concatenação: o primeiro
+        # chunk começava com " " + parágrafo e esse espaço contava no limite
+        chunk_len = 0
+        offset = 0
+
+        def emit(start: int, end: int) -> None:
+            nonlocal prev
+            if prev is not None and self.chunk_overlap > 0:
+                # "fim do anterior + espaço + chunk" é a própria fatia buffer[novo_inicio:fim]
+                prev_start, prev_end = prev
+                new_start = prev_end - self.chunk_overlap if self.chunk_overlap < prev_end - prev_start else prev_start
+                if buffer[new_start] == " ":
+                    new_start += 1
+                spans.append((new_start, end))
+            else:
+                spans.append((start, end))
+            prev = (start, end)
 
         for para in paragraphs:
-            para = TextProcessor.clean_text(para)
-            if not para: continue
-
-            if len(current_chunk) + len(para) + 1 > self.chunk_size:
-                if current_chunk: chunks.append(current_chunk.strip())
-                current_chunk = para
+            para_len = len(para)
+            para_start = offset
+            offset += para_len + 1
+
+            if chunk_len + para_len + 1 > self.chunk_size:
+                if chunk_start is not None:
+                    emit(chunk_start, chunk_end)
+                chunk_start, chunk_len = para_start, para_len
             else:
-                current_chunk += " " + para
+                if chunk_start is None:
+                    chunk_start = para_start
+                chunk_len += para_len + 1
+            chunk_end = para_start + para_len
 
-        if current_chunk: chunks.append(current_chunk.strip())
+        if chunk_start is not None:
+            emit(chunk_start, chunk_end)
 
-        if self.chunk_overlap > 0 and len(chunks) > 1:
-            overlapped_chunks = []
-            for i in range(len(chunks)):
-                chunk = chunks[i]
-                if i > 0:
-                    prev_chunk = chunks[i - 1]
-                    overlap_text = prev_chunk[-self.chunk_overlap:] if self.chunk_overlap < len(prev_chunk) else prev_chunk
-                    chunk = overlap_text + " " + chunk
-                overlapped_chunks.append(chunk.strip())
-            return overlapped_chunks
+        return buffer, spans
 
-        return chunks
+    def split_text(self, text: str) -> list[str]:
+        buffer, spans = self.split_spans(text)
+        return [buffer[start:end] for start, end in spans]
 
     def split_documents(self, documents: list[Document]) -> list[Document]:
         all_chunks = []
         for doc in documents:
-            text_chunks = self.split_text(doc.page_content)
-            for chunk in text_chunks:
-                new_doc = Document(page_content=chunk, metadata=doc.metadata.copy())
-                all_chunks.append(new_doc)
+            buffer, spans = self.split_spans(doc.page_content)
+            for start, end in spans:
+                metadata = doc.metadata.copy()
+                metadata["chunk_start"] = start
+                metadata["chunk_end"] = end
+                all_chunks.append(Document(page_content=buffer[start:end], metadata=metadata))
         return all_chunks
 
 
+# --- LEITURA LOCAL (pool de processos) ---
+@dataclass
+class ParsedPage:
+    """Página lida e seus chunks (texto, início, fim). Só tipos simples: atravessa o pool de processos."""
+    metadata: dict
+    text: str
+    chunks: list[tuple[str, int, int]]
+
+
+@dataclass
+class PageBatch:
+    """Páginas [start, stop) de um PDF lidas localmente (PyPDF + split)."""
+    page_count: int
+    pages: list[ParsedPage] = field(default_factory=list)
+    missing_pages: list[int] = field(default_factory=list)  # pouco texto: vão para o OCR
+    text_chars: int = 0
+    parse_seconds: float = 0.0
+    split_seconds: float = 0.0
+
+
+def split_page_chunks(splitter: ParagraphTextSplitter, text: str) -> list[tuple[str, int, int]]:
+    buffer, spans = splitter.split_spans(text)
+    return [(buffer[start:end], start, end) for start, end in spans]
+
+
+def read_page_batch(path: str, start: int, stop: int, chunk_size: int, chunk_overlap: int,
+                    min_page_chars: int) -> PageBatch:
+    """
+    Leitura local (sem OCR) e split das páginas [start, stop) de um PDF. No modo
+    pipeline roda nos processos do pool de indexação (parsing e chunking são CPU
+    puro e não escalam com threads). O PdfReader só decodifica as páginas pedidas,
+    então cada lote custa o mesmo, esteja no começo ou no fim do arquivo.
+    """
+    t0 = time.perf_counter()
+    reader = PdfReader(path)
+    splitter = ParagraphTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    batch = PageBatch(page_count=len(reader.pages))
+    for number in range(start, min(stop, batch.page_count)):
+        text = reader.pages[number].extract_text()
+        size = len(text.strip())
+        batch.text_chars += size
+        if size < min_page_chars:
+            batch.missing_pages.append(number)
+            continue
+        t_split = time.perf_counter()
+        chunks = split_page_chunks(splitter, text)
+        batch.split_seconds += time.perf_counter() - t_split
+        batch.pages.append(ParsedPage({"source": path, "page": number}, text, chunks))
+    batch.parse_seconds = time.perf_counter() - t0 - batch.split_seconds
+    return batch
+
+
+@dataclass
+class IndexTask:
+    """Item que atravessa os estágios da indexação de um PDF."""
+    pdf_file: str
+    path: str
+    source_file: str
+    content_hash: str
+    previous: ManifestEntry | None = None
+    ids: list[str] = field(default_factory=list)
+    keys: dict[str, str] = field(default_factory=dict)
+    complete: bool = False  # todas as páginas lidas e os chunks entregues ao lote
+
+
+class IndexProgress:
+    """
+    Acompanhamento de uma execução de index_pdfs (padrão: não faz nada).
+    `file_done` recebe "indexed", "skipped" ou "failed" e pode ser chamado de
+    várias threads no modo pipeline. Se `cancelled` vira True, nenhum arquivo
+    novo é iniciado; os que já estão em andamento terminam e os lotes são enviados.
+    """
+
+    def started(self, total: int) -> None:
+        pass
+
+    def file_done(self, pdf_file: str, outcome: str) -> None:
+        pass
+
+    def cancelled(self) -> bool:
+        return False
+
+
 # --- CLASSE INDEXER ---
 class PDFIndexer:
     """
@@ -79,168 +214,503 @@ class PDFIndexer:
     def __init__(self, logger: logging.Logger | None = None):
         self.logger = logger or logging.getLogger(__name__)
 
-        # Configuração da chave do LlamaParse
-        if hasattr(settings, "LLAMA_CLOUD_API_KEY") and settings.LLAMA_CLOUD_API_KEY:
-            os.environ["LLAMA_CLOUD_API_KEY"] = settings.LLAMA_CLOUD_API_KEY
-        else:
-            self.logger.warning("LLAMA_CLOUD_API_KEY não encontrada. OCR pode falhar.")
+        # OCR (LlamaParse ou Tesseract local) com cache por página
+        self.ocr = build_ocr(logger=self.logger)
 
         self.folder = settings.PDF_FOLDER
         self.index_name = settings.PINECONE_INDEX_NAME
-        self.embeddings = OpenAIEmbeddings(model=settings.EMBEDDING_MODEL)
-        self.pinecone = PineconeClient(
-            api_key=settings.PINECONE_API_KEY,
-            environment=settings.PINECONE_ENVIRONMENT
-        )
-        self.vectorstore = PineconeVectorStore(
-            index_name=self.index_name,
-            embedding=self.embeddings,
-            text_key="text",
-            namespace=""
-        )
+        self.embeddings = registry.embeddings()
         self.chunk_size = settings.CHUNK_SIZE
         self.chunk_overlap = settings.CHUNK_OVERLAP
-
-    def _create_index_if_needed(self):
-        try:
-            existing = self.pinecone.list_indexes().names()
-        except Exception:
-            existing = []
-        if self.index_name not in existing:
-            self.logger.info(f"Criando índice Pinecone: {self.index_name}")
-            self.pinecone.create_index(
-                name=self.index_name,
-                dimension=3072,
-                metric="cosine",
-                spec=ServerlessSpec(cloud='aws', region='us-east-1')
-            )
-
-    def _is_file_indexed(self, filename_clean: str) -> bool:
+        self.manifest = IndexManifest(settings.INDEX_STATE_DB)
+        self.lexical_index = LexicalIndex(settings.LEXICAL_INDEX_DB, logger=self.logger)
+        self.identifiers = IdentifierIndex(settings.INDEX_STATE_DB)
+        self._index_ready = False
+        self._index_lock = threading.Lock()
+        self._parse_pool: ProcessPoolExecutor | None = None  # leitura/split em processos (modo pipeline)
+
+        # Lotes de embedding/upsert compartilhados entre arquivos
+        self.index = None  # criado em _ensure_index (Pinecone.Index consulta o host remoto)
+        self.upserter = VectorUpserter(
+            index=None,
+            embeddings=self.embeddings,
+            upsert_batch_size=settings.UPSERT_BATCH_SIZE,
+            max_retries=settings.UPSERT_MAX_RETRIES,
+            logger=self.logger,
+        )
+        self._batcher = ChunkBatcher(
+            max_tokens=settings.EMBED_BATCH_MAX_TOKENS,
+            max_vectors=settings.EMBED_BATCH_MAX_VECTORS,
+        )
+        self._pending: dict[str, tuple[IndexTask, set[str]]] = {}
+        self._batch_lock = threading.Lock()
+        self._progress = IndexProgress()
+        self._legacy_indexed: set[str] = set()  # migração de índices anteriores ao manifesto
+
+    def _ensure_index(self) -> None:
+        """Cria o índice na primeira vez que algum arquivo precisa ser enviado."""
+        with self._index_lock:
+            if not self._index_ready:
+                registry.ensure_index(self.index_name, dimension=embedding_dimensions())
+                self.index = registry.index(self.index_name)
+                self.upserter.index = self.index
+                self._index_ready = True
+
+    @staticmethod
+    def _chunk_id(pdf_file: str, number: int) -> str:
+        """ID determinístico do chunk: o mesmo em todas as versões do indexador."""
+        return hashlib.md5(f"{pdf_file}_{number}".encode()).hexdigest()
+
+    def _legacy_chunk_ids(self, pdf_file: str, start: int = 0) -> list[str]:
+        """IDs de chunks do arquivo já presentes no índice, a partir de `start` (são contíguos: 0..n-1)."""
+        found = []
+        while True:
+            ids = [self._chunk_id(pdf_file, i) for i in range(start, start + 100)]
+            present = self.index.fetch(ids=ids).vectors
+            for chunk_id in ids:
+                if chunk_id not in present:
+                    return found
+                found.append(chunk_id)
+            start += 100
+
+    def _find_legacy_indexed(self, pdf_files: list[str]) -> set[str]:
         """
-        Verifica se já existem vetores no Pinecone com este nome de arquivo.
+        Migração (só até a primeira execução completa com o manifesto): arquivos fora do
+        manifesto cujo primeiro chunk já está no índice vetorial. Busca pelo ID do chunk 0,
+        derivado do nome completo do arquivo, em lotes de 100 IDs por fetch.
         """
+        candidates = {self._chunk_id(f, 0): f for f in pdf_files
+                      if self.manifest.get(f) is None and not self.manifest.has_progress(f)}
+        if not candidates:
+            return set()
+        self._ensure_index()
+        ids = list(candidates)
+        found = set()
+        for start in range(0, len(ids), 100):
+            try:
+                present = self.index.fetch(ids=ids[start:start + 100]).vectors
+            except Exception as e:
+                self.logger.error(f"Erro ao procurar arquivos já indexados antes do manifesto: {e}")
+                continue
+            found.update(candidates[chunk_id] for chunk_id in present)
+        if found:
+            self.logger.info(f"Migração: {len(found)} arquivo(s) já indexados serão registrados no manifesto.")
+        return found
+
+    def _read_batch(self, path: str, start: int, stop: int) -> Future:
+        """PyPDF + split de [start, stop): no pool de processos (modo pipeline) ou já resolvido aqui (sequencial)."""
+        args = (path, start, stop, self.chunk_size, self.chunk_overlap, settings.PDF_MIN_PAGE_CHARS)
+        if self._parse_pool is not None:
+            return self._parse_pool.submit(read_page_batch, *args)
+        future = Future()
         try:
-            index = self.pinecone.Index(self.index_name)
-            query_response = index.query(
-                vector=[0.0] * 3072, 
-                top_k=1,
-                filter={"source_file": {"$eq": filename_clean}},
-                include_metadata=False
-            )
-            return len(query_response['matches']) > 0
+            future.set_result(read_page_batch(*args))
         except Exception as e:
-            self.logger.error(f"Erro ao verificar arquivo {filename_clean}: {e}")
-            return False
+            future.set_exception(e)
+        return future
 
-    def _load_pdf(self, path: str) -> list[Document]:
+    def _load_pages(self, path: str) -> Iterator[ParsedPage]:
+        """
+        Páginas do PDF já divididas em chunks, em ordem. A decisão "digital x
+        escaneado" é tomada pelas primeiras PDF_PROBE_PAGES páginas. PDF digital:
+        leitura local em lotes de PDF_PAGE_BATCH páginas, com OCR só das páginas
+        sem texto de cada lote. PDF escaneado (ou ilegível localmente): OCR do
+        documento inteiro.
+        """
         file_name = os.path.basename(path)
-        
-        # 1. Tentativa Local
         try:
-            loader = PyPDFLoader(path)
-            documents = loader.load()
-            total_text = "".join([doc.page_content for doc in documents])
-            if len(total_text.strip()) > 100:
-                self.logger.info(f"[{file_name}] PDF Digital detectado. Leitura local.")
-                return documents
-            self.logger.warning(f"[{file_name}] Texto insuficiente. Possível scan.")
+            probe = self._read_batch(path, 0, settings.PDF_PROBE_PAGES).result()
         except Exception as e:
             self.logger.warning(f"[{file_name}] Erro local: {e}. Tentando OCR...")
+            probe = None
+
+        if probe is not None and probe.text_chars > settings.PDF_MIN_TEXT_CHARS:
+            self.logger.info(f"[{file_name}] PDF Digital detectado. Leitura local.")
+            yield from self._local_pages(path, probe)
+            return
+
+        if probe is not None:
+            self.logger.warning(f"[{file_name}] Texto insuficiente nas primeiras páginas. Possível scan.")
+        with span("index.ocr"):
+            docs = self._ocr_document(path)
+        yield from self._split_pages(docs)
 
-        # 2. Tentativa LlamaParse
-        self.logger.info(f"[{file_name}] Iniciando LlamaParse (OCR)...")
+    def _local_pages(self, path: str, probe: PageBatch) -> Iterator[ParsedPage]:
+        """
+        Páginas de um PDF digital, um lote por vez: enquanto o lote atual é
+        consumido, o próximo já está sendo lido no pool. A memória fica limitada
+        a dois lotes, qualquer que seja o tamanho do arquivo. Um erro depois das
+        primeiras páginas interrompe o arquivo (as anteriores já foram entregues).
+        """
+        size = max(1, settings.PDF_PAGE_BATCH)
+        batch, start = probe, settings.PDF_PROBE_PAGES
+        parse_seconds = split_seconds = 0.0
+        while batch is not None:
+            following = None
+            if start < batch.page_count:
+                following = self._read_batch(path, start, start + size)
+                start += size
+            parse_seconds += batch.parse_seconds
+            split_seconds += batch.split_seconds
+            yield from self._with_missing_pages(path, batch)
+            batch = following.result() if following is not None else None
+        record_span("index.load_pdf", parse_seconds)
+        record_span("index.split", split_seconds)
+
+    def _with_missing_pages(self, path: str, batch: PageBatch) -> list[ParsedPage]:
+        """Páginas do lote mais as sem texto recuperadas pelo OCR, em ordem."""
+        if not batch.missing_pages:
+            return batch.pages
+        file_name = os.path.basename(path)
+        self.logger.info(f"[{file_name}] {len(batch.missing_pages)} página(s) sem texto. OCR só nelas...")
+        # Best-effort: páginas em branco/assinatura de um PDF digital não impedem a indexação
         try:
-            parser = LlamaParse(result_type="markdown", language="pt", verbose=True)
-            llama_docs = parser.load_data(path)
-            if not llama_docs: return []
-
-            full_text = "\n\n".join([doc.text for doc in llama_docs])
-            merged_doc = Document(
-                page_content=full_text,
-                metadata={"source": path, "page": 0, "extraction_method": "llama_parse_ocr"}
-            )
-            return [merged_doc]
+            with span("index.ocr"):
+                recovered = self._ocr_pages(path, batch.missing_pages, partial=True)
         except Exception as e:
-            self.logger.error(f"[{file_name}] Falha no LlamaParse: {e}")
-            return []
+            self.logger.warning(f"[{file_name}] OCR das páginas sem texto falhou: {e}. Seguindo sem elas.")
+            recovered = []
+        pages = batch.pages + list(self._split_pages(recovered))
+        return sorted(pages, key=lambda page: page.metadata.get("page", 0))
+
+    def _split_pages(self, docs: list[Document]) -> Iterator[ParsedPage]:
+        """Split das páginas vindas do OCR, uma por vez (o tempo do OCR domina)."""
+        splitter = ParagraphTextSplitter(chunk_size=self.chunk_size, chunk_overlap=self.chunk_overlap)
+        return timed_iter("index.split", (
+            ParsedPage(doc.metadata, doc.page_content, split_page_chunks(splitter, doc.page_content))
+            for doc in docs))
+
+    def _ocr_document(self, path: str) -> list[Document]:
+        """OCR do documento inteiro, página a página (com cache por página)."""
+        return self._ocr_pages(path, list(range(self.ocr.page_count(path))))
+
+    def _ocr_pages(self, path: str, page_numbers: list[int], partial: bool = False) -> list[Document]:
+        """
+        OCR apenas das páginas indicadas, pelo backend configurado em settings.OCR_BACKEND.
+        Sem `partial`, uma página não lida levanta OCRIncompleteError (documento escaneado).
+        """
+        texts = self.ocr.ocr_pages(path, page_numbers, partial=partial)
+        method = f"{self.ocr.backend.name}_ocr"
+        return [
+            Document(page_content=texts[number],
+                     metadata={"source": path, "page": number, "extraction_method": method})
+            for number in page_numbers if texts.get(number, "").strip()
+        ]
+
+    @staticmethod
+    def _source_file_name(pdf_file: str) -> str:
+        """Nome limpo usado como metadado `source_file` (mesma regra do filtro fuzzy do RAG)."""
+        nome_bruto = Path(pdf_file).stem.lower().replace('.', ' ')
+        if len(nome_bruto) > 50:
+            return nome_bruto[:-32]
+        return nome_bruto
+
+    def _check_pending(self, pdf_file: str) -> IndexTask | None:
+        """
+        Estágio de verificação: consulta apenas o manifesto local. Arquivos que
+        o índice já tinha antes do manifesto existir vêm de _find_legacy_indexed.
+        """
+        path = os.path.join(self.folder, pdf_file)
+        nome_limpo = self._source_file_name(pdf_file)
+        status, previous, content_hash = self.manifest.check(path, embedding_signature())
+
+        if status == "unchanged":
+            self.logger.debug(f"[PULANDO] Sem alterações: {nome_limpo}")
+            return None
+
+        self._ensure_index()
+        if status == "new" and pdf_file in self._legacy_indexed:
+            # Migração: já está no índice, só registra no manifesto (com os IDs existentes)
+            self.logger.info(f"⏭️ [PULANDO] Já indexado (registrado no manifesto): {nome_limpo}")
+            self._record(IndexTask(pdf_file, path, nome_limpo, content_hash, ids=self._legacy_chunk_ids(pdf_file)))
+            return None
+
+        if status == "changed":
+            self.logger.info(f"🔄 Arquivo alterado, será reindexado: {pdf_file}")
+        return IndexTask(pdf_file, path, nome_limpo, content_hash, previous=previous)
+
+    def _prepare_file(self, task: IndexTask) -> Iterator[list[PendingChunk]]:
+        """
+        Estágio de leitura: carrega e divide o PDF (CPU, no pool de processos no modo
+        pipeline), faz o OCR que faltar e extrai as chaves da primeira página. Os
+        chunks de cada página entram no lote compartilhado assim que ela chega, com
+        IDs de um contador corrido; devolve os lotes que ficaram cheios. Chunks já
+        gravados numa execução interrompida (mesmo hash de conteúdo) são pulados.
+        """
+        self.logger.info(f"🚀 Indexando arquivo: {task.pdf_file}")
+        done = self.manifest.done_chunks(task.pdf_file, task.content_hash)
+        if done:
+            self.logger.info(f"   ↩️ Retomando {task.pdf_file}: {len(done)} chunks já enviados.")
+        remaining: set[str] = set()
+        with self._batch_lock:
+            self._pending[task.pdf_file] = (task, remaining)
 
-    def index_pdfs(self) -> None:
-        self._create_index_if_needed()
+        try:
+            yield from self._chunk_pages(task, done, remaining)
+        except Exception:
+            with self._batch_lock:
+                self._pending.pop(task.pdf_file, None)
+            self._progress.file_done(task.pdf_file, "failed")
+            raise
+
+        with self._batch_lock:
+            task.complete = True
+            finished = not remaining
+            if not task.ids:
+                self._pending.pop(task.pdf_file, None)
+        if not task.ids:
+            self._progress.file_done(task.pdf_file, "skipped")
+        elif finished:
+            self._finish_file(task)
+
+    def _chunk_pages(self, task: IndexTask, done: set[str], remaining: set[str]) -> Iterator[list[PendingChunk]]:
+        nome_limpo = task.source_file
+        cabecalho_rico, file_metadata = None, {}
+
+        # O texto (inclusive o de OCR) também alimenta o índice léxico do /search_pdf,
+        # gravado de uma vez só depois que o PDF inteiro foi lido
+        lexical_rows = []
+        for page in self._load_pages(task.path):
+            lexical_rows.append((page.metadata.get("page", 0), page.text))
+
+            # Chaves: as páginas chegam em ordem, a primeira é a que tem a qualificação das partes
+            if cabecalho_rico is None:
+                task.keys = TextProcessor.extract_contractor_keys(page.text)
+                cnpj_contratado = task.keys["cnpj_contratado"]
+                cpf_contratado = task.keys["cpf_contratado"]
+                file_metadata = {
+                    "cnpj_contratado": cnpj_contratado,
+                    "cpf_contratado": cpf_contratado,
+                    "contractor": self.CONTRACTOR_NAME,
+                    "source_file": nome_limpo,
+                }
+                cabecalho_rico = (
+                    f"Documento referente a: {nome_limpo}. "
+                    f"Contratado CNPJ: {cnpj_contratado}. "
+                    f"Contratado CPF: {cpf_contratado}. "
+                    f"Conteúdo: "
+                )
 
+            chunks = []
+            for text, start, end in page.chunks:
+                # ID Único
+                chunk_id = self._chunk_id(task.pdf_file, len(task.ids))
+                task.ids.append(chunk_id)
+                if chunk_id in done:
+                    continue
+                metadata = dict(page.metadata, chunk_start=start, chunk_end=end, **file_metadata)
+                chunks.append(PendingChunk(chunk_id=chunk_id, text=cabecalho_rico + text,
+                                           metadata=metadata, file_name=task.pdf_file))
+
+            with self._batch_lock:
+                remaining.update(c.chunk_id for c in chunks)
+                ready = self._batcher.add(chunks)
+            yield from ready
+
+        if task.ids:
+            self.lexical_index.index_document(task.path, lexical_rows, source="indexer")
+
+    def _flush_batches(self) -> None:
+        """Envia o último lote parcial e reporta os arquivos que ficaram incompletos."""
+        with self._batch_lock:
+            ready = self._batcher.flush()
+        for batch in ready:
+            self._upsert_batch(batch)
+        for pdf_file, (_, remaining) in self._pending.items():
+            self.logger.error(f"   ❌ {pdf_file}: {len(remaining)} chunks não foram gravados; será retomado na próxima execução.")
+            self._progress.file_done(pdf_file, "failed")
+        self._pending.clear()
+
+    def _upsert_batch(self, batch: list[PendingChunk]) -> set[str]:
+        """
+        Estágio de rede: embedding e upsert de um lote. Um arquivo termina quando
+        foi lido inteiro e todos os seus chunks foram gravados.
+        """
+        try:
+            saved = self.upserter.upsert(batch)
+        except Exception as e:
+            self.logger.exception(f"   ❌ Erro ao gerar embeddings do lote ({len(batch)} chunks): {e}")
+            return set()
+
+        per_file: dict[str, list[str]] = {}
+        for chunk in batch:
+            if chunk.chunk_id in saved:
+                per_file.setdefault(chunk.file_name, []).append(chunk.chunk_id)
+
+        finished = []
+        with self._batch_lock:
+            for pdf_file, ids in per_file.items():
+                if pdf_file not in self._pending:
+                    continue  # leitura falhou no meio: o arquivo é refeito na próxima execução
+                task, remaining = self._pending[pdf_file]
+                self.manifest.mark_chunks_done(pdf_file, task.content_hash, ids)
+                remaining.difference_update(ids)
+                if not remaining and task.complete:
+                    finished.append(task)
+        for task in finished:
+            self._finish_file(task)
+        return saved
+
+    def _finish_file(self, task: IndexTask) -> None:
+        """Todos os chunks gravados: remove vetores antigos e registra no manifesto."""
+        with self._batch_lock:
+            self._pending.pop(task.pdf_file, None)
+        self._delete_stale_vectors(task)
+        self._record(task)
+        self.identifiers.update_file(task.pdf_file, task.source_file, task.keys, task.ids)
+        self.manifest.clear_progress(task.pdf_file)
+        self.logger.info(f"   ✅ Sucesso! {len(task.ids)} vetores salvos ({task.pdf_file}).")
+        self._progress.file_done(task.pdf_file, "indexed")
+
+    def _delete_stale_vectors(self, task: IndexTask) -> None:
+        """Remove vetores da versão anterior do arquivo que não foram sobrescritos."""
+        if task.previous is None:
+            return
+        stale = sorted(set(task.previous.chunk_ids) - set(task.ids))
+        if stale:
+            for start in range(0, len(stale), 1000):  # limite de IDs por delete no Pinecone
+                self.index.delete(ids=stale[start:start + 1000])
+            self.logger.info(f"   🧹 {len(stale)} vetores antigos removidos ({task.pdf_file}).")
+        elif not task.previous.chunk_ids:
+            # Entrada migrada sem IDs conhecidos: os IDs são contíguos, então sobram os que vêm
+            # depois dos novos (o filtro por source_file apagaria também os vetores recém-gravados)
+            try:
+                leftover = self._legacy_chunk_ids(task.pdf_file, start=len(task.ids))
+                for start in range(0, len(leftover), 1000):
+                    self.index.delete(ids=leftover[start:start + 1000])
+            except Exception as e:
+                self.logger.warning(f"   Não foi possível remover vetores antigos de {task.pdf_file}: {e}")
+
+    def _record(self, task: IndexTask) -> None:
+        stat = os.stat(task.path)
+        self.manifest.record(ManifestEntry(
+            file_name=task.pdf_file,
+            source_file=task.source_file,
+            content_hash=task.content_hash,
+            size=stat.st_size,
+            mtime=stat.st_mtime,
+            embedding_model=embedding_signature(),
+            chunk_ids=task.ids,
+        ))
+
+    def rebuild_identifier_index(self) -> int:
+        """
+        Reconstrói a tabela CNPJ/CPF a partir do manifesto, extraindo as chaves
+        do texto já gravado no índice léxico (sem reler PDFs nem refazer OCR).
+        """
+        manifest_entries = self.manifest.all_entries()
+        all_keys = TextProcessor.extract_contractor_keys_many(
+            self.lexical_index.first_page_text(entry.file_name) for entry in manifest_entries)
+        entries = [(entry.file_name, entry.source_file, keys, entry.chunk_ids)
+                   for entry, keys in zip(manifest_entries, all_keys)]
+        total = self.identifiers.rebuild(entries)
+        self.logger.info(f"Tabela de CNPJ/CPF reconstruída: {total} arquivo(s).")
+        return total
+
+    def index_pdfs(self, progress: IndexProgress | None = None) -> None:
         if not os.path.isdir(self.folder):
             self.logger.warning(f"Pasta não encontrada: {self.folder}")
             return
 
         pdf_files = [f for f in os.listdir(self.folder) if f.lower().endswith(".pdf")]
+        self._progress = progress or IndexProgress()
+        self._progress.started(len(pdf_files))
         if not pdf_files:
             self.logger.info("Nenhum PDF encontrado.")
             return
 
         self.logger.info(f"Analisando {len(pdf_files)} arquivos na pasta...")
+        migrating = self.manifest.needs_legacy_check()
+        self._legacy_indexed = self._find_legacy_indexed(pdf_files) if migrating else set()
 
-        for pdf_file in pdf_files:
-            path = os.path.join(self.folder, pdf_file)
-            
-            # 1. Prepara nome limpo
-            nome_bruto = Path(pdf_file).stem.lower().replace('.', ' ')
-            if len(nome_bruto) > 50:
-                nome_limpo = nome_bruto[:-32]
+        try:
+            if settings.INDEX_CONCURRENCY > 1:
+                self._index_pipelined(pdf_files)
             else:
-                nome_limpo = nome_bruto
-
-            # 2. Verifica se pula
-            if self._is_file_indexed(nome_limpo):
-                self.logger.info(f"⏭️ [PULANDO] Já indexado: {nome_limpo}")
-                continue 
-
-            self.logger.info(f"🚀 Indexando NOVO arquivo: {pdf_file}")
-
-            # 3. Carrega
-            documents = self._load_pdf(path)
-            if not documents: continue
-
-            # Chaves
-            first_page_text = documents[0].page_content
-            keys = TextProcessor.extract_contractor_keys(first_page_text)
-            cnpj_contratado = keys["cnpj_contratado"]
-            cpf_contratado = keys["cpf_contratado"]
-
-            # Split
-            text_splitter = ParagraphTextSplitter(
-                chunk_size=self.chunk_size, 
-                chunk_overlap=self.chunk_overlap
-            )
-            docs_split = text_splitter.split_documents(documents)
-
-            # 4. IDs e Metadados
-            ids_para_salvar = []
-            for i, doc in enumerate(docs_split):
-                doc.metadata["cnpj_contratado"] = cnpj_contratado
-                doc.metadata["cpf_contratado"] = cpf_contratado
-                doc.metadata["contractor"] = self.CONTRACTOR_NAME
-                doc.metadata["source_file"] = nome_limpo
-                
-                cabecalho_rico = (
-                    f"Documento referente a: {nome_limpo}. "
-                    f"Contratado CNPJ: {cnpj_contratado}. "
-                    f"Contratado CPF: {cpf_contratado}. "
-                    f"Conteúdo: "
-                )
-                doc.page_content = cabecalho_rico + doc.page_content
+                self._index_sequential(pdf_files)
+            if migrating and not self._progress.cancelled():
+                self.manifest.mark_legacy_checked()
+        finally:
+            self._progress = IndexProgress()
+            self._legacy_indexed = set()
+
+        self.logger.info(f"Cache de embeddings: {self.embeddings.cache.stats()}")
+        self.logger.info("Ciclo de indexação finalizado.")
 
-                # ID Único
-                raw_id = f"{pdf_file}_{i}"
-                unique_id = hashlib.md5(raw_id.encode()).hexdigest()
-                ids_para_salvar.append(unique_id)
+    def _tracked(self, stage):
+        """Envolve um estágio reportando ao progresso os arquivos descartados (None) ou com erro."""
+        def run(item):
+            pdf_file = item if isinstance(item, str) else item.pdf_file
+            try:
+                result = stage(item)
+            except Exception:
+                self._progress.file_done(pdf_file, "failed")
+                raise
+            if result is None:
+                self._progress.file_done(pdf_file, "skipped")
+            return result
+        return run
+
+    def _pending_files(self, pdf_files: list[str]) -> Iterator[str]:
+        """Arquivos a iniciar; para de entregar quando o cancelamento é pedido."""
+        return takewhile(lambda _: not self._progress.cancelled(), pdf_files)
+
+    def _unless_cancelled(self, stage):
+        """Primeiro estágio do pipeline: arquivos que já estavam na fila não começam após o cancelamento."""
+        return lambda item: None if self._progress.cancelled() else stage(item)
+
+    def _index_sequential(self, pdf_files: list[str]) -> None:
+        check = self._tracked(self._check_pending)
+        for pdf_file in self._pending_files(pdf_files):
+            # 1. Verifica se pula
+            try:
+                task = check(pdf_file)
+            except Exception as e:
+                self.logger.exception(f"   ❌ Erro ao verificar {pdf_file}: {e}")
+                continue
+            if task is None:
+                continue
 
-            # 5. Salva
+            # 2. Carrega e divide; os lotes (compartilhados entre arquivos) são salvos à medida que enchem
             try:
-                self.vectorstore.add_documents(docs_split, ids=ids_para_salvar)
-                self.logger.info(f"   ✅ Sucesso! {len(docs_split)} vetores salvos.")
+                for batch in self._prepare_file(task):
+                    self._upsert_batch(batch)
             except Exception as e:
-                self.logger.exception(f"   ❌ Erro ao salvar vetores: {e}")
+                self.logger.exception(f"   ❌ Erro ao ler {pdf_file}: {e}")
 
-        self.logger.info("Ciclo de indexação finalizado.")
+        self._flush_batches()
+
+    def _index_pipelined(self, pdf_files: list[str]) -> None:
+        """
+        Modo concorrente: verificação -> leitura/split -> embedding/upsert,
+        cada estágio com seu pool limitado e filas com backpressure entre eles.
+        Entre leitura e rede passam lotes de chunks, não arquivos: o upsert de um
+        PDF grande começa antes de ele terminar de ser lido.
+        O parsing (PyPDF) e o split rodam num pool de INDEX_CONCURRENCY processos,
+        em lotes de PDF_PAGE_BATCH páginas; as threads do estágio leitura_split só
+        despacham para ele e cuidam do que é I/O (OCR, índice léxico em SQLite).
+        """
+        io_workers = max(1, settings.INDEX_IO_WORKERS)
+        cpu_workers = settings.INDEX_CONCURRENCY
+        pipeline = IndexingPipeline(
+            stages=[
+                Stage("verificacao", self._unless_cancelled(self._tracked(self._check_pending)), workers=io_workers),
+                Stage("leitura_split", self._prepare_file, workers=cpu_workers, fan_out=True),
+                Stage("embedding_upsert", self._upsert_batch, workers=io_workers),
+            ],
+            queue_size=settings.INDEX_QUEUE_SIZE,
+            logger=self.logger,
+        )
+        self.logger.info(
+            f"Modo pipeline: {cpu_workers} processo(s) de leitura/split, {io_workers} threads de rede.")
+        self._parse_pool = ProcessPoolExecutor(max_workers=cpu_workers)
+        try:
+            pipeline.run(self._pending_files(pdf_files))
+        finally:
+            self._parse_pool.shutdown()
+            self._parse_pool = None
+        self._flush_batches()
+        pipeline.log_summary()
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
@@ -0,0 +1,156 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from queue import Queue
+from typing import Any, Callable, Iterable
+
+# Marca o fim do fluxo entre estágios
+_STOP = object()
+
+
+@dataclass
+class StageStats:
+    """Contadores de um estágio do pipeline."""
+    name: str
+    workers: int
+    processed: int = 0
+    dropped: int = 0
+    failed: int = 0
+    busy_seconds: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, elapsed: float, outcome: str) -> None:
+        with self._lock:
+            self.busy_seconds += elapsed
+            if outcome == "ok":
+                self.processed += 1
+            elif outcome == "dropped":
+                self.dropped += 1
+            else:
+                self.failed += 1
+
+    def summary(self, wall_seconds: float) -> str:
+        total = self.processed + self.dropped + self.failed
+        throughput = total / wall_seconds if wall_seconds > 0 else 0.0
+        utilization = self.busy_seconds / (wall_seconds * self.workers) if wall_seconds > 0 else 0.0
+        return (
+            f"[{self.name}] workers={self.workers} ok={self.processed} "
+            f"descartados={self.dropped} falhas={self.failed} "
+            f"vazão={throughput:.2f} itens/s ocupação={utilization:.0%}"
+        )
+
+
+@dataclass
+class Stage:
+    """
+    Estágio do pipeline: `func` recebe um item e devolve o item para o próximo
+    estágio, ou None para descartá-lo (ex.: arquivo já indexado). Com `fan_out`,
+    `func` devolve um iterável e cada elemento segue para o próximo estágio assim
+    que é produzido (ex.: lotes de chunks de um PDF ainda em leitura).
+    """
+    name: str
+    func: Callable[[Any], Any]
+    workers: int = 1
+    fan_out: bool = False
+
+
+class IndexingPipeline:
+    """
+    Executa estágios encadeados, cada um com seu próprio pool de threads limitado.
+    Os estágios se comunicam por filas de tamanho fixo: quando um estágio lento
+    enche a fila, os anteriores bloqueiam (backpressure) em vez de acumular
+    PDFs carregados na memória.
+    """
+
+    def __init__(self, stages: list[Stage], queue_size: int = 8, logger: logging.Logger | None = None):
+        if not stages:
+            raise ValueError("O pipeline precisa de pelo menos um estágio.")
+        self.stages = stages
+        self.queue_size = max(1, queue_size)
+        self.logger = logger or logging.getLogger(__name__)
+        self.stats = [StageStats(name=s.name, workers=max(1, s.workers)) for s in stages]
+        self.wall_seconds = 0.0
+
+    def run(self, items: Iterable[Any]) -> list[StageStats]:
+        queues = [Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        threads: list[threading.Thread] = []
+
+        for idx, stage in enumerate(self.stages):
+            stats = self.stats[idx]
+            remaining = [stats.workers]
+            lock = threading.Lock()
+            for n in range(stats.workers):
+                t = threading.Thread(
+                    target=self._worker,
+                    args=(stage, stats, queues[idx], queues[idx + 1], remaining, lock,
+                          self.stats[idx + 1].workers if idx + 1 < len(self.stages) else 1),
+                    name=f"{stage.name}-{n}",
+                    daemon=True,
+                )
+                threads.append(t)
+
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+
+        # O último estágio escreve numa fila que ninguém lê: drena para não bloquear
+        drain = threading.Thread(target=self._drain, args=(queues[-1],), daemon=True)
+        drain.start()
+
+        for item in items:
+            queues[0].put(item)
+        for _ in range(self.stats[0].workers):
+            queues[0].put(_STOP)
+
+        for t in threads:
+            t.join()
+        drain.join()
+        self.wall_seconds = time.perf_counter() - start
+        return self.stats
+
+    def _worker(self, stage: Stage, stats: StageStats, inbox: Queue, outbox: Queue,
+                remaining: list[int], lock: threading.Lock, next_workers: int) -> None:
+        while True:
+            item = inbox.get()
+            if item is _STOP:
+                break
+            t0 = time.perf_counter()
+            blocked = 0.0  # espera na fila de saída (backpressure) não conta como ocupação
+            try:
+                result = stage.func(item)
+                if stage.fan_out:
+                    for output in result:
+                        t_put = time.perf_counter()
+                        outbox.put(output)
+                        blocked += time.perf_counter() - t_put
+            except Exception as e:
+                stats.record(time.perf_counter() - t0 - blocked, "failed")
+                self.logger.exception(f"[{stage.name}] Erro ao processar item: {e}")
+                continue
+            if stage.fan_out:
+                stats.record(time.perf_counter() - t0 - blocked, "ok")
+                continue
+            if result is None:
+                stats.record(time.perf_counter() - t0, "dropped")
+                continue
+            stats.record(time.perf_counter() - t0, "ok")
+            outbox.put(result)
+
+        # O último worker do estágio libera os workers do próximo
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            for _ in range(next_workers):
+                outbox.put(_STOP)
+
+    @staticmethod
+    def _drain(q: Queue) -> None:
+        while q.get() is not _STOP:
+            pass
+
+    def log_summary(self) -> None:
+        self.logger.info(f"Resumo do pipeline ({self.wall_seconds:.1f}s):")
+        for stats in self.stats:
+            self.logger.info("   " + stats.summary(self.wall_seconds))
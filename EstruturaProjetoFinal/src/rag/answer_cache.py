@@ -0,0 +1,116 @@
+import json
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.core.sqlite_store import SQLiteStore
+
+
+def filter_cache_key(final_filter: dict | None) -> str:
+    """Chave estável do filtro resolvido (a ordem das chaves não importa)."""
+    return json.dumps(final_filter, sort_keys=True, ensure_ascii=False)
+
+
+@dataclass
+class CachedAnswer:
+    """Resposta gravada: os tokens na mesma sequência em que foram transmitidos."""
+    question: str
+    tokens: list[str]
+    similarity: float
+
+
+class AnswerCache(SQLiteStore):
+    """
+    Cache de respostas do /ask. Um acerto exige o mesmo filtro resolvido e
+    uma pergunta com embedding quase idêntico (cosseno >= min_similarity),
+    dentro do TTL. Cada entrada guarda o hash de conteúdo dos arquivos usados
+    como contexto; se algum foi reindexado com outro conteúdo, a entrada é
+    descartada na leitura.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS answers (
+        id          INTEGER PRIMARY KEY AUTOINCREMENT,
+        filter_key  TEXT NOT NULL,
+        question    TEXT NOT NULL,
+        embedding   BLOB NOT NULL,
+        tokens      TEXT NOT NULL,
+        file_hashes TEXT NOT NULL,
+        created_at  REAL NOT NULL,
+        hits        INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE INDEX IF NOT EXISTS idx_answers_filter ON answers(filter_key, created_at);
+    """
+
+    def __init__(self, db_path, ttl: float, min_similarity: float, max_per_filter: int = 200):
+        super().__init__(db_path)
+        self.ttl = ttl
+        self.min_similarity = min_similarity
+        self.max_per_filter = max_per_filter
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _unit(vector: list[float]) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(v))
+        return v / norm if norm else v
+
+    def lookup(self, final_filter: dict | None, question_embedding: list[float],
+               current_hashes) -> CachedAnswer | None:
+        """
+        Melhor resposta para o filtro acima do limiar de similaridade.
+        `current_hashes(arquivos)` devolve {arquivo: hash atual} para validar a entrada.
+        """
+        if self.ttl <= 0:
+            return None
+        rows = self.query(
+            "SELECT id, question, embedding, tokens, file_hashes FROM answers "
+            "WHERE filter_key = ? AND created_at >= ? ORDER BY created_at DESC LIMIT ?",
+            (filter_cache_key(final_filter), time.time() - self.ttl, self.max_per_filter),
+        )
+        target = self._unit(question_embedding)
+        rows = [r for r in rows if len(r["embedding"]) == target.nbytes]  # ignora outro modelo/dimensão
+        answer = None
+        if rows:
+            matrix = np.stack([np.frombuffer(r["embedding"], dtype=np.float32) for r in rows])
+            scores = matrix @ target
+            for position in np.argsort(-scores):
+                if scores[position] < self.min_similarity:
+                    break
+                row = rows[position]
+                stored = json.loads(row["file_hashes"])
+                if stored and current_hashes(list(stored)) != stored:
+                    self.execute("DELETE FROM answers WHERE id = ?", (row["id"],))  # arquivo reindexado
+                    continue
+                self.execute("UPDATE answers SET hits = hits + 1 WHERE id = ?", (row["id"],))
+                answer = CachedAnswer(row["question"], json.loads(row["tokens"]), float(scores[position]))
+                break
+
+        with self._stats_lock:
+            if answer is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return answer
+
+    def store(self, final_filter: dict | None, question: str, question_embedding: list[float],
+              tokens: list[str], file_hashes: dict[str, str]) -> None:
+        if self.ttl <= 0:
+            return
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT INTO answers (filter_key, question, embedding, tokens, file_hashes, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (filter_cache_key(final_filter), question, self._unit(question_embedding).tobytes(),
+                 json.dumps(tokens, ensure_ascii=False), json.dumps(file_hashes, sort_keys=True), time.time()),
+            )
+            conn.execute("DELETE FROM answers WHERE created_at < ?", (time.time() - self.ttl,))
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0}
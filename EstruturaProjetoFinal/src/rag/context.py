@@ -0,0 +1,130 @@
+import re
+from dataclasses import dataclass, field
+
+from src.core.tokens import count_tokens
+
+# Cabeçalho que o indexador coloca no início de cada chunk (cabecalho_rico)
+_HEADER = re.compile(
+    r"^Documento referente a: (?P<source>.*?)\. Contratado CNPJ: (?P<cnpj>\S*)\. "
+    r"Contratado CPF: (?P<cpf>\S*)\. Conteúdo: ",
+    re.S,
+)
+
+
+def strip_header(text: str) -> tuple[str, dict[str, str]]:
+    """Remove o cabeçalho repetido do chunk; devolve (texto, campos do cabeçalho)."""
+    match = _HEADER.match(text)
+    if not match:
+        return text, {}
+    return text[match.end():], match.groupdict()
+
+
+@dataclass
+class _Piece:
+    """Trecho contínuo de uma página (um ou mais chunks fundidos)."""
+    source: str
+    page: int | None
+    start: int | None
+    end: int | None
+    text: str
+    rank: int
+    info: dict[str, str] = field(default_factory=dict)
+
+
+class ContextAssembler:
+    """
+    Monta o contexto do prompt a partir dos chunks ranqueados:
+    - remove o cabeçalho repetido de cada chunk (um cabeçalho por documento)
+    - funde chunks da mesma página que se sobrepõem ou são vizinhos (chunk_start/chunk_end)
+    - descarta trechos repetidos
+    - adiciona trechos, na ordem de relevância, até o orçamento de tokens
+    """
+
+    def __init__(self, token_budget: int):
+        self.token_budget = token_budget
+
+    def build_pieces(self, docs: list) -> list[_Piece]:
+        pieces: list[_Piece] = []
+        for rank, doc in enumerate(docs):
+            text, info = strip_header(doc.page_content)
+            meta = doc.metadata or {}
+            source = meta.get("source_file") or info.get("source", "")
+            if not info:
+                info = {"source": source}
+            info.setdefault("cnpj", meta.get("cnpj_contratado", ""))
+            info.setdefault("cpf", meta.get("cpf_contratado", ""))
+            start, end = meta.get("chunk_start"), meta.get("chunk_end")
+            page = meta.get("page")
+            pieces.append(_Piece(
+                source=source,
+                page=int(page) if page is not None else None,
+                # O Pinecone devolve números de metadado como float
+                start=int(start) if start is not None else None,
+                end=int(end) if end is not None else None,
+                text=text.strip(),
+                rank=rank,
+                info=info,
+            ))
+        return self._dedupe(self._merge(pieces))
+
+    @staticmethod
+    def _merge(pieces: list[_Piece]) -> list[_Piece]:
+        """Funde trechos da mesma página cujos offsets se tocam (o buffer usa um espaço entre parágrafos)."""
+        with_offsets = sorted(
+            (p for p in pieces if p.start is not None and p.end is not None),
+            key=lambda p: (p.source, p.page if p.page is not None else -1, p.start),
+        )
+        merged: list[_Piece] = []
+        for piece in with_offsets:
+            last = merged[-1] if merged else None
+            if (last is not None and last.source == piece.source and last.page == piece.page
+                    and piece.start <= last.end + 1):
+                if piece.end > last.end:
+                    if piece.start > last.end:  # vizinhos: um espaço separa os parágrafos no buffer
+                        last.text = f"{last.text} {piece.text}"
+                    else:
+                        last.text += piece.text[last.end - piece.start:]
+                    last.end = piece.end
+                last.rank = min(last.rank, piece.rank)
+            else:
+                merged.append(piece)
+        merged.extend(p for p in pieces if p.start is None or p.end is None)
+        return sorted(merged, key=lambda p: p.rank)
+
+    @staticmethod
+    def _dedupe(pieces: list[_Piece]) -> list[_Piece]:
+        """Descarta trechos idênticos ou contidos num trecho mais relevante do mesmo documento."""
+        kept: list[_Piece] = []
+        for piece in pieces:
+            if not piece.text:
+                continue
+            if any(piece.source == k.source and piece.text in k.text for k in kept):
+                continue
+            kept.append(piece)
+        return kept
+
+    def assemble(self, docs: list) -> str:
+        """Contexto final: trechos agrupados por documento, dentro do orçamento de tokens."""
+        selected: list[_Piece] = []
+        used = 0
+        for piece in self.build_pieces(docs):
+            tokens = count_tokens(piece.text)
+            if used + tokens > self.token_budget and selected:
+                continue  # não cabe: tenta um trecho menor
+            selected.append(piece)
+            used += tokens
+
+        sections: dict[str, list[_Piece]] = {}
+        for piece in selected:
+            sections.setdefault(piece.source, []).append(piece)
+
+        parts = []
+        for source, group in sections.items():
+            info = group[0].info
+            header = f"Documento referente a: {source}. Contratado CNPJ: {info.get('cnpj', '')}. " \
+                     f"Contratado CPF: {info.get('cpf', '')}."
+            body = "\n\n".join(
+                (f"[página {p.page + 1}] " if p.page is not None else "") + p.text for p in group
+            )
+            parts.append(f"{header}\n{body}")
+        return "\n\n---\n\n".join(parts)
@@ -1,12 +1,19 @@
 import logging
+import threading
+import time
 from langchain.chains import RetrievalQA
 from langchain.prompts import PromptTemplate
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.chat_models import ChatOpenAI
 from langchain_pinecone import PineconeVectorStore
-from pinecone import Pinecone as PineconeClient
-from rapidfuzz import process, fuzz
 from src.config.settings import settings
+from src.core.clients import registry
+from src.core.metrics import span
+from src.ingestion.manifest import IndexManifest
+from src.rag.answer_cache import AnswerCache
+from src.rag.context import ContextAssembler
+from src.rag.rerank import Reranker
+from src.rag.retrieval import Retriever
+from src.search.identifier_index import IdentifierIndex
+from src.search.name_index import NameIndex
 
 # Imports para Streaming
 from langchain.schema.runnable import RunnablePassthrough
@@ -20,16 +27,25 @@ def normalize_id_key(key: str) -> str:
 
 class CachedPineconeVectorStore(PineconeVectorStore):
     """
-    Extensão de PineconeVectorStore com cache de source_file robusto.
+    Extensão de PineconeVectorStore com catálogo local de source_file.
+    A lista de arquivos vem do manifesto do indexador (SQLite), sem embedding
+    nem consulta vetorial; o cache em memória é invalidado quando a versão do
+    catálogo muda (checada no máximo a cada `catalog_ttl` segundos).
     """
 
-    def __init__(self, index_name: str, embeddings):
-        super().__init__(index_name=index_name, embedding=embeddings, text_key="text")
-        self._pc = PineconeClient(
-            api_key=settings.PINECONE_API_KEY, environment=settings.PINECONE_ENVIRONMENT)
-        self._index = self._pc.Index(index_name)
+    def __init__(self, index, embeddings, manifest: IndexManifest | None = None,
+                 catalog_ttl: float = 30.0, logger: logging.Logger | None = None):
+        super().__init__(index=index, embedding=embeddings, text_key="text")
+        self._index = index
         self._emb = embeddings
+        self._manifest = manifest or IndexManifest(settings.INDEX_STATE_DB)
+        self._catalog_ttl = catalog_ttl
+        self._logger = logger or logging.getLogger(__name__)
         self._source_files_cache: list[str] | None = None
+        self._name_index = NameIndex([])
+        self._cache_version = -1
+        self._checked_at = 0.0
+        self._cache_lock = threading.Lock()
 
     @property
     def index(self): return self._index
@@ -37,51 +53,77 @@ class CachedPineconeVectorStore(PineconeVectorStore):
     def embeddings(self): return self._emb
 
     def get_all_source_files(self) -> list[str]:
-        """Retorna todos os source_file do índice Pinecone (aumentado para 10k)."""
-        if self._source_files_cache is not None:
+        """Retorna todos os source_file indexados (catálogo local, com fallback paginado no Pinecone)."""
+        now = time.monotonic()
+        if self._source_files_cache is not None and now - self._checked_at < self._catalog_ttl:
             return self._source_files_cache
 
-        all_files = set()
-        # Gera um vetor dummy para consulta de metadados
-        empty_vec = self._emb.embed_query(" ")
+        with self._cache_lock:
+            version = self._manifest.catalog_version()
+            self._checked_at = now
+            if self._source_files_cache is not None and version == self._cache_version:
+                return self._source_files_cache
+
+            files = self._manifest.source_files()
+            if not files:
+                # Índice criado antes do manifesto: lista os metadados direto do Pinecone
+                files = self._list_source_files_from_index()
+                if not files:
+                    return files  # não fixa lista vazia (falha transitória ou índice vazio)
+            self._source_files_cache = files
+            self._name_index = NameIndex(files)
+            self._cache_version = version
+            return files
+
+    def get_name_index(self) -> NameIndex:
+        """Índice fuzzy dos source_file, reconstruído junto com o catálogo."""
+        self.get_all_source_files()
+        return self._name_index
 
+    def _list_source_files_from_index(self, page_size: int = 100) -> list[str]:
+        """Percorre todos os IDs do índice (paginado) e lê o source_file via fetch."""
+        all_files = set()
         try:
-            # CORREÇÃO CRÍTICA: Aumentei top_k de 500 para 10000.
-            # Isso garante que o sistema veja TODOS os arquivos indexados.
-            result = self._index.query(
-                vector=empty_vec,
-                top_k=10000,
-                include_metadata=True,
-                filter={}
-            )
-            matches = result.get("matches", [])
-            for m in matches:
-                sf = m.get("metadata", {}).get("source_file")
-                if sf:
-                    all_files.add(sf.strip().lower())
+            for ids in self._index.list(limit=page_size):
+                fetched = self._index.fetch(ids=list(ids))
+                for vector in fetched.vectors.values():
+                    sf = (vector.metadata or {}).get("source_file")
+                    if sf:
+                        all_files.add(sf.strip().lower())
         except Exception as e:
-            print(f"Erro ao atualizar cache de arquivos: {e}")
-
-        self._source_files_cache = sorted(all_files)
-        return self._source_files_cache
+            self._logger.error(f"Erro ao listar arquivos do índice: {e}")
+        return sorted(all_files)
 
 
 class RAGPipeline:
     def __init__(self, logger: logging.Logger | None = None):
         self.logger = logger or logging.getLogger(__name__)
-        self.pc = PineconeClient(
-            api_key=settings.PINECONE_API_KEY, environment=settings.PINECONE_ENVIRONMENT)
-        self.embeddings = OpenAIEmbeddings(model=settings.EMBEDDING_MODEL)
+        # Clientes compartilhados pelo processo (ver src/core/clients.py)
+        self.embeddings = registry.embeddings()
         self.vectorstore = CachedPineconeVectorStore(
-            index_name=settings.PINECONE_INDEX_NAME,
-            embeddings=self.embeddings
+            index=registry.index(),
+            embeddings=self.embeddings,
+            catalog_ttl=settings.SOURCE_CATALOG_TTL,
+            logger=self.logger,
         )
 
-        self.llm = ChatOpenAI(
-            model_name=settings.LLM_MODEL,
-            temperature=settings.TEMPERATURE,
-            streaming=True,  # Habilita o streaming (efeito digitação)
-            api_key=settings.OPENAI_API_KEY
+        self.llm = registry.llm()
+        self.identifiers = IdentifierIndex(settings.INDEX_STATE_DB)
+        self.manifest = IndexManifest(settings.INDEX_STATE_DB)
+        self.retriever = Retriever(
+            index=registry.index(),
+            embeddings=self.embeddings,
+            manifest=self.manifest,
+            cache_items=settings.RETRIEVAL_CACHE_ITEMS,
+            pinned_docs=settings.RETRIEVAL_PINNED_DOCS,
+            logger=self.logger,
+        )
+        self.reranker = Reranker(alpha=settings.RERANK_ALPHA, lambda_=settings.RERANK_MMR_LAMBDA)
+        self.context_assembler = ContextAssembler(token_budget=settings.CONTEXT_TOKEN_BUDGET)
+        self.answer_cache = AnswerCache(
+            settings.ANSWER_CACHE_DB,
+            ttl=settings.ANSWER_CACHE_TTL,
+            min_similarity=settings.ANSWER_CACHE_MIN_SIMILARITY,
         )
 
         self.prompt_template = PromptTemplate(
@@ -108,23 +150,41 @@ PERGUNTA: {question}
 
     def get_qa_chain(self, question: str, search_key: dict):
         """Prepara a chain para Streaming no Flask."""
-        # 1. Resolve Filtros
+        final_filter = self.resolve_filter(search_key)
+        return self.build_chain(self.retrieve(question, final_filter))
+
+    def resolve_filter(self, search_key: dict) -> dict:
+        """Filtro de metadados final ({} = sem filtro)."""
         final_filter = {}
         if search_key:
-            if "cnpj_contratado" in search_key or "cpf_contratado" in search_key:
-                final_filter = search_key
-            elif "source_file" in search_key:
-                fuzzy = self._fuzzy_source_file_filter(
-                    search_key["source_file"])
-                if fuzzy:
-                    final_filter = fuzzy
-
-        # 2. Busca Documentos
+            with span("rag.filter"):
+                if "cnpj_contratado" in search_key or "cpf_contratado" in search_key:
+                    final_filter = self._identifier_filter(search_key)
+                elif "source_file" in search_key:
+                    fuzzy = self._fuzzy_source_file_filter(
+                        search_key["source_file"])
+                    if fuzzy:
+                        final_filter = fuzzy
+        return final_filter
+
+    def retrieve(self, question: str, final_filter: dict) -> list:
+        """
+        Busca os chunks de contexto em duas etapas: candidatos largos no índice
+        (ou no PDF fixado) e reranking local (o orçamento de tokens é aplicado
+        na montagem do contexto).
+        """
         self.logger.info(f"🔍 [RAG] Buscando com filtro: {final_filter}")
-        docs = self.vectorstore.similarity_search(
-            question, k=6, filter=final_filter)
+        with span("rag.retrieve"):
+            embedding, candidates = self.retriever.search(question, final_filter, k=settings.RERANK_CANDIDATES)
+        with span("rag.rerank"):
+            return self.reranker.rerank(question, embedding, candidates, k=settings.RERANK_TOP_K)
 
-        # Log para debug
+    def prefetch_document(self, file_name: str) -> None:
+        """Chamado ao abrir o preview: deixa os chunks do arquivo prontos para o /ask."""
+        self.retriever.prefetch(file_name)
+
+    def build_chain(self, docs: list):
+        """Monta a chain de geração sobre os documentos recuperados."""
         if not docs:
             self.logger.warning(
                 "⚠️ ZERO documentos retornados do Pinecone. Verifique o filtro.")
@@ -132,7 +192,9 @@ PERGUNTA: {question}
         else:
             self.logger.info(
                 f"✅ {len(docs)} documentos recuperados para contexto.")
-            context_str = "\n\n".join([d.page_content for d in docs])
+            # Sem cabeçalhos repetidos nem overlap duplicado, dentro do orçamento de tokens
+            with span("rag.context"):
+                context_str = self.context_assembler.assemble(docs)
 
         # 3. Monta a Chain
         chain = (
@@ -144,6 +206,51 @@ PERGUNTA: {question}
         )
         return chain
 
+    # --- Cache de respostas ---
+
+    def get_cached_answer(self, question: str, final_filter: dict | None) -> list[str] | None:
+        """Tokens de uma resposta já gerada para pergunta equivalente com o mesmo filtro."""
+        try:
+            with span("rag.answer_cache"):
+                embedding = self.embeddings.embed_query(question)
+                cached = self.answer_cache.lookup(final_filter, embedding, self.manifest.hashes_for_sources)
+        except Exception as e:
+            self.logger.warning(f"Cache de respostas indisponível: {e}")
+            return None
+        if cached is None:
+            return None
+        self.logger.info(
+            f"♻️ [RAG] Resposta do cache (similaridade {cached.similarity:.3f} com '{cached.question}').")
+        return cached.tokens
+
+    def store_answer(self, question: str, final_filter: dict | None, tokens: list[str], docs: list) -> None:
+        """Grava a resposta com o hash atual dos arquivos usados como contexto."""
+        source_files = sorted({d.metadata.get("source_file") for d in docs if d.metadata.get("source_file")})
+        if not tokens or not source_files:
+            return  # sem contexto não há arquivo para invalidar a entrada: não guarda
+        try:
+            self.answer_cache.store(final_filter, question, self.embeddings.embed_query(question), tokens,
+                                    self.manifest.hashes_for_sources(source_files))
+        except Exception as e:
+            self.logger.warning(f"Falha ao gravar no cache de respostas: {e}")
+
+    def _identifier_filter(self, search_key: dict) -> dict:
+        """
+        Troca o filtro por CNPJ/CPF pelos source_file encontrados na tabela local.
+        Se a tabela está vazia ou não tem o identificador, mantém o filtro original
+        por metadados: os vetores guardam cnpj_contratado/cpf_contratado mesmo para
+        arquivos que a tabela não cobre (indexados antes dela, reconstruídos sem o
+        texto do OCR ou com chaves extraídas por uma versão anterior do extrator).
+        """
+        if self.identifiers.is_empty():
+            return search_key
+        number = search_key.get("cnpj_contratado") or search_key.get("cpf_contratado")
+        source_files = sorted({m.source_file for m in self.identifiers.lookup(number)})
+        if not source_files:
+            self.logger.info(f"Identificador {number} fora da tabela local; usando o filtro por metadados.")
+            return search_key
+        return {"source_file": {"$in": source_files}}
+
     # Fallback para filtro fuzzy (nome do arquivo)
     def _fuzzy_source_file_filter(self, input_name: str) -> dict | None:
         if not input_name:
@@ -152,18 +259,17 @@ PERGUNTA: {question}
         # Limpeza idêntica ao indexador (troca ponto por espaço)
         input_name_clean = input_name.strip().lower().replace(".pdf", "").replace(".", " ")
 
-        all_files = self.vectorstore.get_all_source_files()
+        name_index = self.vectorstore.get_name_index()
 
         # Se cache vazio, retorna filtro exato direto
-        if not all_files:
+        if not len(name_index):
             return {"source_file": {"$eq": input_name_clean}}
 
-        # Match fuzzy (encontra o nome mais parecido na lista)
-        result = process.extractOne(
-            input_name_clean, all_files, scorer=fuzz.token_sort_ratio)
-        best_match, score = (result[0], result[1]) if result else (None, 0)
+        # Match fuzzy (token_sort_ratio sobre nomes pré-normalizados)
+        result = name_index.best_match(input_name_clean, settings.FUZZY_MATCH_THRESHOLD)
+        best_match, score = result if result else (None, 0)
 
-        if best_match and score > 65:
+        if best_match:
             self.logger.info(
                 f"🎯 Fuzzy Match: '{input_name}' -> '{best_match}' ({score}%)")
             return {"source_file": {"$eq": best_match}}
@@ -0,0 +1,104 @@
+import math
+import re
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.core.tokens import count_tokens
+
+_TOKEN = re.compile(r"\w+")
+_STOPWORDS = frozenset(
+    "a o as os de da do das dos e em no na nos nas um uma para por com que se ao aos pelo pela "
+    "qual quais é sao são ser foi como mais ou sua seu suas seus este esta isso essa esse".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    """Termos para o BM25: minúsculas, sem acentos, sem stopwords."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return [t for t in _TOKEN.findall(text) if len(t) > 1 and t not in _STOPWORDS]
+
+
+@dataclass
+class Candidate:
+    """Chunk recuperado na primeira etapa, com o vetor usado no reranking."""
+    doc: object
+    vector: np.ndarray | None
+    score: float = 0.0
+
+
+class Reranker:
+    """
+    Segunda etapa da busca, só CPU:
+    - relevância = alpha * cosseno + (1 - alpha) * BM25 (ambos normalizados no conjunto)
+    - seleção por MMR (lambda_) para não repetir trechos quase iguais
+    - para quando atinge `k` chunks ou o orçamento de tokens
+    """
+
+    def __init__(self, alpha: float = 0.7, lambda_: float = 0.7, k1: float = 1.5, b: float = 0.75):
+        self.alpha = alpha
+        self.lambda_ = lambda_
+        self.k1 = k1
+        self.b = b
+
+    def bm25(self, query: str, texts: list[str]) -> np.ndarray:
+        """BM25 da pergunta contra cada texto, com IDF calculado sobre os próprios candidatos."""
+        docs = [Counter(tokenize(t)) for t in texts]
+        terms = set(tokenize(query))
+        scores = np.zeros(len(docs), dtype=np.float32)
+        if not docs or not terms:
+            return scores
+        lengths = np.array([sum(d.values()) for d in docs], dtype=np.float32)
+        avg = float(lengths.mean()) or 1.0
+        for term in terms:
+            df = sum(1 for d in docs if term in d)
+            if not df:
+                continue
+            idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+            tf = np.array([d.get(term, 0) for d in docs], dtype=np.float32)
+            scores += idf * tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * lengths / avg))
+        return scores
+
+    @staticmethod
+    def _minmax(values: np.ndarray) -> np.ndarray:
+        low, high = float(values.min()), float(values.max())
+        return np.zeros_like(values) if high - low < 1e-9 else (values - low) / (high - low)
+
+    def rerank(self, query: str, query_vector: list[float], candidates: list[Candidate],
+               k: int, token_budget: int | None = None) -> list[object]:
+        if not candidates:
+            return []
+        dim = len(query_vector)
+        matrix = np.stack([
+            c.vector if c.vector is not None and len(c.vector) == dim else np.zeros(dim, dtype=np.float32)
+            for c in candidates
+        ]).astype(np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1, norms)
+        q = np.asarray(query_vector, dtype=np.float32)
+        q /= float(np.linalg.norm(q)) or 1.0
+
+        cosine = matrix @ q
+        lexical = self.bm25(query, [c.doc.page_content for c in candidates])
+        relevance = self.alpha * self._minmax(cosine) + (1 - self.alpha) * self._minmax(lexical)
+
+        selected: list[int] = []
+        used_tokens = 0
+        remaining = list(range(len(candidates)))
+        max_similarity = np.full(len(candidates), -1.0, dtype=np.float32)
+        while remaining and len(selected) < k:
+            mmr = self.lambda_ * relevance[remaining] - (1 - self.lambda_) * np.maximum(max_similarity[remaining], 0)
+            best = remaining[int(np.argmax(mmr))]
+            remaining.remove(best)
+            if token_budget is not None:
+                tokens = count_tokens(candidates[best].doc.page_content)
+                if used_tokens + tokens > token_budget:
+                    if selected:
+                        continue  # não cabe: tenta um chunk menor
+                used_tokens += tokens
+            selected.append(best)
+            max_similarity = np.maximum(max_similarity, matrix @ matrix[best])
+        return [candidates[i].doc for i in selected]
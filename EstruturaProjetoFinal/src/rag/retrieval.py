@@ -0,0 +1,186 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+from langchain_core.documents import Document
+
+from src.ingestion.manifest import IndexManifest
+from src.rag.answer_cache import filter_cache_key
+from src.rag.rerank import Candidate
+
+
+@dataclass
+class PinnedDocument:
+    """Chunks de um arquivo mantidos em memória, com os vetores já normalizados."""
+    source_file: str
+    content_hash: str
+    docs: list[Document]
+    vectors: np.ndarray
+
+
+def pinned_sources(final_filter: dict | None) -> list[str] | None:
+    """source_file de um filtro que só restringe o arquivo ($eq ou $in); senão None."""
+    if not final_filter or set(final_filter) != {"source_file"}:
+        return None
+    condition = final_filter["source_file"]
+    if isinstance(condition, str):
+        return [condition]
+    if isinstance(condition, dict) and len(condition) == 1:
+        if "$eq" in condition:
+            return [condition["$eq"]]
+        if "$in" in condition:
+            return list(condition["$in"])
+    return None
+
+
+class Retriever:
+    """
+    Primeira etapa da busca do RAG: devolve um conjunto largo de candidatos
+    com os vetores (para o reranking local).
+    - LRU de resultados por (filtro, embedding da pergunta, versão do catálogo)
+    - documentos "fixados": ao abrir o preview de um PDF, os chunks e vetores do
+      arquivo são buscados em segundo plano (index.fetch pelos IDs do manifesto);
+      perguntas filtradas por esse arquivo são respondidas por cosseno local,
+      sem ida ao Pinecone
+    """
+
+    def __init__(self, index, embeddings, manifest: IndexManifest,
+                 cache_items: int = 512, pinned_docs: int = 16, logger: logging.Logger | None = None):
+        self.index = index
+        self.embeddings = embeddings
+        self.manifest = manifest
+        self.cache_items = cache_items
+        self.pinned_docs = pinned_docs
+        self.logger = logger or logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._results: OrderedDict[tuple, list[Candidate]] = OrderedDict()
+        self._pinned: OrderedDict[str, PinnedDocument] = OrderedDict()
+        self._in_flight: set[str] = set()
+        self.cache_hits = 0
+        self.local_hits = 0
+        self.remote = 0
+
+    # --- Busca ---
+
+    def search(self, question: str, final_filter: dict | None, k: int = 30) -> tuple[list[float], list[Candidate]]:
+        """(embedding da pergunta, até `k` candidatos ordenados por cosseno)."""
+        embedding = self.embeddings.embed_query(question)
+
+        local = self._search_pinned(embedding, final_filter, k)
+        if local is not None:
+            with self._lock:
+                self.local_hits += 1
+            return embedding, local
+
+        key = (filter_cache_key(final_filter), self.manifest.catalog_version(), k,
+               hashlib.sha1(np.asarray(embedding, dtype=np.float32).tobytes()).hexdigest())
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None:
+                self._results.move_to_end(key)
+                self.cache_hits += 1
+                return embedding, list(cached)
+
+        candidates = self._query_index(embedding, final_filter, k)
+        with self._lock:
+            self.remote += 1
+            self._results[key] = candidates
+            while len(self._results) > self.cache_items:
+                self._results.popitem(last=False)
+        return embedding, list(candidates)
+
+    def _query_index(self, embedding: list[float], final_filter: dict | None, k: int) -> list[Candidate]:
+        result = self.index.query(vector=embedding, top_k=k, filter=final_filter or None,
+                                  include_metadata=True, include_values=True)
+        candidates = []
+        for match in result.get("matches", []):
+            metadata = dict(match.get("metadata") or {})
+            doc = Document(page_content=metadata.pop("text", ""), metadata=metadata)
+            values = match.get("values")
+            vector = np.asarray(values, dtype=np.float32) if values else None
+            candidates.append(Candidate(doc, vector, float(match.get("score", 0.0))))
+        return candidates
+
+    def _search_pinned(self, embedding: list[float], final_filter: dict | None, k: int) -> list[Candidate] | None:
+        sources = pinned_sources(final_filter)
+        if not sources:
+            return None
+        with self._lock:
+            pinned = [self._pinned.get(sf) for sf in sources]
+            if any(p is None for p in pinned):
+                return None
+            for sf in sources:
+                self._pinned.move_to_end(sf)
+
+        # Arquivo reindexado depois de fixado: descarta e volta ao Pinecone
+        current = self.manifest.hashes_for_sources(sources)
+        stale = [p.source_file for p in pinned if current.get(p.source_file) != p.content_hash]
+        if stale:
+            with self._lock:
+                for sf in stale:
+                    self._pinned.pop(sf, None)
+            return None
+
+        docs = [doc for p in pinned for doc in p.docs]
+        if not docs:
+            return []
+        matrix = pinned[0].vectors if len(pinned) == 1 else np.vstack([p.vectors for p in pinned])
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(query))
+        scores = matrix @ (query / norm if norm else query)
+        top = np.argsort(-scores)[:k]
+        return [Candidate(docs[i], matrix[i], float(scores[i])) for i in top]
+
+    # --- Pré-carga ---
+
+    def prefetch(self, file_name: str) -> None:
+        """Fixa os chunks de um arquivo em segundo plano (ignorado se já fixado e atual)."""
+        entry = self.manifest.get(file_name)
+        if entry is None or not entry.chunk_ids:
+            return
+        with self._lock:
+            current = self._pinned.get(entry.source_file)
+            if (current is not None and current.content_hash == entry.content_hash) \
+                    or entry.source_file in self._in_flight:
+                return
+            self._in_flight.add(entry.source_file)
+
+        def run():
+            try:
+                self._pin(entry.source_file, entry.content_hash, entry.chunk_ids)
+            except Exception as e:
+                self.logger.warning(f"Pré-carga de {file_name} falhou: {e}")
+            finally:
+                with self._lock:
+                    self._in_flight.discard(entry.source_file)
+
+        threading.Thread(target=run, name="retrieval-prefetch", daemon=True).start()
+
+    def _pin(self, source_file: str, content_hash: str, chunk_ids: list[str], batch_size: int = 100) -> None:
+        docs, vectors = [], []
+        for start in range(0, len(chunk_ids), batch_size):
+            fetched = self.index.fetch(ids=chunk_ids[start:start + batch_size])
+            for vector in fetched.vectors.values():
+                metadata = dict(vector.metadata or {})
+                docs.append(Document(page_content=metadata.pop("text", ""), metadata=metadata))
+                vectors.append(vector.values)
+        if not vectors:
+            return
+        matrix = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1, norms)
+
+        with self._lock:
+            self._pinned[source_file] = PinnedDocument(source_file, content_hash, docs, matrix)
+            self._pinned.move_to_end(source_file)
+            while len(self._pinned) > self.pinned_docs:
+                self._pinned.popitem(last=False)
+        self.logger.info(f"📌 {len(docs)} chunks de '{source_file}' fixados em memória.")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"cache_hits": self.cache_hits, "local_hits": self.local_hits, "remote": self.remote,
+                    "pinned_documents": len(self._pinned)}
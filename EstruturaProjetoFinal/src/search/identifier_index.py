@@ -0,0 +1,120 @@
+import json
+import re
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable
+
+from src.core.sqlite_store import SQLiteStore
+
+_MISSING = {"", "SEM_CNPJ", "SEM_CPF"}
+_LEADING_NUMBERS = re.compile(r"^[\d\s.\-/]+")
+
+
+def contractor_name_from_file(pdf_file: str) -> str:
+    """Nome do contratado pelo nome do arquivo: trecho antes de ".-.", sem o CNPJ/CPF inicial."""
+    stem = Path(pdf_file).stem.split(".-.")[0]
+    return _LEADING_NUMBERS.sub("", stem).replace(".", " ").strip()
+
+
+@dataclass
+class IdentifierMatch:
+    """Arquivo associado a um CNPJ/CPF."""
+    number: str
+    kind: str
+    file_name: str
+    source_file: str
+    contractor_name: str
+    chunk_ids: list[str] = field(default_factory=list)
+
+
+class IdentifierIndex(SQLiteStore):
+    """
+    Tabela local CNPJ/CPF -> arquivos, chunks e nome do contratado, preenchida
+    pelo indexador. Buscas por identificador não passam pela API de embeddings
+    nem pelo Pinecone.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS id_files (
+        file_name       TEXT PRIMARY KEY,
+        source_file     TEXT NOT NULL,
+        contractor_name TEXT NOT NULL,
+        chunk_ids       TEXT NOT NULL,
+        updated_at      REAL NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS id_keys (
+        number    TEXT NOT NULL,
+        kind      TEXT NOT NULL,
+        file_name TEXT NOT NULL,
+        PRIMARY KEY (number, file_name)
+    );
+    CREATE INDEX IF NOT EXISTS idx_id_keys_file ON id_keys(file_name);
+    """
+
+    @staticmethod
+    def _key_rows(file_name: str, keys: dict[str, str]) -> list[tuple[str, str, str]]:
+        rows = []
+        for field_name, kind in (("cnpj_contratado", "cnpj"), ("cpf_contratado", "cpf")):
+            number = keys.get(field_name, "")
+            if number not in _MISSING:
+                rows.append((number, kind, file_name))
+        return rows
+
+    def _write(self, conn, file_name: str, source_file: str, keys: dict[str, str], chunk_ids: list[str]) -> None:
+        conn.execute("DELETE FROM id_keys WHERE file_name = ?", (file_name,))
+        conn.execute(
+            "INSERT OR REPLACE INTO id_files VALUES (?, ?, ?, ?, ?)",
+            (file_name, source_file, contractor_name_from_file(file_name), json.dumps(chunk_ids), time.time()),
+        )
+        conn.executemany("INSERT OR REPLACE INTO id_keys VALUES (?, ?, ?)", self._key_rows(file_name, keys))
+
+    # --- Escrita ---
+
+    def update_file(self, file_name: str, source_file: str, keys: dict[str, str], chunk_ids: list[str]) -> None:
+        """Atualização incremental: substitui as chaves de um arquivo."""
+        with self.transaction() as conn:
+            self._write(conn, file_name, source_file, keys, chunk_ids)
+
+    def remove(self, file_name: str) -> None:
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM id_keys WHERE file_name = ?", (file_name,))
+            conn.execute("DELETE FROM id_files WHERE file_name = ?", (file_name,))
+
+    def rebuild(self, entries: Iterable[tuple[str, str, dict[str, str], list[str]]]) -> int:
+        """
+        Reconstrução em massa a partir de (file_name, source_file, chaves, chunk_ids).
+        As entradas são materializadas antes da transação; a tabela antiga
+        continua respondendo até o commit.
+        """
+        entries = list(entries)
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM id_keys")
+            conn.execute("DELETE FROM id_files")
+            for file_name, source_file, keys, chunk_ids in entries:
+                self._write(conn, file_name, source_file, keys, chunk_ids)
+        return len(entries)
+
+    # --- Consulta ---
+
+    def is_empty(self) -> bool:
+        return not self.query("SELECT 1 FROM id_files LIMIT 1")
+
+    def lookup(self, number: str) -> list[IdentifierMatch]:
+        """Arquivos cujo contratado tem esse CNPJ/CPF (aceita o número formatado)."""
+        digits = "".join(filter(str.isdigit, number or ""))
+        if not digits:
+            return []
+        rows = self.query(
+            "SELECT k.number, k.kind, f.file_name, f.source_file, f.contractor_name, f.chunk_ids "
+            "FROM id_keys k JOIN id_files f ON f.file_name = k.file_name "
+            "WHERE k.number = ? ORDER BY f.file_name",
+            (digits,),
+        )
+        return [
+            IdentifierMatch(
+                number=r["number"], kind=r["kind"], file_name=r["file_name"], source_file=r["source_file"],
+                contractor_name=r["contractor_name"], chunk_ids=json.loads(r["chunk_ids"]),
+            )
+            for r in rows
+        ]
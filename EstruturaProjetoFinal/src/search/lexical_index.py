@@ -0,0 +1,157 @@
+import logging
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Iterable
+
+from src.core.sqlite_store import SQLiteStore
+
+PageExtractor = Callable[[str], Iterable[tuple[int, str]]]
+
+_TOKEN = re.compile(r"\w+")
+
+
+class LexicalIndex(SQLiteStore):
+    """
+    Índice invertido persistente (SQLite FTS5) com o texto das páginas dos PDFs.
+    O tokenizer unicode61 com remove_diacritics ignora acentos e maiúsculas,
+    então "clausula" encontra "CLÁUSULA". Substitui a leitura de todos os PDFs
+    a cada busca do /search_pdf.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS documents (
+        file_name    TEXT PRIMARY KEY,
+        size         INTEGER NOT NULL,
+        mtime        REAL NOT NULL,
+        source       TEXT NOT NULL,
+        indexed_at   REAL NOT NULL
+    );
+    CREATE VIRTUAL TABLE IF NOT EXISTS pages USING fts5(
+        file_name UNINDEXED,
+        page UNINDEXED,
+        content,
+        tokenize = "unicode61 remove_diacritics 2"
+    );
+    """
+
+    def __init__(self, db_path, logger: logging.Logger | None = None):
+        super().__init__(db_path)
+        self.logger = logger or logging.getLogger(__name__)
+        self._sync_lock = threading.Lock()
+        self._last_sync = 0.0
+
+    # --- Escrita ---
+
+    @staticmethod
+    def _delete(conn, file_name: str) -> None:
+        conn.execute("DELETE FROM pages WHERE file_name = ?", (file_name,))
+        conn.execute("DELETE FROM documents WHERE file_name = ?", (file_name,))
+
+    def index_document(self, path: str | Path, pages: Iterable[tuple[int, str]], source: str) -> None:
+        """
+        Troca a versão anterior do documento pela nova numa única transação:
+        uma leitura que falha no meio não deixa páginas órfãs nem apaga o texto antigo.
+        """
+        file_name = os.path.basename(path)
+        stat = os.stat(path)
+        # Extrai tudo antes de pegar o lock: buscas não esperam pela leitura do PDF
+        rows = [(file_name, number, text) for number, text in pages if text and text.strip()]
+        with self.transaction() as conn:
+            self._delete(conn, file_name)
+            conn.executemany("INSERT INTO pages (file_name, page, content) VALUES (?, ?, ?)", rows)
+            conn.execute(
+                "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?)",
+                (file_name, stat.st_size, stat.st_mtime, source, time.time()),
+            )
+
+    def remove(self, file_name: str) -> None:
+        with self.transaction() as conn:
+            self._delete(conn, file_name)
+
+    # --- Sincronização incremental com a pasta ---
+
+    def sync(self, folder: str | Path, extract_pages: PageExtractor) -> int:
+        """
+        Indexa PDFs novos ou alterados (tamanho/mtime) e remove os que saíram da pasta.
+        Só mexe nas entradas gravadas pelo próprio sync: as do indexador (source="indexer")
+        têm o texto do OCR e vêm de settings.PDF_FOLDER, que pode não ser esta pasta.
+        Retorna quantos documentos foram (re)indexados.
+        """
+        folder = Path(folder)
+        if not folder.is_dir():
+            return 0
+        known = {r["file_name"]: (r["size"], r["mtime"], r["source"])
+                 for r in self.query("SELECT file_name, size, mtime, source FROM documents")}
+        present = set()
+        updated = 0
+
+        for path in folder.glob("*.pdf"):
+            present.add(path.name)
+            entry = known.get(path.name)
+            if entry is not None and entry[2] != "sync":
+                continue  # gravado pelo indexador
+            stat = path.stat()
+            if entry is not None and entry[:2] == (stat.st_size, stat.st_mtime):
+                continue
+            try:
+                self.index_document(path, extract_pages(str(path)), source="sync")
+                updated += 1
+            except Exception as e:
+                self.logger.warning(f"Índice léxico: falha ao extrair {path.name}: {e}")
+
+        for file_name, (_, _, source) in known.items():
+            if source == "sync" and file_name not in present:
+                self.remove(file_name)
+
+        if updated:
+            self.logger.info(f"Índice léxico: {updated} documento(s) atualizado(s).")
+        return updated
+
+    def schedule_sync(self, folder: str | Path, extract_pages: PageExtractor, min_interval: float) -> None:
+        """Dispara um sync em segundo plano se o último foi há mais de `min_interval` segundos."""
+        now = time.monotonic()
+        if now - self._last_sync < min_interval or not self._sync_lock.acquire(blocking=False):
+            return
+        self._last_sync = now
+
+        def run():
+            try:
+                self.sync(folder, extract_pages)
+            finally:
+                self._sync_lock.release()
+
+        threading.Thread(target=run, name="lexical-sync", daemon=True).start()
+
+    # --- Consulta ---
+
+    def first_page_text(self, file_name: str) -> str:
+        """Texto da primeira página com conteúdo gravada para o arquivo."""
+        rows = self.query(
+            "SELECT content FROM pages WHERE file_name = ? ORDER BY CAST(page AS INTEGER) LIMIT 1", (file_name,))
+        return rows[0]["content"] if rows else ""
+
+    @staticmethod
+    def build_match_query(query: str) -> str | None:
+        """
+        Converte o texto digitado numa frase FTS5 com prefixo no último termo,
+        aproximando o antigo `query in texto` (ex.: "contrat" encontra "contrato").
+        """
+        tokens = _TOKEN.findall(query)
+        if not tokens:
+            return None
+        return '"' + " ".join(tokens) + '"*'
+
+    def search(self, query: str, limit: int = 200) -> list[str]:
+        """Arquivos cujo texto contém a consulta, do mais relevante (BM25) para o menos."""
+        match = self.build_match_query(query)
+        if match is None:
+            return []
+        rows = self.query(
+            "SELECT file_name, MIN(rank) AS best FROM pages WHERE pages MATCH ? "
+            "GROUP BY file_name ORDER BY best LIMIT ?",
+            (match, limit),
+        )
+        return [r["file_name"] for r in rows]
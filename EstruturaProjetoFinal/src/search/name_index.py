@@ -0,0 +1,182 @@
+import os
+import re
+import threading
+from collections import defaultdict
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+_DIGIT_RUN = re.compile(r"\d[\d.\-/ ]*\d")
+
+
+def normalize_name(name: str) -> str:
+    """Mesma limpeza do indexador para `source_file`: minúsculas, sem .pdf, ponto vira espaço."""
+    name = name.strip().lower()
+    if name.endswith(".pdf"):
+        name = name[:-4]
+    return name.replace(".", " ").strip()
+
+
+def sort_tokens(name: str) -> str:
+    """Tokens ordenados: fuzz.ratio sobre esse texto equivale ao token_sort_ratio."""
+    return " ".join(sorted(name.split()))
+
+
+def document_keys(name: str) -> set[str]:
+    """CNPJ/CPF (ou raiz de CNPJ de 8 dígitos) presentes no nome, só com os dígitos."""
+    keys = set()
+    for run in _DIGIT_RUN.findall(name):
+        digits = "".join(filter(str.isdigit, run))
+        if len(digits) in (8, 11, 14):
+            keys.add(digits)
+    return keys
+
+
+class NameIndex:
+    """
+    Índice de nomes de arquivo pré-processado uma única vez:
+    - nomes normalizados e tokens ordenados (pontuação fuzzy em lote com cdist)
+    - trigramas -> posições (pré-filtro de candidatos e busca por substring)
+    - dígitos de CNPJ/CPF encontrados no nome -> arquivos
+    Imutável depois de construído; para atualizar, construa outro.
+    """
+
+    def __init__(self, names: Iterable[str], ngram: int = 3, max_df: float = 0.1, candidates: int = 256):
+        self.names = list(dict.fromkeys(names))
+        self.normalized = [normalize_name(n) for n in self.names]
+        self.sorted_tokens = [sort_tokens(n) for n in self.normalized]
+        self.ngram = ngram
+        self.candidates = candidates
+
+        self._by_normalized: dict[str, list[int]] = {}
+        for i, norm in enumerate(self.normalized):
+            self._by_normalized.setdefault(norm, []).append(i)
+        self._lengths = sorted({len(n) for n in self._by_normalized})
+
+        self._postings = self._build_postings(self.normalized)
+        # Trigramas presentes em mais de max_df dos nomes ("contrato", "empresa"...) não filtram nada
+        self._max_df = max(1, int(len(self.names) * max_df))
+
+        self._documents: dict[str, list[int]] = {}
+        for i, name in enumerate(self.names):
+            for key in document_keys(name):
+                self._documents.setdefault(key, []).append(i)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _grams(self, text: str) -> set[str]:
+        n = self.ngram
+        return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+    def _build_postings(self, texts: list[str]) -> dict[str, np.ndarray]:
+        postings: defaultdict[str, list[int]] = defaultdict(list)
+        for i, text in enumerate(texts):
+            for gram in self._grams(text):
+                postings[gram].append(i)
+        return {gram: np.asarray(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+    # --- Fuzzy (nome digitado pelo usuário -> nome indexado) ---
+
+    def best_match(self, query: str, threshold: float) -> tuple[str, float] | None:
+        """
+        Nome mais parecido com `query` (token_sort_ratio) se a nota passar de `threshold`.
+        Pontua só os candidatos que mais compartilham trigramas; se nenhum passa,
+        pontua a lista inteira para não perder casamentos fora do pré-filtro.
+        """
+        if not self.names:
+            return None
+        target = sort_tokens(normalize_name(query))
+        candidates = self._fuzzy_candidates(target)
+        result = self._score(target, candidates, threshold)
+        if result is None and candidates is not None:
+            result = self._score(target, None, threshold)
+        return result
+
+    def _fuzzy_candidates(self, target: str) -> np.ndarray | None:
+        postings = [p for p in (self._postings.get(g) for g in self._grams(target))
+                    if p is not None and len(p) <= self._max_df]
+        if not postings:
+            return None
+        ids, counts = np.unique(np.concatenate(postings), return_counts=True)
+        if len(ids) <= self.candidates:
+            return ids
+        return ids[np.argpartition(counts, -self.candidates)[-self.candidates:]]
+
+    def _score(self, target: str, ids: np.ndarray | None, threshold: float) -> tuple[str, float] | None:
+        choices = self.sorted_tokens if ids is None else [self.sorted_tokens[i] for i in ids]
+        if not choices:
+            return None
+        scores = process.cdist([target], choices, scorer=fuzz.ratio, dtype=np.float32, workers=1)[0]
+        best = int(np.argmax(scores))
+        if scores[best] <= threshold:
+            return None
+        position = best if ids is None else int(ids[best])
+        return self.names[position], float(scores[best])
+
+    # --- Substring (candidato do Pinecone -> arquivo local) ---
+
+    def find_substring(self, text: str) -> list[str]:
+        """Nomes cujo texto normalizado contém `text` ou está contido nele."""
+        text = normalize_name(text)
+        if not text:
+            return []
+        hits = set(self._containing(text))
+        # Nomes contidos no texto: só comprimentos que existem no índice
+        for length in self._lengths:
+            if length > len(text):
+                break
+            for start in range(len(text) - length + 1):
+                hits.update(self._by_normalized.get(text[start:start + length], ()))
+        return [self.names[i] for i in sorted(hits)]
+
+    def _containing(self, text: str) -> Iterable[int]:
+        grams = self._grams(text)
+        if not grams:  # texto menor que o n-grama: varredura simples
+            return (i for i, norm in enumerate(self.normalized) if text in norm)
+        postings = sorted((self._postings.get(g) for g in grams), key=lambda p: 0 if p is None else len(p))
+        if postings[0] is None:
+            return ()
+        ids = postings[0]
+        for p in postings[1:]:
+            if len(ids) <= 8:  # poucos candidatos: verificar direto é mais barato
+                break
+            ids = np.intersect1d(ids, p, assume_unique=True)
+        return (int(i) for i in ids if text in self.normalized[i])
+
+    # --- CNPJ / CPF no nome do arquivo ---
+
+    def find_by_document(self, number: str) -> list[str]:
+        """Arquivos com o CNPJ/CPF no nome (CNPJ também casa pela raiz de 8 dígitos)."""
+        digits = "".join(filter(str.isdigit, number or ""))
+        ids = set(self._documents.get(digits, ()))
+        if len(digits) == 14:
+            ids.update(self._documents.get(digits[:8], ()))
+        return [self.names[i] for i in sorted(ids)]
+
+
+class FolderNameIndex:
+    """NameIndex dos PDFs de uma pasta, reconstruído só quando a pasta muda (mtime do diretório)."""
+
+    def __init__(self, folder: str | Path):
+        self.folder = Path(folder)
+        self._lock = threading.Lock()
+        self._mtime: int | None = None
+        self._index = NameIndex([])
+
+    def current(self) -> NameIndex:
+        try:
+            mtime = os.stat(self.folder).st_mtime_ns
+        except FileNotFoundError:
+            return self._index
+        # Só uma thread reconstrói; as demais seguem com o índice anterior
+        if mtime != self._mtime and self._lock.acquire(blocking=False):
+            try:
+                names = [e.name for e in os.scandir(self.folder) if e.name.endswith(".pdf") and e.is_file()]
+                self._index = NameIndex(names)
+                self._mtime = mtime
+            finally:
+                self._lock.release()
+        return self._index
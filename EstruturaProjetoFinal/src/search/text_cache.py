@@ -0,0 +1,141 @@
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterator
+
+from src.core.sqlite_store import SQLiteStore
+from src.ingestion.manifest import IndexManifest
+from src.search.lexical_index import PageExtractor
+
+
+class PageTextCache(SQLiteStore):
+    """
+    Cache do texto extraído dos PDFs, compartilhado pelo /preview_pdf e pelo
+    índice léxico do /search_pdf.
+    - Disco: texto de cada página comprimido (zlib), chave = hash do arquivo
+    - Memória: LRU por página, limitado pelo total de caracteres
+    Cada versão de arquivo é extraída uma única vez; quando o arquivo muda, as
+    páginas da versão anterior são apagadas (se nenhum outro caminho as usa).
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS files (
+        path       TEXT PRIMARY KEY,
+        size       INTEGER NOT NULL,
+        mtime      REAL NOT NULL,
+        file_hash  TEXT NOT NULL,
+        page_count INTEGER NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS pages (
+        file_hash TEXT NOT NULL,
+        page      INTEGER NOT NULL,
+        text      BLOB NOT NULL,
+        PRIMARY KEY (file_hash, page)
+    );
+    """
+
+    def __init__(self, db_path, extractor: PageExtractor, memory_chars: int = 20_000_000):
+        super().__init__(db_path)
+        self.extractor = extractor
+        self.memory_chars = memory_chars
+        self._memory: OrderedDict[tuple[str, int], str] = OrderedDict()
+        self._memory_size = 0
+        self._memory_lock = threading.Lock()
+        self._prune()
+
+    def _prune(self) -> None:
+        """Páginas de versões que nenhum arquivo referencia mais (gravadas antes da limpeza em _resolve)."""
+        self.execute("DELETE FROM pages WHERE file_hash NOT IN (SELECT file_hash FROM files)")
+
+    def _resolve(self, path: str | Path) -> tuple[str, int]:
+        """(hash, nº de páginas) do arquivo; extrai e grava o texto se essa versão ainda não existe."""
+        path = str(path)
+        stat = os.stat(path)
+        rows = self.query("SELECT * FROM files WHERE path = ?", (path,))
+        if rows and rows[0]["size"] == stat.st_size and rows[0]["mtime"] == stat.st_mtime:
+            return rows[0]["file_hash"], rows[0]["page_count"]
+
+        file_hash = IndexManifest.file_hash(path)
+        previous_hash = rows[0]["file_hash"] if rows and rows[0]["file_hash"] != file_hash else None
+        known = self.query("SELECT COUNT(*) AS n FROM pages WHERE file_hash = ?", (file_hash,))[0]["n"]
+        # Extrai fora da transação: leituras de outros arquivos não esperam pelo PDF
+        texts = None if known else {number: text or "" for number, text in self.extractor(path)}
+        page_count = known or (max(texts) + 1 if texts else 0)
+
+        with self.transaction() as conn:
+            if texts is not None:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO pages VALUES (?, ?, ?)",
+                    [(file_hash, n, zlib.compress(texts.get(n, "").encode("utf-8"))) for n in range(page_count)],
+                )
+            conn.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)",
+                         (path, stat.st_size, stat.st_mtime, file_hash, page_count))
+            if previous_hash is not None:
+                # Versão anterior: apaga as páginas, a menos que outro caminho (cópia) ainda aponte para ela
+                conn.execute(
+                    "DELETE FROM pages WHERE file_hash = ? AND NOT EXISTS (SELECT 1 FROM files WHERE file_hash = ?)",
+                    (previous_hash, previous_hash),
+                )
+        if previous_hash is not None:
+            self._forget(previous_hash)
+        return file_hash, page_count
+
+    def page_count(self, path: str | Path) -> int:
+        return self._resolve(path)[1]
+
+    def get_pages(self, path: str | Path, start: int = 0, end: int | None = None) -> tuple[list[str], int]:
+        """
+        Texto das páginas [start, end) (base 0) e o total de páginas do arquivo.
+        Só as páginas pedidas são descomprimidas.
+        """
+        file_hash, page_count = self._resolve(path)
+        start = max(0, start)
+        end = page_count if end is None else min(end, page_count)
+        wanted = list(range(start, end))
+
+        texts: dict[int, str] = {}
+        with self._memory_lock:
+            for n in wanted:
+                text = self._memory.get((file_hash, n))
+                if text is not None:
+                    self._memory.move_to_end((file_hash, n))
+                    texts[n] = text
+
+        missing = [n for n in wanted if n not in texts]
+        if missing:
+            rows = self.query(
+                "SELECT page, text FROM pages WHERE file_hash = ? AND page BETWEEN ? AND ?",
+                (file_hash, missing[0], missing[-1]),
+            )
+            with self._memory_lock:
+                for row in rows:
+                    if row["page"] in texts:
+                        continue
+                    text = zlib.decompress(row["text"]).decode("utf-8")
+                    texts[row["page"]] = text
+                    self._remember((file_hash, row["page"]), text)
+
+        return [texts.get(n, "") for n in wanted], page_count
+
+    def iter_pages(self, path: str) -> Iterator[tuple[int, str]]:
+        """Mesmo formato do extrator, lendo do cache (usado pelo sync do índice léxico)."""
+        pages, _ = self.get_pages(path)
+        yield from enumerate(pages)
+
+    def _forget(self, file_hash: str) -> None:
+        """Tira da LRU as páginas de uma versão apagada do disco."""
+        with self._memory_lock:
+            for key in [k for k in self._memory if k[0] == file_hash]:
+                self._memory_size -= len(self._memory.pop(key))
+
+    def _remember(self, key: tuple[str, int], text: str) -> None:
+        # Chamado com _memory_lock adquirido
+        if key in self._memory:
+            return
+        self._memory[key] = text
+        self._memory_size += len(text)
+        while self._memory_size > self.memory_chars and self._memory:
+            _, old = self._memory.popitem(last=False)
+            self._memory_size -= len(old)
@@ -0,0 +1,590 @@
+import json
+import logging
+import math
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from src.core.sqlite_store import SQLiteStore
+
+# Campos de metadado com índice de colunas (os únicos aceitos em filtros)
+INDEXED_FIELDS = ("source_file", "cnpj_contratado", "cpf_contratado")
+
+
+@dataclass
+class VectorRecord:
+    """Vetor devolvido pelo fetch (mesmos atributos do Pinecone: id, values, metadata)."""
+    id: str
+    values: list[float]
+    metadata: dict
+
+
+@dataclass
+class FetchResponse:
+    vectors: dict[str, VectorRecord] = field(default_factory=dict)
+
+
+class _VectorCatalog(SQLiteStore):
+    """IDs, metadados e colunas indexadas de cada linha dos shards."""
+
+    SCHEMA = f"""
+    CREATE TABLE IF NOT EXISTS vectors (
+        row      INTEGER PRIMARY KEY,
+        id       TEXT NOT NULL UNIQUE,
+        metadata TEXT NOT NULL,
+        cluster  INTEGER NOT NULL DEFAULT -1,
+        {", ".join(f"{name} TEXT" for name in INDEXED_FIELDS)}
+    );
+    CREATE TABLE IF NOT EXISTS meta (
+        key   TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    );
+    """
+
+    def get_meta(self, key: str) -> str | None:
+        rows = self.query("SELECT value FROM meta WHERE key = ?", (key,))
+        return rows[0]["value"] if rows else None
+
+    def set_meta(self, key: str, value) -> None:
+        self.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+
+class _Shard:
+    """
+    `rows` vetores de um shard, em arquivos mapeados em memória:
+    - códigos no tipo de armazenamento (float32, float16 ou int8 com escala por linha)
+    - cópia float32 opcional (`keep_full`) para o rescoring: fica no disco e só
+      as linhas dos candidatos finais são lidas
+    """
+
+    SUFFIXES = {"float32": ".f32", "float16": ".f16", "int8": ".i8"}
+    BLOCK = 2048  # linhas convertidas para float32 por vez (tipos compactos)
+
+    def __init__(self, base: Path, rows: int, dimension: int, dtype: str, keep_full: bool):
+        self.dtype = dtype
+        self.codes = self._map(base.with_suffix(self.SUFFIXES[dtype]), np.dtype(dtype), (rows, dimension))
+        self.scales = self._map(base.with_suffix(".scale"), np.float32, (rows,)) if dtype == "int8" else None
+        self.full = (self._map(base.with_suffix(".f32"), np.float32, (rows, dimension))
+                     if keep_full and dtype != "float32" else None)
+
+    @staticmethod
+    def _map(path: Path, dtype, shape: tuple) -> np.memmap:
+        return np.memmap(path, dtype=dtype, mode="r+" if path.exists() else "w+", shape=shape)
+
+    def write(self, local: int, vector: np.ndarray) -> None:
+        if self.scales is not None:
+            scale = float(np.abs(vector).max()) / 127 or 1.0
+            self.codes[local] = np.round(vector / scale).astype(np.int8)
+            self.scales[local] = scale
+        else:
+            self.codes[local] = vector
+        if self.full is not None:
+            self.full[local] = vector
+
+    def flush(self) -> None:
+        for array in (self.codes, self.scales, self.full):
+            if array is not None:
+                array.flush()
+
+    def decode(self, local) -> np.ndarray:
+        """Vetores aproximados (reconstruídos dos códigos), em float32."""
+        block = np.asarray(self.codes[local], dtype=np.float32)
+        if self.scales is not None:
+            block = block * np.asarray(self.scales[local])[..., None]
+        return block
+
+    def original(self, local) -> np.ndarray:
+        """Vetores em precisão total se houver a cópia float32; senão, os aproximados."""
+        return np.asarray(self.full[local]) if self.full is not None else self.decode(local)
+
+    def _dot(self, selection, q: np.ndarray) -> np.ndarray:
+        block = self.codes[selection]
+        if self.dtype == "float32":
+            return block @ q
+        scores = block.astype(np.float32) @ q
+        return scores * self.scales[selection] if self.scales is not None else scores
+
+    def scores(self, local: np.ndarray, q: np.ndarray) -> np.ndarray:
+        """Produto escalar das linhas indicadas; shard muito usado é lido em blocos contíguos."""
+        if len(local) * 4 >= len(self.codes):
+            end = int(local.max()) + 1
+            dense = np.empty(end, dtype=np.float32)
+            for start in range(0, end, self.BLOCK):
+                dense[start:start + self.BLOCK] = self._dot(slice(start, min(end, start + self.BLOCK)), q)
+            return dense[local]
+        out = np.empty(len(local), dtype=np.float32)
+        for start in range(0, len(local), self.BLOCK):
+            out[start:start + self.BLOCK] = self._dot(local[start:start + self.BLOCK], q)
+        return out
+
+
+class LocalVectorIndex:
+    """
+    Índice vetorial no próprio processo, com a mesma interface do Pinecone.Index
+    usada no projeto (query, upsert, fetch, delete, list, describe_index_stats).
+
+    - vetores normalizados (métrica cosseno) em shards de `shard_rows` linhas,
+      mapeados em memória (np.memmap); o sistema operacional mantém em cache
+      só as páginas usadas
+    - armazenamento `dtype`: float32, float16 (metade) ou int8 (um quarto, com
+      escala por vetor). Nos tipos compactos, `rescore` guarda também a cópia
+      float32 no disco: a busca pega `rescore_factor` * top_k candidatos pelos
+      códigos e reordena só esses em precisão total
+    - busca exata: produto escalar em lote (BLAS) por shard; com filtro, só as
+      linhas selecionadas são lidas
+    - filtros ($eq, $ne, $in, $nin, $and, $or) sobre INDEXED_FIELDS, avaliados
+      em arrays de códigos em memória (um por coluna)
+    - ANN opcional (ann="ivf"): k-means esférico sobre uma amostra, treinado
+      em segundo plano a partir de `ann_min_rows` vetores; a consulta visita as
+      `nprobe` listas mais próximas. Filtros seletivos (até `exact_max_rows`
+      linhas) continuam com busca exata
+    - o fetch devolve os vetores já normalizados
+    """
+
+    def __init__(self, path: str | Path, dimension: int | None = None, shard_rows: int = 16384,
+                 dtype: str = "float32", rescore: bool = True, rescore_factor: int = 4,
+                 ann: str = "none", ann_min_rows: int = 50000, nprobe: int = 8,
+                 exact_max_rows: int = 20000, logger: logging.Logger | None = None):
+        if dtype not in _Shard.SUFFIXES:
+            raise ValueError(f"Tipo de armazenamento inválido: {dtype} (use {', '.join(_Shard.SUFFIXES)}).")
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.shard_rows = shard_rows
+        self.ann = ann
+        self.ann_min_rows = ann_min_rows
+        self.nprobe = nprobe
+        self.exact_max_rows = exact_max_rows
+        self.logger = logger or logging.getLogger(__name__)
+        self._lock = threading.RLock()
+        self._catalog = _VectorCatalog(self.path / "catalog.db")
+
+        stored = self._catalog.get_meta("dimension")
+        self.dimension = int(stored) if stored else dimension
+        if stored and dimension and int(stored) != dimension:
+            raise ValueError(f"Índice local em {self.path} tem dimensão {stored}, esperado {dimension}: "
+                             f"use outro índice (PINECONE_INDEX_NAME) para a nova dimensão.")
+
+        # Formato de armazenamento fixado na criação do índice
+        stored_dtype = self._catalog.get_meta("dtype")
+        if stored_dtype and stored_dtype != dtype:
+            raise ValueError(f"Índice local em {self.path} foi criado com {stored_dtype}, configurado {dtype}.")
+        self.dtype = dtype
+        keep_full = rescore and dtype != "float32"
+        stored_full = self._catalog.get_meta("full_copy")
+        if stored_full is not None and (stored_full == "1") != keep_full:
+            self.logger.warning("Índice local: rescoring mantido como na criação do índice (cópia float32 "
+                                f"{'presente' if stored_full == '1' else 'ausente'}).")
+            keep_full = stored_full == "1"
+        self.keep_full = keep_full
+        self.rescore_factor = max(1, rescore_factor)
+        self._catalog.set_meta("dtype", dtype)
+        self._catalog.set_meta("full_copy", int(keep_full))
+
+        self._shards: list[_Shard] = []
+        self._ids: list[str | None] = []
+        self._rows: dict[str, int] = {}
+        self._free: list[int] = []
+        self._alive = np.zeros(0, dtype=bool)
+        self._assign = np.zeros(0, dtype=np.int32)
+        self._codes = {name: np.zeros(0, dtype=np.int32) for name in INDEXED_FIELDS}
+        self._values: dict[str, dict[str, int]] = {name: {} for name in INDEXED_FIELDS}
+        self._centroids: np.ndarray | None = None
+        self._trained_rows = 0
+        self._training = False
+        self._changed_while_training: set[int] = set()
+        self._load()
+
+    # --- Estado em memória ---
+
+    def _load(self) -> None:
+        columns = ", ".join(INDEXED_FIELDS)
+        rows = self._catalog.query(f"SELECT row, id, cluster, {columns} FROM vectors ORDER BY row")
+        size = rows[-1]["row"] + 1 if rows else 0
+        self._grow(size)
+        self._ids = [None] * size
+        for r in rows:
+            row = r["row"]
+            self._ids[row] = r["id"]
+            self._rows[r["id"]] = row
+            self._alive[row] = True
+            self._assign[row] = r["cluster"]
+            for name in INDEXED_FIELDS:
+                self._codes[name][row] = self._code(name, r[name])
+        self._free = [row for row in range(size - 1, -1, -1) if self._ids[row] is None]
+
+        centroids = self.path / "ivf_centroids.npy"
+        if self.ann == "ivf" and centroids.exists():
+            self._centroids = np.load(centroids)
+            self._trained_rows = int(self._catalog.get_meta("ivf_rows") or 0)
+        if self.dimension:
+            shards = math.ceil(size / self.shard_rows)
+            for number in range(shards):
+                self._open_shard(number)
+        if rows:
+            self.logger.info(f"Índice vetorial local: {len(rows)} vetores em {len(self._shards)} shard(s) ({self.path}).")
+
+    def _grow(self, size: int) -> None:
+        capacity = len(self._alive)
+        if size <= capacity:
+            return
+        new_capacity = max(size, capacity * 2, 1024)
+
+        def extend(array: np.ndarray, fill) -> np.ndarray:
+            grown = np.full(new_capacity, fill, dtype=array.dtype)
+            grown[:capacity] = array
+            return grown
+
+        self._alive = extend(self._alive, False)
+        self._assign = extend(self._assign, -1)
+        self._codes = {name: extend(codes, -1) for name, codes in self._codes.items()}
+
+    def _code(self, name: str, value) -> int:
+        if value is None:
+            return -1
+        value = str(value)
+        codes = self._values[name]
+        if value not in codes:
+            codes[value] = len(codes)
+        return codes[value]
+
+    def _open_shard(self, number: int) -> _Shard:
+        while len(self._shards) <= number:
+            base = self.path / f"shard_{len(self._shards):05d}"
+            self._shards.append(_Shard(base, self.shard_rows, self.dimension, self.dtype, self.keep_full))
+        return self._shards[number]
+
+    def _allocate(self) -> int:
+        if self._free:
+            return self._free.pop()
+        row = len(self._ids)
+        self._ids.append(None)
+        self._grow(row + 1)
+        return row
+
+    # --- Escrita ---
+
+    @staticmethod
+    def _as_record(vector) -> tuple[str, list[float], dict]:
+        if isinstance(vector, dict):
+            return vector["id"], vector["values"], dict(vector.get("metadata") or {})
+        vector_id, values, *rest = vector
+        return vector_id, values, dict(rest[0] if rest else {})
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+        return matrix / np.where(norms == 0, 1, norms)
+
+    @staticmethod
+    def _check_namespace(namespace: str | None) -> None:
+        if namespace:
+            raise NotImplementedError("O índice vetorial local não suporta namespaces.")
+
+    def upsert(self, vectors: Iterable, namespace: str | None = None, **kwargs) -> dict:
+        self._check_namespace(namespace)
+        records = [self._as_record(v) for v in vectors]
+        if not records:
+            return {"upserted_count": 0}
+        matrix = self._normalize(np.asarray([values for _, values, _ in records], dtype=np.float32))
+
+        with self._lock:
+            if self.dimension is None:
+                self.dimension = matrix.shape[1]
+                self._catalog.set_meta("dimension", self.dimension)
+            if matrix.shape[1] != self.dimension:
+                raise ValueError(f"Dimensão {matrix.shape[1]} diferente da do índice ({self.dimension}).")
+
+            rows = [self._rows.get(vector_id) for vector_id, _, _ in records]
+            rows = [row if row is not None else self._allocate() for row in rows]
+            clusters = self._nearest_centroid(matrix) if self._centroids is not None else np.full(len(rows), -1)
+
+            touched = set()
+            for row, vec in zip(rows, matrix):
+                shard = self._open_shard(row // self.shard_rows)
+                shard.write(row % self.shard_rows, vec)
+                touched.add(row // self.shard_rows)
+            for number in touched:
+                self._shards[number].flush()
+
+            with self._catalog.transaction() as conn:
+                conn.executemany(
+                    f"INSERT OR REPLACE INTO vectors (row, id, metadata, cluster, {', '.join(INDEXED_FIELDS)}) "
+                    f"VALUES (?, ?, ?, ?{', ?' * len(INDEXED_FIELDS)})",
+                    [
+                        (row, vector_id, json.dumps(metadata, ensure_ascii=False), int(cluster),
+                         *(None if metadata.get(name) is None else str(metadata[name]) for name in INDEXED_FIELDS))
+                        for row, (vector_id, _, metadata), cluster in zip(rows, records, clusters)
+                    ],
+                )
+
+            for row, (vector_id, _, metadata), cluster in zip(rows, records, clusters):
+                self._ids[row] = vector_id
+                self._rows[vector_id] = row
+                self._alive[row] = True
+                self._assign[row] = cluster
+                for name in INDEXED_FIELDS:
+                    self._codes[name][row] = self._code(name, metadata.get(name))
+                if self._training:
+                    self._changed_while_training.add(row)
+
+        self._maybe_train()
+        return {"upserted_count": len(records)}
+
+    def delete(self, ids: list[str] | None = None, filter: dict | None = None, delete_all: bool = False,
+               namespace: str | None = None, **kwargs) -> dict:
+        self._check_namespace(namespace)
+        with self._lock:
+            n = len(self._ids)
+            if delete_all:
+                rows = np.flatnonzero(self._alive[:n])
+            elif filter:
+                rows = np.flatnonzero(self._filter_mask(filter, n) & self._alive[:n])
+            else:
+                rows = np.array([self._rows[i] for i in ids or [] if i in self._rows], dtype=np.int64)
+            if not len(rows):
+                return {}
+            with self._catalog.transaction() as conn:
+                conn.executemany("DELETE FROM vectors WHERE row = ?", [(int(r),) for r in rows])
+            for row in rows.tolist():
+                self._rows.pop(self._ids[row], None)
+                self._ids[row] = None
+                self._free.append(row)
+            self._alive[rows] = False
+            self._assign[rows] = -1
+            for codes in self._codes.values():
+                codes[rows] = -1
+        return {}
+
+    # --- Leitura ---
+
+    def _metadata(self, rows: list[int]) -> dict[int, dict]:
+        found = {}
+        for start in range(0, len(rows), 500):
+            part = rows[start:start + 500]
+            for r in self._catalog.query(
+                    f"SELECT row, metadata FROM vectors WHERE row IN ({','.join('?' * len(part))})", part):
+                found[r["row"]] = json.loads(r["metadata"])
+        return found
+
+    def _vector(self, row: int, shards: list[_Shard] | None = None) -> np.ndarray:
+        return (shards or self._shards)[row // self.shard_rows].original(row % self.shard_rows)
+
+    def fetch(self, ids: list[str], namespace: str | None = None, **kwargs) -> FetchResponse:
+        self._check_namespace(namespace)
+        with self._lock:
+            rows = {vector_id: self._rows[vector_id] for vector_id in ids if vector_id in self._rows}
+            values = {vector_id: self._vector(row).tolist() for vector_id, row in rows.items()}
+        metadata = self._metadata(list(rows.values()))
+        return FetchResponse({
+            vector_id: VectorRecord(vector_id, values[vector_id], metadata.get(row, {}))
+            for vector_id, row in rows.items()
+        })
+
+    # --- Filtros ---
+
+    def _field_mask(self, name: str, condition, n: int) -> np.ndarray:
+        if name not in self._codes:
+            raise ValueError(f"Filtro por '{name}' não suportado no índice local (campos: {', '.join(INDEXED_FIELDS)}).")
+        codes = self._codes[name][:n]
+        values = self._values[name]
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        mask = np.ones(n, dtype=bool)
+        for op, arg in condition.items():
+            if op in ("$eq", "$ne"):
+                hit = codes == values.get(str(arg), -2)
+                mask &= hit if op == "$eq" else ~hit
+            elif op in ("$in", "$nin"):
+                wanted = [values[str(v)] for v in arg if str(v) in values]
+                hit = np.isin(codes, wanted)
+                mask &= hit if op == "$in" else ~hit
+            else:
+                raise ValueError(f"Operador de filtro não suportado no índice local: {op}")
+        return mask
+
+    def _filter_mask(self, flt: dict, n: int) -> np.ndarray:
+        mask = np.ones(n, dtype=bool)
+        for key, condition in flt.items():
+            if key == "$and":
+                for sub in condition:
+                    mask &= self._filter_mask(sub, n)
+            elif key == "$or":
+                any_mask = np.zeros(n, dtype=bool)
+                for sub in condition:
+                    any_mask |= self._filter_mask(sub, n)
+                mask &= any_mask
+            else:
+                mask &= self._field_mask(key, condition, n)
+        return mask
+
+    # --- Busca ---
+
+    def _score_rows(self, shards: list[_Shard], rows: np.ndarray, q: np.ndarray, exact: bool = False) -> np.ndarray:
+        """Cosseno das linhas indicadas, pelos códigos ou (`exact`) pela cópia float32."""
+        scores = np.empty(len(rows), dtype=np.float32)
+        shard_of = rows // self.shard_rows
+        for number in np.unique(shard_of):
+            pos = np.flatnonzero(shard_of == number)
+            local = rows[pos] % self.shard_rows
+            if exact:
+                scores[pos] = shards[number].original(local) @ q
+            else:
+                scores[pos] = shards[number].scores(local, q)
+        return scores
+
+    def query(self, vector: list[float] | None = None, top_k: int = 10, filter: dict | None = None,
+              include_metadata: bool = False, include_values: bool = False, namespace: str | None = None,
+              id: str | None = None, **kwargs) -> dict:
+        self._check_namespace(namespace)
+        with self._lock:
+            if vector is None and id is not None and id in self._rows:
+                vector = self._vector(self._rows[id])
+            n = len(self._ids)
+            if vector is None or not n or self.dimension is None:
+                return {"matches": []}
+            q = self._normalize(np.asarray(vector, dtype=np.float32))
+            mask = self._alive[:n].copy()
+            if filter:
+                mask &= self._filter_mask(filter, n)
+            centroids = self._centroids
+            if centroids is not None and int(mask.sum()) > self.exact_max_rows:
+                probes = np.argsort(-(centroids @ q))[:self.nprobe]
+                assign = self._assign[:n]
+                mask &= np.isin(assign, probes) | (assign < 0)
+            rows = np.flatnonzero(mask)
+            shards = list(self._shards)
+
+        if not len(rows):
+            return {"matches": []}
+        # Produto escalar fora do lock: consultas concorrentes não esperam umas pelas outras
+        scores = self._score_rows(shards, rows, q)
+        if self.keep_full:
+            # Rescoring: candidatos pelos códigos compactos, ordem final em float32
+            wide = self._top(scores, top_k * self.rescore_factor)
+            rows, scores = rows[wide], self._score_rows(shards, rows[wide], q, exact=True)
+        top = self._top(scores, top_k)
+        with self._lock:
+            # Linhas removidas durante a busca ficam de fora
+            chosen = [(int(i), int(rows[i]), self._ids[rows[i]]) for i in top if self._alive[rows[i]]]
+        metadata = self._metadata([row for _, row, _ in chosen]) if include_metadata else {}
+
+        matches = []
+        for i, row, vector_id in chosen:
+            match = {"id": vector_id, "score": float(scores[i])}
+            if include_metadata:
+                match["metadata"] = metadata.get(row, {})
+            if include_values:
+                match["values"] = self._vector(row, shards).tolist()
+            matches.append(match)
+        return {"matches": matches, "namespace": ""}
+
+    @staticmethod
+    def _top(scores: np.ndarray, k: int) -> np.ndarray:
+        """Posições dos k maiores scores, em ordem decrescente."""
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        return top[np.argsort(-scores[top])]
+
+    # --- IVF ---
+
+    def _nearest_centroid(self, matrix: np.ndarray, centroids: np.ndarray | None = None) -> np.ndarray:
+        centroids = self._centroids if centroids is None else centroids
+        return np.argmax(matrix @ centroids.T, axis=1).astype(np.int32)
+
+    def _maybe_train(self) -> None:
+        if self.ann != "ivf":
+            return
+        with self._lock:
+            total = len(self._rows)
+            if self._training or total < self.ann_min_rows or (
+                    self._centroids is not None and total < 2 * self._trained_rows):
+                return
+            self._training = True
+            self._changed_while_training = set()
+        threading.Thread(target=self.train_ivf, name="vector-ivf-train", daemon=True).start()
+
+    def train_ivf(self, nlist: int | None = None, sample: int = 20000, iterations: int = 10, seed: int = 0) -> None:
+        """Treina as listas do IVF (k-means esférico) e atribui cada vetor à sua lista."""
+        try:
+            with self._lock:
+                self._training = True
+                n = len(self._ids)
+                rows = np.flatnonzero(self._alive[:n])
+                shards = list(self._shards)
+            if not len(rows):
+                return
+            nlist = nlist or max(16, int(math.sqrt(len(rows))))
+            rng = np.random.default_rng(seed)
+            sample_rows = np.sort(rng.choice(rows, size=min(sample, len(rows)), replace=False))
+            data = self._gather(shards, sample_rows)
+            nlist = min(nlist, len(data))
+            centroids = data[rng.choice(len(data), size=nlist, replace=False)].copy()
+            for _ in range(iterations):
+                labels = self._nearest_centroid(data, centroids)
+                onehot = np.zeros((nlist, len(data)), dtype=np.float32)
+                onehot[labels, np.arange(len(data))] = 1
+                sums = onehot @ data
+                empty = onehot.sum(axis=1) == 0
+                sums[empty] = centroids[empty]  # lista vazia mantém o centróide anterior
+                centroids = self._normalize(sums)
+
+            labels = np.empty(len(rows), dtype=np.int32)
+            for start in range(0, len(rows), 8192):
+                part = rows[start:start + 8192]
+                labels[start:start + 8192] = self._nearest_centroid(self._gather(shards, part), centroids)
+
+            with self._lock:
+                still = self._alive[rows] & ~np.isin(rows, list(self._changed_while_training))
+                rows, labels = rows[still], labels[still]
+                self._assign[rows] = labels
+                changed = [r for r in self._changed_while_training if self._alive[r]]
+                if changed:
+                    self._assign[changed] = self._nearest_centroid(self._gather(self._shards, np.array(changed)),
+                                                                   centroids)
+                self._centroids = centroids
+                self._trained_rows = len(self._rows)
+                np.save(self.path / "ivf_centroids.npy", centroids)
+                with self._catalog.transaction() as conn:
+                    conn.executemany("UPDATE vectors SET cluster = ? WHERE row = ?",
+                                     [(int(self._assign[r]), int(r)) for r in np.flatnonzero(self._alive)])
+                    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('ivf_rows', ?)",
+                                 (str(self._trained_rows),))
+            self.logger.info(f"IVF treinado: {nlist} listas para {self._trained_rows} vetores.")
+        except Exception as e:
+            self.logger.exception(f"Falha ao treinar o IVF do índice local: {e}")
+        finally:
+            with self._lock:
+                self._training = False
+                self._changed_while_training = set()
+
+    def _gather(self, shards: list[_Shard], rows: np.ndarray) -> np.ndarray:
+        out = np.empty((len(rows), self.dimension), dtype=np.float32)
+        shard_of = rows // self.shard_rows
+        for number in np.unique(shard_of):
+            pos = np.flatnonzero(shard_of == number)
+            out[pos] = shards[number].decode(rows[pos] % self.shard_rows)
+        return out
+
+    # --- Listagem (definida por último: o método `list` esconderia o tipo list nas anotações acima) ---
+
+    def list(self, prefix: str | None = None, limit: int = 100, namespace: str | None = None,
+             **kwargs) -> Iterator[list[str]]:
+        """IDs em páginas de `limit` (como o list paginado do Pinecone)."""
+        self._check_namespace(namespace)
+        with self._lock:
+            ids = [i for i in self._ids if i is not None and (not prefix or i.startswith(prefix))]
+        for start in range(0, len(ids), limit):
+            yield ids[start:start + limit]
+
+    def describe_index_stats(self, **kwargs) -> dict:
+        with self._lock:
+            total = len(self._rows)
+        return {
+            "dimension": self.dimension,
+            "index_fullness": 0.0,
+            "total_vector_count": total,
+            "namespaces": {"": {"vector_count": total}},
+        }
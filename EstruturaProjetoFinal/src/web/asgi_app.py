@@ -0,0 +1,190 @@
+"""
+Entrada ASGI da aplicação: streaming assíncrono do /ask via Server-Sent Events.
+
+- POST /ask_stream: gera a resposta com `chain.astream` no event loop, sem uma
+  thread por conversa; tokens são enviados um a um como eventos SSE
+- limite de gerações simultâneas (semáforo) com fila de espera curta (503 ao estourar)
+- desconexão do cliente cancela a geração no LLM
+- o evento "end" traz o tempo de cada etapa (mesmos spans do Server-Timing do Flask)
+- demais rotas são repassadas ao Flask (WsgiToAsgi)
+
+Execução:
+    uvicorn --factory src.web.asgi_app:create_asgi_app --host 0.0.0.0 --port 5000
+"""
+import asyncio
+import json
+import logging
+import time
+
+from asgiref.wsgi import WsgiToAsgi
+
+from src.config.settings import settings
+from src.core.metrics import begin_request, current_timings, end_request, record_span
+from src.web.flask_app import HTTP_REQUESTS, HTTP_SECONDS, build_filter_key, create_app
+
+
+def sse_event(data, event: str | None = None) -> bytes:
+    """Evento SSE com o payload em JSON (tokens podem conter quebras de linha)."""
+    head = f"event: {event}\n" if event else ""
+    return f"{head}data: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
+class AskStreamApp:
+    """Aplicação ASGI: /ask_stream tratado aqui, o resto delegado ao Flask."""
+
+    def __init__(self, flask_app, max_concurrency: int, queue_timeout: float,
+                 logger: logging.Logger | None = None):
+        self.flask_app = flask_app
+        self.wsgi = WsgiToAsgi(flask_app)
+        self.rag = flask_app.extensions["rag"]
+        self.logger = logger or logging.getLogger(__name__)
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self._semaphore: asyncio.Semaphore | None = None  # criado dentro do event loop
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http" and scope["path"] == "/ask_stream" and scope["method"] == "POST":
+            await self._ask_stream(receive, send)
+        else:
+            await self.wsgi(scope, receive, send)
+
+    @staticmethod
+    async def _lifespan(receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    @staticmethod
+    async def _read_body(receive) -> bytes | None:
+        body = b""
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return None
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                return body
+
+    @staticmethod
+    async def _send_json(send, status: int, payload: dict) -> None:
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": json.dumps(payload, ensure_ascii=False).encode("utf-8")})
+
+    async def _ask_stream(self, receive, send):
+        """Coleta os spans da requisição e registra as métricas HTTP do /ask_stream."""
+        timings, token = begin_request()
+        status = None
+
+        async def timed_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                HTTP_SECONDS.observe(time.perf_counter() - timings.started, endpoint="ask_stream")
+            await send(message)
+
+        try:
+            await self._handle_ask_stream(receive, timed_send)
+        finally:
+            end_request(token)
+            if status is not None:
+                HTTP_REQUESTS.inc(endpoint="ask_stream", method="POST", status=status)
+
+    async def _handle_ask_stream(self, receive, send):
+        body = await self._read_body(receive)
+        if body is None:
+            return
+        try:
+            data = json.loads(body or b"{}")
+        except ValueError:
+            data = {}
+        question = str(data.get("question", "")).strip()
+        pdf_selected = str(data.get("pdf_selected", "")).strip()
+        user_input = str(data.get("user_input", "")).strip()
+        if not question or not pdf_selected:
+            await self._send_json(send, 400, {"response": "Dados inválidos."})
+            return
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            await self._send_json(send, 503, {"response": "Servidor ocupado, tente novamente."})
+            return
+
+        try:
+            await send({"type": "http.response.start", "status": 200, "headers": [
+                (b"content-type", b"text/event-stream; charset=utf-8"),
+                (b"cache-control", b"no-cache"),
+                (b"x-accel-buffering", b"no"),  # sem buffer em proxy (nginx)
+            ]})
+            generation = asyncio.create_task(self._generate(question, build_filter_key(pdf_selected, user_input), send))
+            disconnect = asyncio.create_task(self._wait_disconnect(receive))
+            done, _ = await asyncio.wait({generation, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+            if disconnect in done:
+                generation.cancel()
+                self.logger.info("🔌 Cliente desconectou: geração cancelada.")
+            else:
+                disconnect.cancel()
+            await asyncio.gather(generation, disconnect, return_exceptions=True)
+        finally:
+            self._semaphore.release()
+
+    @staticmethod
+    async def _wait_disconnect(receive) -> None:
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    async def _generate(self, question: str, filter_key: dict, send) -> None:
+        async def emit(payload: bytes, more: bool = True) -> None:
+            await send({"type": "http.response.body", "body": payload, "more_body": more})
+
+        rag = self.rag
+        try:
+            # Etapas síncronas (SQLite, embeddings, Pinecone) fora do event loop
+            final_filter = await asyncio.to_thread(rag.resolve_filter, filter_key)
+            cached_tokens = await asyncio.to_thread(rag.get_cached_answer, question, final_filter)
+            if cached_tokens is not None:
+                for token in cached_tokens:
+                    await emit(sse_event(token))
+                await emit(sse_event({"timings": current_timings().as_dict()}, event="end"), more=False)
+                return
+            docs = await asyncio.to_thread(rag.retrieve, question, final_filter)
+            chain = rag.build_chain(docs)
+        except Exception as e:
+            await emit(sse_event(f"Erro setup: {e}", event="error"), more=False)
+            return
+
+        tokens = []
+        started = time.perf_counter()
+        try:
+            async for token in chain.astream({"query": question}):
+                if not tokens:
+                    record_span("llm.first_token", time.perf_counter() - started)
+                tokens.append(token)
+                await emit(sse_event(token))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await emit(sse_event(f"Erro: {e}", event="error"), more=False)
+            return
+        record_span("llm.generation", time.perf_counter() - started)
+        await emit(sse_event({"timings": current_timings().as_dict()}, event="end"), more=False)
+        await asyncio.to_thread(rag.store_answer, question, final_filter, tokens, docs)
+
+
+def create_asgi_app() -> AskStreamApp:
+    flask_app = create_app()
+    return AskStreamApp(
+        flask_app,
+        max_concurrency=settings.ASK_MAX_CONCURRENCY,
+        queue_timeout=settings.ASK_QUEUE_TIMEOUT,
+        logger=logging.getLogger("projeto_rag"),
+    )
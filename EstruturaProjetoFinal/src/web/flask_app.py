@@ -1,27 +1,37 @@
 # flask_app.py
 
-from flask import Flask, request, jsonify, render_template, redirect, url_for, send_file, Response, stream_with_context
+from flask import Flask, request, jsonify, render_template, redirect, url_for, send_file, Response, stream_with_context, g
 from src.rag.rag_pipeline import RAGPipeline
-from src.ingestion.pdf_indexer import PDFIndexer
+from src.ingestion.jobs import IndexJobManager, IndexJobStore
+from src.ingestion.pdf_indexer import PDFIndexer, iter_text_pages
 from src.core.logger_config import setup_logger
 from src.core.preprocess import TextProcessor
 from src.config.settings import settings
+from src.core.clients import registry
+from src.core.metrics import begin_request, end_request, metrics, record_span, span
 from src.core.models import Advogado
+from src.search.identifier_index import IdentifierIndex
+from src.search.lexical_index import LexicalIndex
+from src.search.name_index import FolderNameIndex
+from src.search.text_cache import PageTextCache
 from src.core.db import db
 from pathlib import Path
-import fitz  # PyMuPDF
 import re
+import time
 
 # Imports para Streaming
 from queue import Queue, Empty 
 from threading import Thread 
 from langchain.callbacks.base import BaseCallbackHandler
-from langchain_openai import OpenAIEmbeddings
-from langchain_pinecone import PineconeVectorStore
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 PDF_DIR = BASE_DIR / "src" / "drive" / "extraidos"
 
+HTTP_REQUESTS = metrics.counter("rag_http_requests_total", "Requisições HTTP por rota, método e status.",
+                                ("endpoint", "method", "status"))
+HTTP_SECONDS = metrics.histogram("rag_http_request_seconds",
+                                 "Tempo até a resposta por rota (no streaming, até o início do corpo).", ("endpoint",))
+
 # Callback para capturar tokens da IA
 class QueueCallback(BaseCallbackHandler):
     def __init__(self, q: Queue): self.q = q
@@ -31,6 +41,15 @@ class QueueCallback(BaseCallbackHandler):
         self.q.put(f"Erro: {error}")
         self.q.put(None)
 
+def build_filter_key(pdf_selected: str, user_input: str) -> dict:
+    """Filtro do /ask: CNPJ/CPF digitado pelo usuário ou o PDF selecionado (usado também pelo /ask_stream)."""
+    norm_input = TextProcessor.normalize_key(user_input)
+    if norm_input.isdigit():
+        if len(norm_input) == 14: return {"cnpj_contratado": norm_input}
+        if len(norm_input) == 11: return {"cpf_contratado": norm_input}
+        return {}
+    return {"source_file": pdf_selected}
+
 def create_app() -> Flask:
     app = Flask(__name__, template_folder=str(BASE_DIR / "templates"), static_folder=str(BASE_DIR / "static"))
     app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{BASE_DIR / 'advogados.db'}"
@@ -38,8 +57,52 @@ def create_app() -> Flask:
     db.init_app(app)
     
     logger = setup_logger("projeto_rag")
+    registry.logger = logger
+    registry.warm_up()
     rag = RAGPipeline(logger=logger)
     indexer = PDFIndexer(logger=logger)
+    index_jobs = IndexJobManager(indexer, IndexJobStore(settings.INDEX_STATE_DB, settings.INDEX_JOB_STALE_AFTER),
+                                 heartbeat_interval=settings.INDEX_JOB_HEARTBEAT, logger=logger)
+    app.extensions["rag"] = rag  # compartilhado com a camada ASGI (src/web/asgi_app.py)
+
+    # --- MÉTRICAS ---
+    # Spans da requisição (src/core/metrics.py) viram o cabeçalho Server-Timing e alimentam o /metrics
+    @app.before_request
+    def start_timing():
+        g.timings, g.timings_token = begin_request()
+
+    @app.after_request
+    def finish_timing(response):
+        timings = g.get("timings")
+        if timings is not None:
+            endpoint = request.endpoint or "not_found"
+            response.headers["Server-Timing"] = timings.server_timing()
+            HTTP_SECONDS.observe(time.perf_counter() - timings.started, endpoint=endpoint)
+            HTTP_REQUESTS.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+        return response
+
+    @app.teardown_request
+    def drop_timing(exc):
+        token = g.pop("timings_token", None)
+        if token is not None:
+            end_request(token)
+
+    # Texto extraído uma vez por versão de arquivo, compartilhado por preview e busca
+    text_cache = PageTextCache(settings.TEXT_CACHE_DB, extractor=iter_text_pages,
+                               memory_chars=settings.TEXT_CACHE_MEMORY_CHARS)
+
+    # Índice léxico: o indexador grava o texto ao indexar; PDFs novos na pasta entram pelo sync
+    lexical_index = LexicalIndex(settings.LEXICAL_INDEX_DB, logger=logger)
+    lexical_index.schedule_sync(PDF_DIR, text_cache.iter_pages, min_interval=0)
+
+    # Nomes dos PDFs locais pré-processados (reconstruído quando a pasta muda)
+    local_names = FolderNameIndex(PDF_DIR)
+    local_names.current()
+
+    # CNPJ/CPF -> arquivos (preenchida pelo indexador; reconstruída se ainda não existe)
+    identifiers = IdentifierIndex(settings.INDEX_STATE_DB)
+    if identifiers.is_empty():
+        Thread(target=indexer.rebuild_identifier_index, name="identifier-rebuild", daemon=True).start()
 
     with app.app_context():
         db.create_all()
@@ -55,48 +118,61 @@ def create_app() -> Flask:
         q_nums = re.sub(r'\D', '', q_raw)
         is_numeric_search = len(q_nums) in [11, 14] 
 
-        if settings.PINECONE_API_KEY:
+        if is_numeric_search:
+            # Tabela local de identificadores: sem embedding nem consulta vetorial
+            with span("search.identifiers"):
+                known = identifiers.lookup(q_nums)
+                for match in known:
+                    if (PDF_DIR / match.file_name).exists(): matches.add(match.file_name)
+                matches.update(local_names.current().find_by_document(q_nums))
+            # Fora da tabela (vetores anteriores a ela ou chaves de outra versão do extrator):
+            # mesmo fallback do /ask, filtro por metadados no índice vetorial
+            if not known and (settings.VECTOR_BACKEND == "local" or settings.PINECONE_API_KEY):
+                try:
+                    filter_field = "cnpj_contratado" if len(q_nums) == 14 else "cpf_contratado"
+                    with span("search.vector"):
+                        embedding = registry.embeddings().embed_query(q_raw)
+                        results = registry.index().query(vector=embedding, top_k=50, include_metadata=True,
+                                                         filter={filter_field: q_nums})
+                    names = local_names.current()
+                    for match in results.get("matches", []):
+                        name = (match.get("metadata") or {}).get("source_file", "").lower().strip()
+                        if name: matches.update(names.find_substring(name))
+                except Exception as e: logger.error(f"Erro na busca vetorial: {e}")
+        elif settings.VECTOR_BACKEND == "local" or settings.PINECONE_API_KEY:
             try:
-                embeddings = OpenAIEmbeddings(model=settings.EMBEDDING_MODEL)
-                vectorstore = PineconeVectorStore(index_name=settings.PINECONE_INDEX_NAME, embedding=embeddings, text_key="text")
-                pinecone_candidates = []
+                # Embedding (com cache) + consulta direta ao índice configurado (Pinecone ou local)
+                with span("search.vector"):
+                    embedding = registry.embeddings().embed_query(q_raw)
+                    results = registry.index().query(vector=embedding, top_k=50, include_metadata=True)
+                vector_candidates = []
+                for match in results.get("matches", []):
+                    name = (match.get("metadata") or {}).get("source_file", "").lower().strip()
+                    if q_lower in name or match.get("score", 0.0) >= SCORE_THRESHOLD: # Resgate por nome ou score
+                        vector_candidates.append(name)
 
-                if is_numeric_search:
-                    filter_field = "cnpj_contratado" if len(q_nums) == 14 else "cpf_contratado"
-                    results = vectorstore.similarity_search(q_raw, k=50, filter={filter_field: q_nums})
-                    for doc in results:
-                        if doc.metadata.get("source_file"): pinecone_candidates.append(doc.metadata.get("source_file").lower().strip())
-                else:
-                    results = vectorstore.similarity_search_with_score(q_raw, k=50)
-                    for doc, score in results:
-                        name = doc.metadata.get("source_file", "").lower().strip()
-                        if q_lower in name or score >= SCORE_THRESHOLD: # Resgate por nome ou score
-                            pinecone_candidates.append(name)
-
-                if pinecone_candidates:
-                    for pdf_file in PDF_DIR.glob("*.pdf"):
-                        local_stem = pdf_file.stem.lower().replace('.', ' ').strip()
-                        for p_name in pinecone_candidates:
-                            if p_name in local_stem or local_stem in p_name:
-                                matches.add(pdf_file.name); break
-            except Exception as e: logger.error(f"Erro Pinecone: {e}")
+                names = local_names.current()
+                for p_name in set(vector_candidates):
+                    matches.update(names.find_substring(p_name))
+            except Exception as e: logger.error(f"Erro na busca vetorial: {e}")
 
         if not is_numeric_search:
-            for pdf_file in PDF_DIR.glob("*.pdf"):
-                if pdf_file.name in matches: continue
-                try:
-                    with fitz.open(pdf_file) as doc:
-                        if doc.page_count > 0:
-                            if q_lower in "".join([p.get_text() for p in doc]).lower(): matches.add(pdf_file.name)
-                except: pass
+            lexical_index.schedule_sync(PDF_DIR, text_cache.iter_pages, min_interval=settings.LEXICAL_SYNC_INTERVAL)
+            try:
+                with span("search.lexical"): matches.update(lexical_index.search(q_raw))
+            except Exception as e: logger.error(f"Erro no índice léxico: {e}")
         return sorted(list(matches))
 
-    def preview_pdf(pdf_file_name: str):
+    def preview_pdf(pdf_file_name: str, start_page: int = 1, end_page: int | None = None):
+        """Texto das páginas [start_page, end_page] (base 1, inclusivo) e o total de páginas."""
         path = PDF_DIR / pdf_file_name
-        if not path.exists(): return ""
+        if not pdf_file_name or not path.exists(): return "", 0
         try:
-            with fitz.open(path) as doc: return "".join([p.get_text() for p in doc])
-        except: return ""
+            pages, page_count = text_cache.get_pages(path, start_page - 1, end_page)
+            return "".join(pages), page_count
+        except Exception as e:
+            logger.error(f"Erro no preview de {pdf_file_name}: {e}")
+            return "", 0
 
     # Rotas Padrão
     @app.route("/")
@@ -118,20 +194,69 @@ def create_app() -> Flask:
 
     @app.route("/search_pdf", methods=["POST"])
     def search_pdf():
-        return jsonify({"pdfs": search_pdfs_by_query((request.json or {}).get("query", "").strip())})
+        with span("search.query"):
+            pdfs = search_pdfs_by_query((request.json or {}).get("query", "").strip())
+        return jsonify({"pdfs": pdfs})
 
     @app.route("/preview_pdf", methods=["POST"])
     def preview_pdf_route():
-        return jsonify({"preview": preview_pdf((request.json or {}).get("pdf_file", ""))})
+        # Aceita {"start_page": a, "pages": N} ou {"start_page": a, "end_page": b}; sem fim,
+        # PREVIEW_MAX_PAGES páginas. Nenhum bloco passa de PREVIEW_MAX_PAGES (0 = sem limite):
+        # o site pede o próximo a partir de end_page + 1 enquanto end_page < page_count
+        data = request.json or {}
+        try:
+            start_page = max(1, int(data.get("start_page", 1)))
+            pages = int(data.get("pages", settings.PREVIEW_MAX_PAGES))
+            if "end_page" in data: end_page = int(data["end_page"])
+            else: end_page = start_page - 1 + pages if pages > 0 else None
+            if settings.PREVIEW_MAX_PAGES > 0:
+                limit = start_page - 1 + settings.PREVIEW_MAX_PAGES
+                end_page = limit if end_page is None else min(end_page, limit)
+        except (TypeError, ValueError):
+            return jsonify({"preview": "", "error": "Intervalo de páginas inválido."}), 400
+        preview, page_count = preview_pdf(data.get("pdf_file", ""), start_page, end_page)
+        # O usuário vai perguntar sobre esse PDF: carrega os chunks dele em segundo plano
+        if preview: rag.prefetch_document(data.get("pdf_file", ""))
+        return jsonify({"preview": preview, "page_count": page_count,
+                        "start_page": start_page,
+                        "end_page": page_count if end_page is None else min(end_page, page_count)})
 
     @app.route("/view_pdf", methods=["GET"])
     def view_pdf():
         return send_file(PDF_DIR / request.args.get("pdf_file", ""), mimetype="application/pdf")
 
+    @app.route("/metrics", methods=["GET"])
+    def metrics_route():
+        return Response(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+    @app.route("/health", methods=["GET"])
+    def health():
+        status = registry.health_check()
+        return jsonify(status), (200 if status["ok"] else 503)
+
+    # --- INDEXAÇÃO EM SEGUNDO PLANO ---
     @app.route("/index", methods=["POST"])
     def index_route():
-        indexer.index_pdfs()
-        return jsonify({"status": "started"})
+        job, created = index_jobs.start()
+        if not created:
+            return jsonify({"status": "running", "job": job.to_dict()}), 409
+        return jsonify({"status": "started", "job": job.to_dict()}), 202
+
+    @app.route("/index/status", methods=["GET"])
+    def index_status():
+        job_id = request.args.get("job_id", type=int)
+        status = index_jobs.status(job_id)
+        if status is None:
+            return jsonify({"status": "not_found"}), 404
+        return jsonify(status)
+
+    @app.route("/index/cancel", methods=["POST"])
+    def index_cancel():
+        job_id = (request.get_json(silent=True) or {}).get("job_id")
+        job = index_jobs.cancel(int(job_id) if job_id is not None else None)
+        if job is None:
+            return jsonify({"status": "not_running"}), 404
+        return jsonify({"status": "cancelling", "job": job.to_dict()}), 202
 
     # --- ROTA ASK COM STREAMING ---
     @app.route("/ask", methods=["POST"])
@@ -144,38 +269,46 @@ def create_app() -> Flask:
         if not question or not pdf_selected:
             return jsonify({"response": "Dados inválidos."}), 400
 
-        filter_key = {}
-        norm_input = TextProcessor.normalize_key(user_input)
-        if norm_input.isdigit():
-            if len(norm_input) == 14: filter_key = {"cnpj_contratado": norm_input}
-            elif len(norm_input) == 11: filter_key = {"cpf_contratado": norm_input}
-        else:
-            filter_key = {"source_file": pdf_selected}
+        filter_key = build_filter_key(pdf_selected, user_input)
+
+        # Busca antes do streaming: as etapas entram no Server-Timing (o corpo só começa no primeiro token)
+        try:
+            final_filter = rag.resolve_filter(filter_key)
+            # Pergunta equivalente já respondida: reenvia os mesmos tokens, sem busca nem LLM
+            cached_tokens = rag.get_cached_answer(question, final_filter)
+            if cached_tokens is not None:
+                return Response(cached_tokens, mimetype='text/plain')
+            docs = rag.retrieve(question, final_filter)
+            qa_chain = rag.build_chain(docs)
+        except Exception as e:
+            return Response(f"Erro setup: {e}", mimetype='text/plain')
 
         def generate():
             q = Queue()
             callback = QueueCallback(q)
-            try:
-                qa_chain = rag.get_qa_chain(question, filter_key)
-            except Exception as e:
-                yield f"Erro setup: {e}"; return
-
+            failed = []
             def run_thread():
                 with app.app_context():
                     try: qa_chain.invoke({"query": question}, config={"callbacks": [callback]})
-                    except Exception as e: q.put(f"Erro: {e}")
+                    except Exception as e: failed.append(e); q.put(f"Erro: {e}")
                     finally: q.put(None)
 
+            started = time.perf_counter()
             t = Thread(target=run_thread); t.start()
             
+            tokens = []
             while True:
                 try:
                     token = q.get(timeout=3)
                     if token is None: break
+                    if not tokens: record_span("llm.first_token", time.perf_counter() - started)
+                    tokens.append(token)
                     yield token
                 except Empty: continue
                 except Exception: break
             t.join()
+            record_span("llm.generation", time.perf_counter() - started)
+            if not failed: rag.store_answer(question, final_filter, tokens, docs)
 
         return Response(stream_with_context(generate()), mimetype='text/plain')
 
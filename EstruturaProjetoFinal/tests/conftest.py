@@ -0,0 +1,73 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Permite `import src...` rodando o pytest de qualquer pasta (python -m pytest EstruturaProjetoFinal/tests)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.fakes import FakeEmbeddings, FakeOCRBackend  # noqa: E402
+from src.config.settings import settings  # noqa: E402
+from src.core.clients import registry  # noqa: E402
+from src.core.embedding_cache import CachedEmbeddings, EmbeddingCache  # noqa: E402
+
+TEST_DIMENSIONS = 64
+
+
+@pytest.fixture
+def offline(tmp_path, monkeypatch):
+    """
+    settings apontando para tmp_path (bancos SQLite, pasta de PDFs, índice vetorial local)
+    e embeddings determinísticos no registro de clientes: nada sai da máquina.
+    """
+    for name in dir(settings):
+        value = getattr(settings, name)
+        if name.endswith("_DB") and isinstance(value, Path):
+            monkeypatch.setattr(settings, name, tmp_path / value.name)
+    pdf_folder = tmp_path / "pdfs"
+    pdf_folder.mkdir()
+    monkeypatch.setattr(settings, "PDF_FOLDER", pdf_folder)
+    monkeypatch.setattr(settings, "VECTOR_BACKEND", "local")
+    monkeypatch.setattr(settings, "LOCAL_VECTOR_DIR", tmp_path / "vector_store")
+    monkeypatch.setattr(settings, "EMBEDDING_DIMENSIONS", TEST_DIMENSIONS)
+    monkeypatch.setattr(settings, "INDEX_CONCURRENCY", 1)
+    monkeypatch.setattr(settings, "UPSERT_MAX_RETRIES", 1)
+    monkeypatch.setattr(settings, "TOKEN_COUNTER", "estimate")
+
+    registry.reset()
+    registry.override("embeddings", CachedEmbeddings(
+        FakeEmbeddings(TEST_DIMENSIONS), EmbeddingCache(settings.EMBEDDING_CACHE_DB), "fake",
+        dimensions=TEST_DIMENSIONS))
+    yield pdf_folder
+    registry.reset()
+
+
+@pytest.fixture
+def make_indexer(offline):
+    """PDFIndexer do ambiente `offline`, com OCR falso."""
+    from src.ingestion.ocr import CachedOCR, OCRCache
+    from src.ingestion.pdf_indexer import PDFIndexer
+
+    def build(**kwargs):
+        indexer = PDFIndexer(**kwargs)
+        indexer.ocr = CachedOCR(FakeOCRBackend(), OCRCache(settings.OCR_CACHE_DB))
+        return indexer
+    return build
+
+
+@pytest.fixture
+def write_pdf():
+    """Grava um PDF digital com uma página por texto (PyMuPDF), quebrando as linhas em 100 caracteres."""
+    import textwrap
+
+    import fitz
+
+    def write(path: Path, pages: list[str]) -> Path:
+        doc = fitz.open()
+        for text in pages:
+            lines = [line for para in text.split("\n") for line in (textwrap.wrap(para, 100) or [""])]
+            doc.new_page().insert_text((40, 40), "\n".join(lines), fontsize=7)
+        doc.save(path)
+        doc.close()
+        return path
+    return write
@@ -0,0 +1,66 @@
+import pytest
+
+from src.rag import answer_cache
+from src.rag.answer_cache import AnswerCache
+
+FILTER = {"source_file": {"$eq": "contrato x"}}
+QUESTION = [1.0, 0.0, 0.0]
+SIMILAR = [0.99, 0.05, 0.0]
+DIFFERENT = [0.0, 1.0, 0.0]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return AnswerCache(tmp_path / "answers.db", ttl=3600, min_similarity=0.97)
+
+
+def hashes(current: dict):
+    return lambda files: {f: current[f] for f in files if f in current}
+
+
+def test_hit_for_similar_question_on_same_filter(cache):
+    cache.store(FILTER, "Qual o prazo?", QUESTION, ["O prazo", " é 12 meses"], {"contrato x": "h1"})
+
+    answer = cache.lookup(FILTER, SIMILAR, hashes({"contrato x": "h1"}))
+    assert answer.tokens == ["O prazo", " é 12 meses"]
+    assert answer.question == "Qual o prazo?"
+    assert answer.similarity >= 0.97
+    assert cache.stats()["hits"] == 1
+
+
+def test_miss_for_other_filter_or_different_question(cache):
+    cache.store(FILTER, "Qual o prazo?", QUESTION, ["12 meses"], {"contrato x": "h1"})
+
+    assert cache.lookup({"source_file": {"$eq": "contrato y"}}, QUESTION, hashes({"contrato x": "h1"})) is None
+    assert cache.lookup(FILTER, DIFFERENT, hashes({"contrato x": "h1"})) is None
+
+
+def test_filter_key_ignores_key_order():
+    assert answer_cache.filter_cache_key({"a": 1, "b": 2}) == answer_cache.filter_cache_key({"b": 2, "a": 1})
+
+
+def test_entry_expires_after_ttl(cache, monkeypatch):
+    now = 1_000_000.0
+    monkeypatch.setattr(answer_cache.time, "time", lambda: now)
+    cache.store(FILTER, "Qual o prazo?", QUESTION, ["12 meses"], {"contrato x": "h1"})
+
+    now += 3599
+    assert cache.lookup(FILTER, QUESTION, hashes({"contrato x": "h1"})) is not None
+    now += 2
+    assert cache.lookup(FILTER, QUESTION, hashes({"contrato x": "h1"})) is None
+
+
+def test_reindexed_file_invalidates_entry(cache):
+    cache.store(FILTER, "Qual o prazo?", QUESTION, ["12 meses"], {"contrato x": "h1"})
+
+    assert cache.lookup(FILTER, QUESTION, hashes({"contrato x": "h2"})) is None
+    assert cache.query("SELECT COUNT(*) AS n FROM answers")[0]["n"] == 0
+    # Mesmo com o hash antigo de volta, a entrada já foi descartada
+    assert cache.lookup(FILTER, QUESTION, hashes({"contrato x": "h1"})) is None
+
+
+def test_zero_ttl_disables_cache(tmp_path):
+    cache = AnswerCache(tmp_path / "answers.db", ttl=0, min_similarity=0.97)
+    cache.store(FILTER, "Qual o prazo?", QUESTION, ["12 meses"], {"contrato x": "h1"})
+    assert cache.lookup(FILTER, QUESTION, hashes({"contrato x": "h1"})) is None
+    assert cache.query("SELECT COUNT(*) AS n FROM answers")[0]["n"] == 0
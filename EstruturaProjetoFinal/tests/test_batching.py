@@ -0,0 +1,133 @@
+import pytest
+
+from src.config.settings import settings
+from src.core.clients import registry
+from src.ingestion import batching
+from src.ingestion.batching import ChunkBatcher, PendingChunk, VectorUpserter
+from src.ingestion.manifest import IndexManifest
+
+
+class HTTPError(Exception):
+    """Como a PineconeApiException: o status HTTP fica em `.status`."""
+
+    def __init__(self, status: int):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+class FakeEmbeddings:
+    def embed_documents(self, texts):
+        return [[1.0, 0.0] for _ in texts]
+
+
+class FlakyIndex:
+    """Índice que falha com `error(records)` (None = grava) e registra cada chamada."""
+
+    def __init__(self, error):
+        self.error = error
+        self.calls: list[list[str]] = []
+        self.saved: set[str] = set()
+
+    def upsert(self, vectors):
+        ids = [v["id"] for v in vectors]
+        self.calls.append(ids)
+        failure = self.error(ids)
+        if failure is not None:
+            raise failure
+        self.saved.update(ids)
+
+
+def chunks(n: int, tokens: int = 10) -> list[PendingChunk]:
+    return [PendingChunk(f"c{i}", f"texto {i}", {}, "a.pdf", tokens=tokens) for i in range(n)]
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(batching.time, "sleep", lambda seconds: None)
+
+
+def test_batcher_limits_tokens_and_vectors():
+    batcher = ChunkBatcher(max_tokens=25, max_vectors=10)
+    assert [len(b) for b in batcher.add(chunks(5))] == [2, 2]
+    assert [len(b) for b in batcher.flush()] == [1]
+
+    batcher = ChunkBatcher(max_tokens=1000, max_vectors=3)
+    assert [len(b) for b in batcher.add(chunks(7))] == [3, 3]
+    assert [len(b) for b in batcher.flush()] == [1]
+    assert batcher.flush() == []
+
+
+def test_outage_fails_the_batch_without_splitting():
+    index = FlakyIndex(lambda ids: ConnectionError("sem rede"))
+    upserter = VectorUpserter(index, FakeEmbeddings(), upsert_batch_size=4, max_retries=3)
+
+    assert upserter.upsert(chunks(8)) == set()
+    # Três tentativas do primeiro sub-lote; o segundo nem é enviado
+    assert index.calls == [["c0", "c1", "c2", "c3"]] * 3
+
+
+@pytest.mark.parametrize("status", [401, 429, 500, 503])
+def test_auth_rate_limit_and_server_errors_are_not_split(status):
+    index = FlakyIndex(lambda ids: HTTPError(status))
+    upserter = VectorUpserter(index, FakeEmbeddings(), upsert_batch_size=8, max_retries=2)
+
+    assert upserter.upsert(chunks(8)) == set()
+    assert len(index.calls) == 2
+    assert all(len(call) == 8 for call in index.calls)
+
+
+def test_rejected_batch_is_split_to_isolate_the_bad_vector():
+    index = FlakyIndex(lambda ids: HTTPError(400) if "c5" in ids else None)
+    upserter = VectorUpserter(index, FakeEmbeddings(), upsert_batch_size=8, max_retries=3)
+
+    saved = upserter.upsert(chunks(8))
+    assert saved == {f"c{i}" for i in range(8)} - {"c5"}
+    # 8 -> 4+4 -> 2+2 -> 1+1: sem retries para um lote rejeitado
+    assert len(index.calls) == 7
+
+
+def test_transient_error_is_retried():
+    failures = iter([HTTPError(503), None])
+    index = FlakyIndex(lambda ids: next(failures, None))
+    upserter = VectorUpserter(index, FakeEmbeddings(), upsert_batch_size=8, max_retries=3)
+
+    assert upserter.upsert(chunks(3)) == {"c0", "c1", "c2"}
+    assert len(index.calls) == 2
+
+
+# --- Retomada (chunk_progress) ---
+
+def test_interrupted_run_resumes_with_the_missing_chunks(make_indexer, write_pdf, offline, monkeypatch):
+    monkeypatch.setattr(settings, "UPSERT_BATCH_SIZE", 2)
+    # Sem linha em branco no texto extraído, cada página vira um parágrafo (um chunk)
+    write_pdf(offline / "contrato.pdf", [
+        f"Cláusula {n}: o pagamento mensal vence no dia {n + 1} de cada mês, sob pena de multa de dez por cento."
+        for n in range(10)])
+
+    # Primeira execução: o índice cai depois de dois sub-lotes
+    indexer = make_indexer()
+    indexer._ensure_index()
+    index = registry.index()
+    real_upsert, sent = index.upsert, []
+
+    def broken_upsert(vectors, **kwargs):
+        if len(sent) >= 4:
+            raise ConnectionError("sem rede")
+        sent.extend(v["id"] for v in vectors)
+        return real_upsert(vectors, **kwargs)
+    monkeypatch.setattr(index, "upsert", broken_upsert)
+    indexer.index_pdfs()
+
+    assert indexer.manifest.get("contrato.pdf") is None
+    assert set(sent) == indexer.manifest.done_chunks("contrato.pdf", IndexManifest.file_hash(offline / "contrato.pdf"))
+
+    # Segunda execução: só os chunks que faltaram são enviados
+    resumed = []
+    monkeypatch.setattr(index, "upsert", lambda vectors, **kw: resumed.extend(v["id"] for v in vectors)
+                        or real_upsert(vectors, **kw))
+    indexer.index_pdfs()
+
+    entry = indexer.manifest.get("contrato.pdf")
+    assert entry is not None
+    assert set(resumed) == set(entry.chunk_ids) - set(sent)
+    assert not indexer.manifest.has_progress("contrato.pdf")
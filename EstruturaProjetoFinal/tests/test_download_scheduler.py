@@ -0,0 +1,100 @@
+import pytest
+
+from src.drive.src import download_scheduler
+from src.drive.src.download_scheduler import AdaptiveConcurrency, TokenBucket
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(download_scheduler.time, "monotonic", fake)
+    return fake
+
+
+def test_bucket_burst_then_waits_for_refill(clock):
+    bucket = TokenBucket(rate=10, capacity=2)
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() == pytest.approx(0.1)
+
+    clock.now += 0.1
+    assert bucket.try_acquire() == 0
+
+
+def test_bucket_throttle_pauses_and_halves_rate_once_per_burst(clock):
+    bucket = TokenBucket(rate=8, capacity=4, min_rate=1)
+    sent_at = clock.now
+    clock.now += 0.5
+
+    bucket.on_throttle(pause=2.0, sent_at=sent_at)
+    assert bucket.rate == 4
+    assert bucket.try_acquire() == pytest.approx(2.0)
+
+    # Outra resposta 429 de uma requisição enviada antes da redução: só estende a pausa
+    clock.now += 1.0
+    bucket.on_throttle(pause=2.0, sent_at=sent_at)
+    assert bucket.rate == 4
+    assert bucket.try_acquire() == pytest.approx(2.0)
+
+    # Requisição enviada depois da redução reduz de novo, até min_rate
+    for _ in range(5):
+        clock.now += 0.1
+        bucket.on_throttle(pause=0.0, sent_at=clock.now)
+    assert bucket.rate == 1
+
+
+def test_bucket_success_increases_rate_up_to_max(clock):
+    bucket = TokenBucket(rate=2, capacity=1, max_rate=3, increase=0.5)
+    bucket.on_success()
+    assert bucket.rate == 2.5
+    for _ in range(5):
+        bucket.on_success()
+    assert bucket.rate == 3
+
+
+def test_concurrency_slow_start_then_additive_increase(clock):
+    limiter = AdaptiveConcurrency(initial=2, minimum=1, maximum=16)
+    limiter.on_success()
+    limiter.on_success()
+    assert limiter.current() == 4
+
+    clock.now += 1
+    limiter.on_throttle(sent_at=clock.now)
+    assert limiter.current() == 2
+    assert not limiter.slow_start
+
+    limiter.on_success()  # +1/limite
+    assert limiter.limit == pytest.approx(2.5)
+    limiter.on_success()
+    assert limiter.current() == 2
+
+
+def test_concurrency_ignores_throttles_from_requests_sent_before_last_decrease(clock):
+    limiter = AdaptiveConcurrency(initial=8, minimum=1, maximum=8)
+    sent_at = clock.now
+    clock.now += 1
+    limiter.on_throttle(sent_at=sent_at)
+    limiter.on_throttle(sent_at=sent_at)
+    assert limiter.current() == 4
+
+    for _ in range(10):
+        clock.now += 1
+        limiter.on_throttle(sent_at=clock.now)
+    assert limiter.current() == 1
+
+
+def test_concurrency_bounds():
+    limiter = AdaptiveConcurrency(initial=50, minimum=0, maximum=4)
+    assert limiter.current() == 4
+    assert limiter.minimum == 1
+    for _ in range(3):
+        limiter.on_success()
+    assert limiter.current() == 4
@@ -0,0 +1,25 @@
+import math
+
+from benchmarks.fakes import FakeEmbeddings
+from src.core.embedding_cache import CachedEmbeddings, EmbeddingCache, truncate_embedding
+
+
+def test_truncation_renormalizes_the_prefix():
+    vector = [3.0, 4.0, 12.0]
+    assert truncate_embedding(vector, 2) == [0.6, 0.8]
+    assert truncate_embedding(vector, None) is vector
+    assert truncate_embedding(vector, 8) is vector
+
+
+def test_changing_dimensions_reuses_the_cached_full_vectors(tmp_path):
+    cache = EmbeddingCache(tmp_path / "embeddings.db")
+    full = CachedEmbeddings(FakeEmbeddings(64), cache, "fake")
+    reduced = CachedEmbeddings(FakeEmbeddings(64), cache, "fake", dimensions=16)
+
+    vector = full.embed_documents(["cláusula de rescisão"])[0]
+    short = reduced.embed_query("cláusula de rescisão")
+
+    assert len(vector) == 64 and len(short) == 16
+    assert math.isclose(sum(x * x for x in short), 1.0, rel_tol=1e-5)
+    assert short == truncate_embedding(vector, 16)
+    assert cache.stats()["misses"] == 1  # a versão reduzida veio do cache
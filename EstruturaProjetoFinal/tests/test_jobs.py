@@ -0,0 +1,58 @@
+from src.ingestion.jobs import COMPLETED, INTERRUPTED, RUNNING, IndexJobStore
+
+
+def make_store(tmp_path, stale_after: float = 60) -> IndexJobStore:
+    return IndexJobStore(tmp_path / "index_state.db", stale_after=stale_after)
+
+
+def test_claim_is_exclusive_while_a_job_runs(tmp_path):
+    store = make_store(tmp_path)
+    job, created = store.claim("host:1")
+    assert created and job.status == RUNNING
+
+    again, created = store.claim("host:2")
+    assert not created
+    assert again.id == job.id and again.owner == "host:1"
+
+
+def test_claim_after_finish_creates_new_job(tmp_path):
+    store = make_store(tmp_path)
+    first, _ = store.claim("host:1")
+    store.finish(first.id, COMPLETED)
+
+    second, created = store.claim("host:1")
+    assert created and second.id != first.id
+    assert store.get(first.id).status == COMPLETED
+
+
+def test_stale_job_is_interrupted_and_replaced(tmp_path):
+    store = make_store(tmp_path, stale_after=60)
+    dead, _ = store.claim("host:1")
+    store.execute("UPDATE index_jobs SET heartbeat_at = heartbeat_at - 61 WHERE id = ?", (dead.id,))
+
+    job, created = store.claim("host:2")
+    assert created and job.id != dead.id
+    expired = store.get(dead.id)
+    assert expired.status == INTERRUPTED
+    assert expired.finished_at is not None and expired.error == "sem heartbeat"
+
+
+def test_recent_heartbeat_keeps_job_alive(tmp_path):
+    store = make_store(tmp_path, stale_after=60)
+    job, _ = store.claim("host:1")
+    store.execute("UPDATE index_jobs SET heartbeat_at = heartbeat_at - 30 WHERE id = ?", (job.id,))
+
+    assert store.claim("host:2") == (store.get(job.id), False)
+
+
+def test_file_done_counts_each_file_once(tmp_path):
+    store = make_store(tmp_path)
+    job, _ = store.claim("host:1")
+    store.set_total(job.id, 2)
+    store.file_done(job.id, "a.pdf", "indexed")
+    store.file_done(job.id, "a.pdf", "failed")
+    store.file_done(job.id, "b.pdf", "skipped")
+
+    job = store.get(job.id)
+    assert (job.indexed, job.skipped, job.failed, job.done) == (1, 1, 0, 2)
+    assert job.to_dict()["progress"] == 1.0
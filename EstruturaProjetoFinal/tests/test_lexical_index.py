@@ -0,0 +1,37 @@
+from src.search.lexical_index import LexicalIndex
+
+
+def make_pdf(folder, name, content=b"%PDF-1.4 fake"):
+    path = folder / name
+    path.write_bytes(content)
+    return path
+
+
+def test_sync_indexes_new_files_and_removes_its_own_entries(tmp_path):
+    folder = tmp_path / "pdfs"
+    folder.mkdir()
+    pdf = make_pdf(folder, "contrato.pdf")
+    index = LexicalIndex(tmp_path / "lexical.db")
+
+    assert index.sync(folder, lambda path: [(0, "Cláusula de rescisão")]) == 1
+    assert index.search("clausula") == ["contrato.pdf"]
+    assert index.sync(folder, lambda path: [(0, "outro texto")]) == 0  # sem mudança de tamanho/mtime
+
+    pdf.unlink()
+    index.sync(folder, lambda path: [])
+    assert index.search("clausula") == []
+
+
+def test_sync_never_touches_indexer_entries(tmp_path):
+    folder = tmp_path / "pdfs"
+    folder.mkdir()
+    make_pdf(folder, "escaneado.pdf")
+    indexer_pdf = make_pdf(tmp_path, "so_no_indexador.pdf")
+    index = LexicalIndex(tmp_path / "lexical.db")
+
+    # Texto do OCR gravado pelo indexador (outra pasta) e para um scan que também está na pasta do sync
+    for path, text in ((indexer_pdf, "texto do ocr"), (folder / "escaneado.pdf", "scan lido pelo ocr")):
+        index.index_document(path, [(0, text)], source="indexer")
+
+    index.sync(folder, lambda path: [])  # extração local de um scan: sem texto
+    assert sorted(index.search("ocr")) == ["escaneado.pdf", "so_no_indexador.pdf"]
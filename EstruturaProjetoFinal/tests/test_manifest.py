@@ -0,0 +1,125 @@
+import os
+
+import pytest
+
+from src.core.clients import registry
+from src.ingestion.manifest import IndexManifest, ManifestEntry
+from src.ingestion.pdf_indexer import PDFIndexer
+
+MODEL = "text-embedding-3-large"
+
+
+def record(manifest: IndexManifest, path, content_hash: str | None = None) -> ManifestEntry:
+    stat = os.stat(path)
+    entry = ManifestEntry(
+        file_name=os.path.basename(path), source_file="contrato", size=stat.st_size, mtime=stat.st_mtime,
+        content_hash=content_hash or IndexManifest.file_hash(path), embedding_model=MODEL, chunk_ids=["a", "b"])
+    manifest.record(entry)
+    return entry
+
+
+def test_new_then_unchanged_without_hashing(tmp_path, monkeypatch):
+    manifest = IndexManifest(tmp_path / "state.db")
+    pdf = tmp_path / "a.pdf"
+    pdf.write_bytes(b"versao 1")
+    assert manifest.check(pdf, MODEL)[0] == "new"
+    record(manifest, pdf)
+
+    # Tamanho e mtime iguais: o arquivo nem é lido
+    monkeypatch.setattr(IndexManifest, "file_hash", staticmethod(lambda path: pytest.fail("hash calculado")))
+    status, previous, content_hash = manifest.check(pdf, MODEL)
+    assert status == "unchanged"
+    assert previous.chunk_ids == ["a", "b"]
+
+
+def test_touched_file_with_same_content_stays_unchanged(tmp_path):
+    manifest = IndexManifest(tmp_path / "state.db")
+    pdf = tmp_path / "a.pdf"
+    pdf.write_bytes(b"versao 1")
+    record(manifest, pdf)
+
+    os.utime(pdf, (2_000_000_000, 2_000_000_000))
+    assert manifest.check(pdf, MODEL)[0] == "unchanged"
+    # O mtime novo foi gravado: a próxima checagem volta ao caminho rápido
+    assert manifest.get("a.pdf").mtime == 2_000_000_000
+
+
+def test_content_or_model_change_is_changed(tmp_path):
+    manifest = IndexManifest(tmp_path / "state.db")
+    pdf = tmp_path / "a.pdf"
+    pdf.write_bytes(b"versao 1")
+    old = record(manifest, pdf)
+
+    assert manifest.check(pdf, "outro-modelo")[0] == "changed"
+    pdf.write_bytes(b"versao 2!")
+    status, previous, content_hash = manifest.check(pdf, MODEL)
+    assert status == "changed"
+    assert previous.content_hash == old.content_hash
+    assert content_hash == IndexManifest.file_hash(pdf)
+
+
+def test_record_and_remove_bump_the_catalog_version(tmp_path):
+    manifest = IndexManifest(tmp_path / "state.db")
+    pdf = tmp_path / "a.pdf"
+    pdf.write_bytes(b"x")
+    assert manifest.catalog_version() == 0
+    record(manifest, pdf)
+    manifest.remove("a.pdf")
+    assert manifest.catalog_version() == 2
+    assert manifest.get("a.pdf") is None
+
+
+# --- Indexador ---
+
+def clauses(prefix: str, n: int = 12) -> list[str]:
+    return [f"{prefix} cláusula {i}: a contratada pagará mensalmente o valor acordado, "
+            f"reajustado anualmente pelo IGP-M, sob pena de multa de dez por cento." for i in range(n)]
+
+
+def test_changed_file_removes_its_stale_vectors(make_indexer, write_pdf, offline):
+    pdf = write_pdf(offline / "contrato.pdf", ["\n\n".join(clauses("Texto longo")) for _ in range(3)])
+    indexer = make_indexer()
+    indexer.index_pdfs()
+    first_ids = indexer.manifest.get("contrato.pdf").chunk_ids
+    assert len(first_ids) > 2
+
+    write_pdf(pdf, ["\n\n".join(clauses("Versão curta", 2))])
+    indexer.index_pdfs()
+    new_ids = indexer.manifest.get("contrato.pdf").chunk_ids
+    assert len(new_ids) < len(first_ids)
+    assert registry.index().describe_index_stats()["total_vector_count"] == len(new_ids)
+
+
+def test_migration_checks_full_names_once(make_indexer, write_pdf, offline, monkeypatch):
+    # Dois nomes que só diferem nos últimos 32 caracteres: o mesmo source_file truncado
+    prefix = "ACME COMERCIO DE EQUIPAMENTOS LTDA - Contrato de Empresa Associada "
+    old, new = f"{prefix}2023.pdf", f"{prefix}2024.pdf"
+    assert PDFIndexer._source_file_name(old) == PDFIndexer._source_file_name(new)
+    for name in (old, new):
+        write_pdf(offline / name, ["\n\n".join(clauses(name))])
+
+    # Índice criado antes do manifesto: só o contrato de 2023 está nele
+    legacy = make_indexer()
+    legacy._ensure_index()
+    legacy_ids = [PDFIndexer._chunk_id(old, i) for i in range(3)]
+    legacy.index.upsert(vectors=[(cid, [1.0] + [0.0] * 63, {"source_file": PDFIndexer._source_file_name(old)})
+                                 for cid in legacy_ids])
+
+    indexer = make_indexer()
+    indexer._ensure_index()
+    fetches = []
+    original_fetch = indexer.index.fetch
+    monkeypatch.setattr(indexer.index, "fetch", lambda ids, **kw: fetches.append(ids) or original_fetch(ids, **kw))
+    indexer.index_pdfs()
+
+    assert indexer.manifest.get(old).chunk_ids == legacy_ids  # registrado sem reindexar
+    new_entry = indexer.manifest.get(new)
+    assert new_entry.chunk_ids and new_entry.chunk_ids[0] == PDFIndexer._chunk_id(new, 0)
+
+    # Migração concluída: a próxima execução não consulta o índice para arquivos novos
+    assert not indexer.manifest.needs_legacy_check()
+    fetches.clear()
+    write_pdf(offline / "outro.pdf", ["\n\n".join(clauses("outro"))])
+    indexer.index_pdfs()
+    assert fetches == []
+    assert indexer.manifest.get("outro.pdf").chunk_ids
@@ -0,0 +1,52 @@
+import fitz
+import pytest
+
+from src.ingestion.ocr import OCRBackend, page_content_hash
+
+
+def text_pdf(text: str) -> fitz.Document:
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), text)
+    return doc
+
+
+def form_wrapped(text: str) -> fitz.Document:
+    """Página que só desenha um Form XObject ("q /fzFrm0 Do Q") com o texto dentro."""
+    doc = fitz.open()
+    page = doc.new_page()
+    page.show_pdf_page(page.rect, text_pdf(text), 0)
+    return doc
+
+
+def test_form_wrapped_pages_with_different_text_do_not_collide():
+    a = form_wrapped("Contrato A - CNPJ 11.222.333/0001-81")
+    b = form_wrapped("Contrato B - CNPJ 53.502.564/0001-99")
+    assert a[0].read_contents() == b[0].read_contents()
+
+    assert page_content_hash(a, 0) != page_content_hash(b, 0)
+
+
+def test_same_page_in_another_file_has_the_same_hash():
+    a = form_wrapped("Contrato A")
+    b = fitz.open()
+    b.new_page().insert_text((72, 72), "capa")
+    b.insert_pdf(a)
+
+    assert page_content_hash(a, 0) == page_content_hash(b, 1)
+    assert page_content_hash(a, 0) != page_content_hash(b, 0)
+
+
+def test_font_change_changes_the_hash():
+    a, b = fitz.open(), fitz.open()
+    a.new_page().insert_text((72, 72), "mesmo texto", fontname="helv")
+    b.new_page().insert_text((72, 72), "mesmo texto", fontname="cour")
+
+    assert page_content_hash(a, 0) != page_content_hash(b, 0)
+
+
+def test_backend_must_implement_ocr_pages():
+    class Incomplete(OCRBackend):
+        name = "incompleto"
+
+    with pytest.raises(TypeError):
+        Incomplete()
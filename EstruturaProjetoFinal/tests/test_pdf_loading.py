@@ -0,0 +1,125 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from benchmarks.fakes import FakeOCRBackend
+from src.config.settings import settings
+from src.ingestion import pdf_indexer
+from src.ingestion.pdf_indexer import read_page_batch
+
+
+def page_text(number: int) -> str:
+    return f"Página {number}. " + "CLÁUSULA DE TESTE com texto suficiente para a leitura local. " * 3
+
+
+@pytest.fixture
+def seven_pages(offline, write_pdf, monkeypatch):
+    monkeypatch.setattr(settings, "PDF_PROBE_PAGES", 1)
+    monkeypatch.setattr(settings, "PDF_PAGE_BATCH", 2)
+    monkeypatch.setattr(settings, "PDF_MIN_TEXT_CHARS", 50)
+    return write_pdf(offline / "sete.pdf", [page_text(n) for n in range(7)])
+
+
+def test_read_page_batch_reads_only_the_requested_range(seven_pages):
+    batch = read_page_batch(str(seven_pages), 2, 5, 1000, 200, 20)
+
+    assert batch.page_count == 7
+    assert [p.metadata["page"] for p in batch.pages] == [2, 3, 4]
+    assert batch.pages[0].metadata["source"] == str(seven_pages)
+    assert "Página 2." in batch.pages[0].chunks[0][0]
+
+
+def test_pages_are_streamed_one_batch_ahead(make_indexer, seven_pages, monkeypatch):
+    reads = []
+    original = pdf_indexer.read_page_batch
+    monkeypatch.setattr(pdf_indexer, "read_page_batch",
+                        lambda path, start, stop, *args: reads.append((start, stop)) or original(path, start, stop, *args))
+
+    pages = make_indexer()._load_pages(str(seven_pages))
+    first = next(pages)
+    assert first.metadata["page"] == 0
+    assert reads == [(0, 1), (1, 3)]  # amostra + próximo lote, não o arquivo inteiro
+
+    assert [p.metadata["page"] for p in pages] == list(range(1, 7))
+    assert reads == [(0, 1), (1, 3), (3, 5), (5, 7)]
+
+
+def test_blank_page_is_recovered_by_ocr_in_page_order(make_indexer, offline, write_pdf, monkeypatch):
+    monkeypatch.setattr(settings, "PDF_PROBE_PAGES", 1)
+    monkeypatch.setattr(settings, "PDF_PAGE_BATCH", 4)
+    monkeypatch.setattr(settings, "PDF_MIN_TEXT_CHARS", 50)
+    path = write_pdf(offline / "branco.pdf", [page_text(0), page_text(1), "", page_text(3)])
+
+    pages = list(make_indexer()._load_pages(str(path)))
+
+    assert [p.metadata["page"] for p in pages] == [0, 1, 2, 3]
+    assert pages[2].text == FakeOCRBackend.page_text(str(path), 2)
+
+
+def test_process_pool_returns_the_same_pages(make_indexer, seven_pages):
+    indexer = make_indexer()
+    sequential = [(p.metadata, p.chunks) for p in indexer._load_pages(str(seven_pages))]
+
+    indexer._parse_pool = ProcessPoolExecutor(max_workers=2)
+    try:
+        pooled = [(p.metadata, p.chunks) for p in indexer._load_pages(str(seven_pages))]
+    finally:
+        indexer._parse_pool.shutdown()
+        indexer._parse_pool = None
+
+    assert pooled == sequential
+
+
+def test_batches_are_sent_while_the_file_is_still_being_read(make_indexer, seven_pages, monkeypatch):
+    monkeypatch.setattr(settings, "EMBED_BATCH_MAX_VECTORS", 2)
+    indexer = make_indexer()
+    indexer._ensure_index()
+    task = indexer._check_pending("sete.pdf")
+    read = []
+    original = indexer._load_pages
+    monkeypatch.setattr(indexer, "_load_pages",
+                        lambda path: (read.append(page) or page for page in original(path)))
+
+    batches = indexer._prepare_file(task)
+    first = next(batches)
+    assert [c.chunk_id for c in first] == [indexer._chunk_id("sete.pdf", n) for n in range(2)]
+    assert len(read) < 7
+
+    for batch in [first, *batches]:
+        indexer._upsert_batch(batch)
+    indexer._flush_batches()
+    assert indexer.manifest.get("sete.pdf").chunk_ids == [indexer._chunk_id("sete.pdf", n) for n in range(7)]
+    assert "Página 6." in indexer.index.fetch(ids=[indexer._chunk_id("sete.pdf", 6)]).vectors[
+        indexer._chunk_id("sete.pdf", 6)].metadata["text"]
+
+
+def test_pipeline_mode_indexes_the_same_chunks(make_indexer, seven_pages, monkeypatch):
+    monkeypatch.setattr(settings, "EMBED_BATCH_MAX_VECTORS", 3)
+    monkeypatch.setattr(settings, "INDEX_CONCURRENCY", 2)
+    indexer = make_indexer()
+    indexer.index_pdfs()
+
+    assert indexer.manifest.get("sete.pdf").chunk_ids == [indexer._chunk_id("sete.pdf", n) for n in range(7)]
+    assert indexer.index.describe_index_stats()["total_vector_count"] == 7
+
+
+def test_read_failure_leaves_no_orphan_lexical_rows(make_indexer, seven_pages, monkeypatch):
+    indexer = make_indexer()
+    indexer._ensure_index()
+    task = indexer._check_pending("sete.pdf")
+    original = indexer._load_pages
+
+    def failing(path):
+        for page in original(path):
+            if page.metadata["page"] == 4:
+                raise OSError("arquivo truncado")
+            yield page
+    monkeypatch.setattr(indexer, "_load_pages", failing)
+
+    with pytest.raises(OSError):
+        for batch in indexer._prepare_file(task):
+            indexer._upsert_batch(batch)
+
+    assert indexer.lexical_index.search("clausula") == []
+    assert indexer.lexical_index.query("SELECT COUNT(*) AS n FROM pages")[0]["n"] == 0
+    assert "sete.pdf" not in indexer._pending
@@ -0,0 +1,102 @@
+import re
+
+import pytest
+
+from src.core.preprocess import MISSING_CNPJ, MISSING_CPF, TextProcessor
+
+BIOPARK_CNPJ = "11222333000181"
+CNPJ = "11.444.777/0001-61"
+CPF = "529.982.247-25"
+OTHER_CPF = "111.444.777-35"
+
+
+def keys(text: str, contractor_cnpjs=()) -> tuple[str, str]:
+    found = TextProcessor.extract_contractor_keys(text, contractor_cnpjs)
+    return found["cnpj_contratado"], found["cpf_contratado"]
+
+
+@pytest.mark.parametrize("number, valid", [
+    ("11222333000181", True),
+    ("11444777000161", True),
+    ("11222333000182", False),   # dígito verificador errado
+    ("00000000000000", False),   # dígitos repetidos passam no cálculo, mas não são CNPJ
+    ("1122233300018", False),
+    ("11.222.333/0001-81", False),  # só dígitos
+])
+def test_is_valid_cnpj(number, valid):
+    assert TextProcessor.is_valid_cnpj(number) is valid
+
+
+@pytest.mark.parametrize("number, valid", [
+    ("52998224725", True),
+    ("11144477735", True),
+    ("52998224726", False),
+    ("11111111111", False),
+    ("5299822472", False),
+])
+def test_is_valid_cpf(number, valid):
+    assert TextProcessor.is_valid_cpf(number) is valid
+
+
+@pytest.mark.parametrize("text", [
+    f"CNPJ {CNPJ} e CPF {CPF}",
+    "CNPJ 11444777000161 e CPF 52998224725",     # sem pontuação
+    f"Processo 2024/{CNPJ}, CPF {CPF}.",          # sequência anterior colada ao número
+    f"CPF/CNPJ {CPF}/{CNPJ}",                     # os dois números colados
+])
+def test_extract_keys_formats(text):
+    assert keys(text) == ("11444777000161", "52998224725")
+
+
+def test_numbers_inside_longer_digit_runs_are_ignored():
+    assert keys("conta 9911444777000161 e protocolo 1152998224725") == (MISSING_CNPJ, MISSING_CPF)
+
+
+def test_invalid_check_digits_are_skipped():
+    assert keys(f"CNPJ 11.444.777/0001-62, depois {CNPJ}; CPF 529.982.247-26 e {OTHER_CPF}") == (
+        "11444777000161", "11144477735")
+
+
+def test_missing_keys():
+    assert keys("") == (MISSING_CNPJ, MISSING_CPF)
+    assert keys("Contrato sem identificação das partes.") == (MISSING_CNPJ, MISSING_CPF)
+
+
+def test_contractor_cnpj_from_settings_list_is_excluded():
+    text = f"CONTRATANTE: 11.222.333/0001-81. CONTRATADA: CNPJ {CNPJ}"
+    assert keys(text, (BIOPARK_CNPJ,))[0] == "11444777000161"
+    assert keys(text, ())[0] == BIOPARK_CNPJ
+
+
+def test_contractor_detected_by_name_and_representatives_excluded():
+    text = (f"CONTRATANTE: FUNDAÇÃO BIOPARK, inscrita no CNPJ sob nº 11.222.333/0001-81, "
+            f"representada por seu diretor, CPF {OTHER_CPF}. "
+            f"CONTRATADA: EMPRESA X LTDA, CNPJ {CNPJ}, representada por seu sócio, CPF {CPF}.")
+    assert keys(text) == ("11444777000161", "52998224725")
+
+    numbers = TextProcessor.find_document_numbers(text, ())
+    assert [(n.kind, n.contractor) for n in numbers] == [
+        ("cnpj", True), ("cpf", True), ("cnpj", False), ("cpf", False)]
+
+
+def test_name_mention_far_from_cnpj_does_not_exclude_it():
+    text = "Parque Científico " + "cláusula " * 40 + f"CNPJ {CNPJ}"
+    assert keys(text)[0] == "11444777000161"
+
+
+def test_extract_contractor_keys_many_matches_single_calls():
+    texts = [f"CNPJ {CNPJ}", f"CPF {CPF}", ""]
+    assert TextProcessor.extract_contractor_keys_many(texts, ()) == [
+        TextProcessor.extract_contractor_keys(t, ()) for t in texts]
+
+
+@pytest.mark.parametrize("text", ["", "  a\t\tb \n\n c  ", " x y\r\n", "sem espaços"])
+def test_clean_text_matches_regex_version(text):
+    expected = re.sub(r'\s+', ' ', text).strip()
+    assert TextProcessor.clean_text(text) == expected
+    assert TextProcessor.clean_texts([text]) == [expected]
+
+
+def test_preprocess_text_and_normalize_key():
+    assert TextProcessor.preprocess_text("  Cláusula\n PRIMEIRA ") == "cláusula primeira"
+    assert TextProcessor.normalize_key(" 11.222.333/0001-81 ") == BIOPARK_CNPJ
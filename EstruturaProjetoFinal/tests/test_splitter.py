@@ -0,0 +1,79 @@
+import random
+import re
+
+import pytest
+
+from benchmarks.bench_splitter import synthetic_pages
+from src.ingestion.pdf_indexer import ParagraphTextSplitter
+
+
+def original_clean_text(text: str) -> str:
+    """TextProcessor.clean_text antes da troca por split/join."""
+    if not text:
+        return ""
+    text = re.sub(r'[\n\t]+', ' ', text)
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip()
+
+
+def original_split_text(text: str, chunk_size: int, chunk_overlap: int) -> list[str]:
+    """ParagraphTextSplitter.split_text original: concatenação + segunda passada para o overlap."""
+    paragraphs = re.split(r'\n\s*\n', text)
+    chunks = []
+    current_chunk = ""
+    for para in paragraphs:
+        para = original_clean_text(para)
+        if not para:
+            continue
+        if len(current_chunk) + len(para) + 1 > chunk_size:
+            if current_chunk:
+                chunks.append(current_chunk.strip())
+            current_chunk = para
+        else:
+            current_chunk += " " + para
+    if current_chunk:
+        chunks.append(current_chunk.strip())
+
+    if chunk_overlap > 0 and len(chunks) > 1:
+        overlapped = []
+        for i, chunk in enumerate(chunks):
+            if i > 0:
+                prev = chunks[i - 1]
+                overlap_text = prev[-chunk_overlap:] if chunk_overlap < len(prev) else prev
+                chunk = overlap_text + " " + chunk
+            overlapped.append(chunk.strip())
+        return overlapped
+    return chunks
+
+
+@pytest.mark.parametrize("chunk_size,chunk_overlap", [(750, 150), (1000, 200), (300, 0), (120, 119), (50, 400)])
+def test_same_chunks_as_the_original_on_contract_pages(chunk_size, chunk_overlap):
+    splitter = ParagraphTextSplitter(chunk_size, chunk_overlap)
+    for page in synthetic_pages(60):
+        assert splitter.split_text(page) == original_split_text(page, chunk_size, chunk_overlap)
+
+
+def test_same_chunks_as_the_original_on_random_whitespace():
+    # Espaços em branco "exóticos" (\x0b, \x0c, \x1c, \x85, U+3000) e parágrafos vazios
+    alphabet = "ab xy\n\n\t\r\x0b\x0c\x1c\x85　"
+    rng = random.Random(0)
+    for _ in range(20_000):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 80)))
+        size, overlap = rng.randint(1, 30), rng.randint(0, 15)
+        assert ParagraphTextSplitter(size, overlap).split_text(text) == original_split_text(text, size, overlap), \
+            (text, size, overlap)
+
+
+def test_spans_are_slices_of_the_clean_buffer():
+    splitter = ParagraphTextSplitter(200, 50)
+    page = synthetic_pages(1)[0]
+    buffer, spans = splitter.split_spans(page)
+
+    assert buffer == " ".join(p for p in (original_clean_text(x) for x in re.split(r'\n\s*\n', page)) if p)
+    assert [buffer[start:end] for start, end in spans] == splitter.split_text(page)
+
+
+def test_empty_and_blank_text():
+    splitter = ParagraphTextSplitter(100, 20)
+    assert splitter.split_text("") == []
+    assert splitter.split_text(" \n\n\t \n ") == []
@@ -0,0 +1,65 @@
+import os
+
+from src.search.text_cache import PageTextCache
+
+
+def extractor_from_file(path: str):
+    """Cada linha do arquivo de teste é uma página."""
+    with open(path, encoding="utf-8") as f:
+        return list(enumerate(f.read().splitlines()))
+
+
+def stored_hashes(cache: PageTextCache) -> set[str]:
+    return {r["file_hash"] for r in cache.query("SELECT DISTINCT file_hash FROM pages")}
+
+
+def write(path, text: str, mtime: float) -> None:
+    path.write_text(text, encoding="utf-8")
+    os.utime(path, (mtime, mtime))
+
+
+def test_get_pages_range_and_page_count(tmp_path):
+    pdf = tmp_path / "a.pdf"
+    write(pdf, "um\ndois\ntrês", 1_000)
+    cache = PageTextCache(tmp_path / "cache.db", extractor=extractor_from_file)
+
+    assert cache.get_pages(pdf) == (["um", "dois", "três"], 3)
+    assert cache.get_pages(pdf, 1, 2) == (["dois"], 3)
+    assert cache.get_pages(pdf, 2, 10) == (["três"], 3)
+
+
+def test_new_version_replaces_old_pages(tmp_path):
+    pdf = tmp_path / "a.pdf"
+    write(pdf, "versão 1\npágina 2", 1_000)
+    cache = PageTextCache(tmp_path / "cache.db", extractor=extractor_from_file)
+    old_hash, _ = cache._resolve(pdf)
+
+    write(pdf, "versão 2", 2_000)
+    assert cache.get_pages(pdf) == (["versão 2"], 1)
+    assert old_hash not in stored_hashes(cache)
+    assert len(stored_hashes(cache)) == 1
+
+
+def test_old_pages_kept_while_a_copy_still_uses_them(tmp_path):
+    pdf, copy = tmp_path / "a.pdf", tmp_path / "copia.pdf"
+    write(pdf, "conteúdo original", 1_000)
+    write(copy, "conteúdo original", 1_000)
+    cache = PageTextCache(tmp_path / "cache.db", extractor=extractor_from_file)
+    shared_hash, _ = cache._resolve(pdf)
+    cache._resolve(copy)
+
+    write(pdf, "conteúdo novo", 2_000)
+    cache._resolve(pdf)
+    assert shared_hash in stored_hashes(cache)
+    assert cache.get_pages(copy) == (["conteúdo original"], 1)
+
+
+def test_orphan_pages_are_pruned_on_open(tmp_path):
+    pdf = tmp_path / "a.pdf"
+    write(pdf, "texto", 1_000)
+    db = tmp_path / "cache.db"
+    cache = PageTextCache(db, extractor=extractor_from_file)
+    cache._resolve(pdf)
+    cache.execute("INSERT INTO pages VALUES ('hash-antigo', 0, x'00')")
+
+    assert "hash-antigo" not in stored_hashes(PageTextCache(db, extractor=extractor_from_file))
@@ -0,0 +1,54 @@
+import pytest
+
+from src.config.settings import settings
+from src.core import tokens
+
+
+@pytest.fixture(autouse=True)
+def fresh_encoding_cache():
+    tokens._encoding.cache_clear()
+    yield
+    tokens._encoding.cache_clear()
+
+
+class FailingTiktoken:
+    """tiktoken instalado, mas sem acesso ao arquivo BPE (sem rede)."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def get_encoding(self, name):
+        self.calls += 1
+        raise ConnectionError("openaipublic.blob.core.windows.net inacessível")
+
+
+def test_unavailable_encoding_falls_back_to_the_estimate_once(monkeypatch):
+    monkeypatch.setattr(settings, "TOKEN_COUNTER", "tiktoken")
+    failing = FailingTiktoken()
+    monkeypatch.setattr(tokens, "tiktoken", failing)
+
+    assert tokens.count_tokens("a" * 40) == 11
+    assert tokens.count_tokens("b" * 80) == 21
+    assert failing.calls == 1
+
+
+def test_estimate_setting_never_loads_the_encoding(monkeypatch):
+    monkeypatch.setattr(settings, "TOKEN_COUNTER", "estimate")
+    failing = FailingTiktoken()
+    monkeypatch.setattr(tokens, "tiktoken", failing)
+
+    assert tokens.count_tokens("x" * 8) == 3
+    assert tokens.count_tokens("") == 0
+    assert failing.calls == 0
+
+
+def test_batcher_works_without_the_encoding(monkeypatch):
+    from src.ingestion.batching import ChunkBatcher, PendingChunk
+
+    monkeypatch.setattr(settings, "TOKEN_COUNTER", "tiktoken")
+    monkeypatch.setattr(tokens, "tiktoken", FailingTiktoken())
+    batcher = ChunkBatcher(max_tokens=30, max_vectors=10)
+    ready = batcher.add([PendingChunk(f"id{i}", "y" * 40, {}, "a.pdf") for i in range(5)])
+
+    assert [len(b) for b in ready] == [2, 2]
+    assert [len(b) for b in batcher.flush()] == [1]
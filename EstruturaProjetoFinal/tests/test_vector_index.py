@@ -0,0 +1,162 @@
+import numpy as np
+import pytest
+
+from src.search.vector_index import LocalVectorIndex
+
+DIM = 32
+
+
+def random_vectors(n: int, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal((n, DIM)).astype(np.float32)
+
+
+def contracts(n: int, seed: int = 0) -> list[tuple[str, list[float], dict]]:
+    """n vetores distribuídos por 4 arquivos, cada arquivo com seu CNPJ."""
+    return [
+        (f"v{i}", vector.tolist(), {"source_file": f"arquivo {i % 4}", "cnpj_contratado": f"{i % 4:014d}",
+                                    "cpf_contratado": "SEM_CPF", "text": f"chunk {i}"})
+        for i, vector in enumerate(random_vectors(n, seed))
+    ]
+
+
+def brute_force(records, q, k, keep=lambda meta: True) -> list[str]:
+    ids = [vid for vid, _, meta in records if keep(meta)]
+    if not ids:
+        return []
+    matrix = np.asarray([values for _, values, meta in records if keep(meta)])
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    scores = matrix @ (q / np.linalg.norm(q))
+    return [ids[i] for i in np.argsort(-scores)[:k]]
+
+
+def ids(result) -> list[str]:
+    return [m["id"] for m in result["matches"]]
+
+
+def test_exact_search_matches_brute_force(tmp_path):
+    records = contracts(300)
+    index = LocalVectorIndex(tmp_path, shard_rows=64)  # vários shards
+    index.upsert(vectors=records)
+    q = random_vectors(1, seed=1)[0]
+
+    result = index.query(vector=q.tolist(), top_k=10, include_metadata=True)
+
+    assert ids(result) == brute_force(records, q, 10)
+    assert result["matches"][0]["metadata"]["text"].startswith("chunk ")
+
+
+@pytest.mark.parametrize("flt, keep", [
+    ({"source_file": "arquivo 1"}, lambda m: m["source_file"] == "arquivo 1"),
+    ({"cnpj_contratado": {"$eq": f"{2:014d}"}}, lambda m: m["cnpj_contratado"] == f"{2:014d}"),
+    ({"source_file": {"$in": ["arquivo 0", "arquivo 3"]}}, lambda m: m["source_file"] in ("arquivo 0", "arquivo 3")),
+    ({"source_file": {"$nin": ["arquivo 0"]}}, lambda m: m["source_file"] != "arquivo 0"),
+    ({"source_file": {"$ne": "arquivo 2"}}, lambda m: m["source_file"] != "arquivo 2"),
+    ({"$or": [{"source_file": "arquivo 1"}, {"cnpj_contratado": f"{2:014d}"}]},
+     lambda m: m["source_file"] == "arquivo 1" or m["cnpj_contratado"] == f"{2:014d}"),
+    ({"$and": [{"cpf_contratado": "SEM_CPF"}, {"source_file": "arquivo 3"}]}, lambda m: m["source_file"] == "arquivo 3"),
+    ({"source_file": "não existe"}, lambda m: False),
+])
+def test_filters(tmp_path, flt, keep):
+    records = contracts(120)
+    index = LocalVectorIndex(tmp_path)
+    index.upsert(vectors=records)
+    q = random_vectors(1, seed=2)[0]
+
+    assert ids(index.query(vector=q.tolist(), top_k=15, filter=flt)) == brute_force(records, q, 15, keep)
+
+
+def test_unsupported_filter_field_is_rejected(tmp_path):
+    index = LocalVectorIndex(tmp_path)
+    index.upsert(vectors=contracts(4))
+    with pytest.raises(ValueError):
+        index.query(vector=random_vectors(1)[0].tolist(), filter={"page": 1})
+
+
+def test_delete_by_filter_and_reuse_of_rows_survive_reopening(tmp_path):
+    records = contracts(40)
+    index = LocalVectorIndex(tmp_path, shard_rows=16)
+    index.upsert(vectors=records)
+    index.delete(filter={"source_file": "arquivo 0"})
+    index.upsert(vectors=[("novo", records[0][1], {"source_file": "arquivo 9"})])  # ocupa uma linha liberada
+
+    reopened = LocalVectorIndex(tmp_path, shard_rows=16)
+    assert reopened.describe_index_stats()["total_vector_count"] == 31
+    assert ids(reopened.query(vector=records[0][1], top_k=1)) == ["novo"]
+    assert ids(reopened.query(vector=records[4][1], top_k=5, filter={"source_file": "arquivo 0"})) == []
+    assert reopened.fetch(["v1"]).vectors["v1"].metadata["source_file"] == "arquivo 1"
+
+
+def test_dimension_is_fixed_at_creation(tmp_path):
+    LocalVectorIndex(tmp_path).upsert(vectors=contracts(2))
+    with pytest.raises(ValueError):
+        LocalVectorIndex(tmp_path, dimension=DIM * 2)
+
+
+def test_ivf_recall_and_selective_filters_stay_exact(tmp_path):
+    records = contracts(2000)
+    index = LocalVectorIndex(tmp_path, ann="ivf", ann_min_rows=10**9, nprobe=8, exact_max_rows=100)
+    index.upsert(vectors=records)
+    index.train_ivf(nlist=16)
+    assert index._centroids is not None and (index._assign[:2000] >= 0).all()
+
+    queries = random_vectors(20, seed=3)
+    recall = np.mean([len(set(ids(index.query(vector=q.tolist(), top_k=10))) & set(brute_force(records, q, 10))) / 10
+                      for q in queries])
+    assert recall >= 0.7
+
+    # Vetor inserido depois do treino entra na lista mais próxima e é encontrado
+    index.upsert(vectors=[("depois", queries[0].tolist(), {"source_file": "arquivo 5"})])
+    assert ids(index.query(vector=queries[0].tolist(), top_k=1)) == ["depois"]
+
+    # Filtro seletivo (até exact_max_rows linhas): busca exata, sem perder recall
+    flt = {"source_file": "arquivo 5"}
+    assert ids(index.query(vector=queries[1].tolist(), top_k=3, filter=flt)) == ["depois"]
+
+    # Centróides persistem: o índice reaberto continua em modo IVF
+    reopened = LocalVectorIndex(tmp_path, ann="ivf", ann_min_rows=10**9, nprobe=16, exact_max_rows=100)
+    assert reopened._centroids is not None
+    assert ids(reopened.query(vector=queries[2].tolist(), top_k=10)) == brute_force(records, queries[2], 10)
+
+
+@pytest.mark.parametrize("dtype, suffix, itemsize", [("float16", ".f16", 2), ("int8", ".i8", 1)])
+def test_compressed_storage_with_rescoring_keeps_the_exact_order(tmp_path, dtype, suffix, itemsize):
+    records = contracts(500)
+    index = LocalVectorIndex(tmp_path, dtype=dtype, rescore=True, rescore_factor=4, shard_rows=256)
+    index.upsert(vectors=records)
+
+    codes = sorted(tmp_path.glob(f"*{suffix}"))
+    assert codes and all(path.stat().st_size == 256 * DIM * itemsize for path in codes)
+    assert sorted(tmp_path.glob("*.f32"))  # cópia float32 para o rescoring
+
+    for q in random_vectors(10, seed=4):
+        result = index.query(vector=q.tolist(), top_k=10)
+        assert ids(result) == brute_force(records, q, 10)
+        # Score final em precisão total
+        expected = np.asarray(records[int(result["matches"][0]["id"][1:])][1])
+        expected = expected @ q / np.linalg.norm(expected) / np.linalg.norm(q)
+        assert result["matches"][0]["score"] == pytest.approx(expected, abs=1e-5)
+
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_compressed_storage_without_rescoring(tmp_path, dtype):
+    records = contracts(500)
+    index = LocalVectorIndex(tmp_path, dtype=dtype, rescore=False)
+    index.upsert(vectors=records)
+
+    assert not sorted(tmp_path.glob("*.f32"))
+    recall = np.mean([len(set(ids(index.query(vector=q.tolist(), top_k=10))) & set(brute_force(records, q, 10))) / 10
+                      for q in random_vectors(10, seed=5)])
+    assert recall >= 0.9
+
+    # fetch devolve o vetor reconstruído dos códigos, próximo do original normalizado
+    original = np.asarray(records[7][1])
+    fetched = np.asarray(index.fetch(["v7"]).vectors["v7"].values)
+    assert np.allclose(fetched, original / np.linalg.norm(original), atol=0.01)
+
+
+def test_storage_type_is_fixed_at_creation(tmp_path):
+    LocalVectorIndex(tmp_path, dtype="int8").upsert(vectors=contracts(2))
+    with pytest.raises(ValueError):
+        LocalVectorIndex(tmp_path, dtype="float16")
+    with pytest.raises(ValueError):
+        LocalVectorIndex(tmp_path / "outro", dtype="int4")